@@ -124,6 +124,36 @@ AUTH_PASSWORD_VALIDATORS = [
 
 SECURE_API_ENDPOINTS = False
 
+# Scopes granted to users signed in with a Django session (e.g. Launchpad) when SECURE_API_ENDPOINTS is on, staff users get STAFF_SESSION_SCOPES
+SESSION_SCOPES = env.get("SESSION_SCOPES", "aerobridge.read").split()
+STAFF_SESSION_SCOPES = env.get("STAFF_SESSION_SCOPES", "aerobridge.read aerobridge.write").split()
+
+# Launchpad pages send anonymous users to the admin login
+LOGIN_URL = '/admin/login/'
+
+# Outbound HTTP clients (Passport, Digital Sky, auth server, S3) share these pool / timeout / retry / circuit breaker defaults, override them per upstream in UPSTREAM_HTTP e.g. {'digitalsky': {'timeout': 30}}
+UPSTREAM_HTTP_DEFAULTS = {
+    'timeout': float(env.get('UPSTREAM_HTTP_TIMEOUT', 10)),
+    'retries': int(env.get('UPSTREAM_HTTP_RETRIES', 3)),
+    'backoff_factor': float(env.get('UPSTREAM_HTTP_BACKOFF_FACTOR', 0.5)),
+    'pool_maxsize': int(env.get('UPSTREAM_HTTP_POOL_MAXSIZE', 10)),
+    'failure_threshold': int(env.get('UPSTREAM_HTTP_FAILURE_THRESHOLD', 5)),
+    'reset_timeout': float(env.get('UPSTREAM_HTTP_RESET_TIMEOUT', 30)),
+}
+UPSTREAM_HTTP = {}
+# The auth server full chain is downloaded once, cached for the TTL and refreshed when an external credential changes
+AUTH_SERVER_FULL_CHAIN_CACHE_TTL = int(env.get('AUTH_SERVER_FULL_CHAIN_CACHE_TTL', 86400))
+AUTH_SERVER_FULL_CHAIN_FETCH_TIMEOUT = int(env.get('AUTH_SERVER_FULL_CHAIN_FETCH_TIMEOUT', 10))
+# Chains missing a credential that could not be downloaded are cached for this many seconds only, clients are asked to retry after it when no chain is available
+AUTH_SERVER_FULL_CHAIN_RETRY_TTL = int(env.get('AUTH_SERVER_FULL_CHAIN_RETRY_TTL', 30))
+# Flight Passport JWKS caching, keys are kept for the TTL and refetched at most once per refresh interval on an unknown kid
+PASSPORT_JWKS_URL = env.get('PASSPORT_JWKS_URL', None)
+PASSPORT_JWKS_CACHE_TTL = int(env.get('PASSPORT_JWKS_CACHE_TTL', 3600))
+PASSPORT_JWKS_MIN_REFRESH_INTERVAL = int(env.get('PASSPORT_JWKS_MIN_REFRESH_INTERVAL', 30))
+PASSPORT_JWKS_FETCH_TIMEOUT = int(env.get('PASSPORT_JWKS_FETCH_TIMEOUT', 5))
+# Number of verified access tokens whose claims are kept until they expire
+PASSPORT_TOKEN_CACHE_SIZE = int(env.get('PASSPORT_TOKEN_CACHE_SIZE', 1024))
+
 # if DEBUG:
 #     BROKER_URL = os.getenv("REDIS_URL",'redis://localhost:6379/')
 # else:
@@ -138,9 +168,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'jetway.pagination.StandardResultsSetPagination',
     'DEFAULT_PERMISSION_CLASSES': (
         # 'rest_framework.permissions.IsAuthenticatedOrReadOnly',
+        'pki_framework.permissions.HasRequiredScopes',
     ),
     'DATETIME_FORMAT': "%d-%b-%Y %H:%M:%S",
     'DEFAULT_AUTHENTICATION_CLASSES': (             
+        'pki_framework.authentication.PassportTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -180,6 +212,47 @@ SIMPLE_HISTORY_REVERT_DISABLED = True
 
 CRYPTOGRAPHY_SALT = env.get(
     "CRYPTOGRAPHY_SALT", "__SET_AS_A_VERY_STRONG_PASSWORD__")
+# Sign flight permissions with Flight Passport ("passport") or locally with the Management Server private key stored in Aerobridge ("local")
+PERMISSION_SIGNING_MODE = env.get("PERMISSION_SIGNING_MODE", "passport")
+LOCAL_PERMISSION_ISSUER = env.get("LOCAL_PERMISSION_ISSUER", "aerobridge")
+LOCAL_PERMISSION_TOKEN_LIFETIME = int(env.get("LOCAL_PERMISSION_TOKEN_LIFETIME", 86400))
+# Maximum number of operations whose permissions are issued in one request, their tokens are requested from Flight Passport by this many threads
+PERMISSION_ISSUE_BATCH_LIMIT = int(env.get("PERMISSION_ISSUE_BATCH_LIMIT", 200))
+PERMISSION_ISSUE_WORKERS = int(env.get("PERMISSION_ISSUE_WORKERS", 10))
+# An operation whose permission is being issued is claimed for this many seconds, other requests for it wait for its permission until then
+PERMISSION_ISSUE_LEASE = int(env.get("PERMISSION_ISSUE_LEASE", 30))
+# The preissue_flight_permissions command claims this many upcoming operations at a time and, with --loop, scans for them every this many seconds
+PERMISSION_PREISSUE_BATCH_SIZE = int(env.get("PERMISSION_PREISSUE_BATCH_SIZE", 200))
+PERMISSION_PREISSUE_INTERVAL = int(env.get("PERMISSION_PREISSUE_INTERVAL", 30))
+# Claimed operations are left to their worker for this many seconds, after which another worker retries those it did not issue
+PERMISSION_PREISSUE_LEASE = int(env.get("PERMISSION_PREISSUE_LEASE", 120))
+# Maximum number of permission tokens / operations that can be verified in one request
+PERMISSION_VERIFY_BATCH_LIMIT = int(env.get("PERMISSION_VERIFY_BATCH_LIMIT", 500))
+# Audience of the permission tokens issued by Flight Passport, when set verified permissions must carry it
+PERMISSION_TOKEN_AUDIENCE = env.get("PERMISSION_TOKEN_AUDIENCE", "")
+# Maximum number of flight logs that can be signed in one request
+FLIGHT_LOG_SIGN_BATCH_LIMIT = int(env.get("FLIGHT_LOG_SIGN_BATCH_LIMIT", 500))
+# Resumable flight log uploads are assembled in this directory before they are finalized into a FlightLog
+FLIGHT_LOG_UPLOAD_DIR = env.get("FLIGHT_LOG_UPLOAD_DIR", os.path.join(BASE_DIR, 'flight_log_uploads'))
+FLIGHT_LOG_UPLOAD_MAX_CHUNK_SIZE = int(env.get("FLIGHT_LOG_UPLOAD_MAX_CHUNK_SIZE", 8 * 1024 * 1024))
+# Signed log chain verification stores a checkpoint every this many verified logs
+FLIGHT_LOG_CHAIN_CHECKPOINT_INTERVAL = int(env.get("FLIGHT_LOG_CHAIN_CHECKPOINT_INTERVAL", 1000))
+# Flight log summaries are cached for this many seconds per version of the log, the bulk summary accepts at most this many operations
+FLIGHT_LOG_SUMMARY_CACHE_TTL = int(env.get("FLIGHT_LOG_SUMMARY_CACHE_TTL", 86400))
+FLIGHT_LOG_SUMMARY_BATCH_LIMIT = int(env.get("FLIGHT_LOG_SUMMARY_BATCH_LIMIT", 500))
+# A flight log point breaches the permission geo-cage when it is more than this many meters outside it
+GEO_CAGE_CONFORMANCE_TOLERANCE = float(env.get("GEO_CAGE_CONFORMANCE_TOLERANCE", 0))
+# Flight log tracks and flight plans are simplified for these web map zoom levels when they are saved, other zoom levels are simplified on request
+LEVEL_OF_DETAIL_ZOOM_LEVELS = [int(zoom) for zoom in env.get("LEVEL_OF_DETAIL_ZOOM_LEVELS", "10,13,16,19").split(",") if zoom]
+LEVEL_OF_DETAIL_DEFAULT_ZOOM = int(env.get("LEVEL_OF_DETAIL_DEFAULT_ZOOM", 16))
+LEVEL_OF_DETAIL_CACHE_TTL = int(env.get("LEVEL_OF_DETAIL_CACHE_TTL", 86400))
+# Signed log downloads read the log from the database in chunks of this many bytes
+SIGNED_LOG_DOWNLOAD_CHUNK_SIZE = int(env.get("SIGNED_LOG_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+# Deny permissions whose geo-cage and time window overlap a granted permission, the index buckets permissions in windows of this many seconds
+AIRSPACE_DECONFLICTION = bool(int(env.get("AIRSPACE_DECONFLICTION", 1)))
+AIRSPACE_INDEX_BUCKET_SECONDS = int(env.get("AIRSPACE_INDEX_BUCKET_SECONDS", 3600))
+# Comma separated list of retired keys that are still accepted for decryption while credentials are re-encrypted with CRYPTOGRAPHY_SALT, see the rotate_credential_keys command
+CRYPTOGRAPHY_SALT_FALLBACKS = [key for key in env.get("CRYPTOGRAPHY_SALT_FALLBACKS", "").split(",") if key]
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
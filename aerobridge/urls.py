@@ -25,6 +25,7 @@ import jetway.views as jetwayviews
 urlpatterns = [
     
     path('ping/', jetwayviews.PingView.as_view(), name="ping"),
+    path('ping/upstreams/', jetwayviews.UpstreamMetricsView.as_view(), name="upstream-metrics"),
     path('', jetwayviews.HomeView.as_view()),
     path('admin/', admin.site.urls),
 
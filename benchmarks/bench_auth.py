@@ -0,0 +1,105 @@
+"""
+Measure what Flight Passport authentication costs per request.
+
+A local Passport stand-in serves the JWKS document and signs RS256 tokens, so the benchmark runs offline. Each
+endpoint is driven through the Django test client against a throwaway test database and latency percentiles are
+reported with authentication off and on:
+
+    python -m benchmarks.bench_auth --iterations 500
+
+The "auth on" modes are:
+
+    cached            JWKS and verified token caches warm, the steady state of a GCS reusing one token
+    token cache cold  every request runs a full RS256 signature check against the cached JWKS
+    no caches         every request refetches the JWKS from the stand-in and verifies the signature
+
+Pass --max-overhead-ms to exit with status 1 when the p50 overhead of the cached mode over auth off exceeds a
+budget on any endpoint, so the run can gate authentication performance regressions.
+"""
+import argparse
+import os
+import sys
+
+from .utils import print_table, setup_django, summarize, time_calls
+
+ENDPOINTS = ['/registry/aircraft/', '/gcs/flight-plans', '/ping/']
+SCOPES = ['aerobridge.read', 'aerobridge.write']
+
+
+def run(iterations, endpoints):
+    from django.test import Client, override_settings
+
+    from gcs_operations.models import FlightPlan
+    from pki_framework.key_store import jwks_store
+    from pki_framework.token_cache import token_cache
+    from tests.passport_standin import PassportStandin
+
+    for i in range(10):
+        FlightPlan.objects.create(name='Benchmark Plan %d' % i)
+
+    results = {}
+    with PassportStandin() as standin:
+        os.environ['PASSPORT_AUDIENCE'] = standin.audience
+        os.environ['PASSPORT_DOMAIN'] = standin.domain
+        client = Client(HTTP_AUTHORIZATION='Bearer %s' % standin.issue_token(SCOPES))
+
+        def reset_nothing():
+            pass
+
+        def reset_token_cache():
+            token_cache.clear()
+
+        def reset_all_caches():
+            token_cache.clear()
+            jwks_store.invalidate()
+
+        modes = [
+            ('auth off', False, reset_nothing),
+            ('auth on, cached', True, reset_nothing),
+            ('auth on, token cache cold', True, reset_token_cache),
+            ('auth on, no caches', True, reset_all_caches),
+        ]
+        with override_settings(PASSPORT_JWKS_URL=standin.jwks_url):
+            for endpoint in endpoints:
+                for label, secure, reset in modes:
+                    def request():
+                        reset()
+                        response = client.get(endpoint)
+                        assert response.status_code == 200, (endpoint, label, response.status_code)
+
+                    with override_settings(SECURE_API_ENDPOINTS=secure):
+                        jwks_store.invalidate()
+                        token_cache.clear()
+                        results[(endpoint, label)] = summarize(time_calls(request, iterations))
+
+    for endpoint in endpoints:
+        print_table(endpoint, [(label, results[(endpoint, label)]) for label, _, _ in modes])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--endpoint', action='append', dest='endpoints', help='Endpoint to drive, may be repeated')
+    parser.add_argument('--max-overhead-ms', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    teardown = setup_django()
+    try:
+        endpoints = args.endpoints or ENDPOINTS
+        results = run(args.iterations, endpoints)
+    finally:
+        teardown()
+
+    exit_code = 0
+    for endpoint in endpoints:
+        overhead = results[(endpoint, 'auth on, cached')]['p50'] - results[(endpoint, 'auth off')]['p50']
+        print('%s p50 auth overhead with warm caches: %.3f ms' % (endpoint, overhead))
+        if args.max_overhead_ms is not None and overhead > args.max_overhead_ms:
+            print('  exceeds the %.3f ms budget' % args.max_overhead_ms)
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
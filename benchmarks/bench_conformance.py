@@ -0,0 +1,67 @@
+"""
+Time the geo-cage conformance check of one flight log as the share of points outside the cage grows.
+
+Synthetic telemetry of --points positions is checked against a square cage of about 222 m, the same check that the
+conformance endpoints run for every log. The flights stay inside the cage, leave it once for half of the flight, or
+leave it on every other point so that half of the points breach in as many intervals as possible:
+
+    python -m benchmarks.bench_conformance --points 1000000
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from .utils import print_table, setup_django, summarize, time_calls
+
+LAT, LNG = 12.97, 77.59
+HALF_CAGE_DEGREES = 0.001
+
+
+def flights(points, rng):
+    ''' Latitude columns of the benchmarked flights by label, every flight flies north-south through the middle of the cage '''
+    inside = LAT + rng.uniform(-0.9, 0.9, points) * HALF_CAGE_DEGREES
+    one_breach = inside.copy()
+    one_breach[points // 4:points // 4 + points // 2] += 2 * HALF_CAGE_DEGREES
+    every_other_point = inside.copy()
+    every_other_point[1::2] += 2 * HALF_CAGE_DEGREES
+    return [('inside the cage', inside), ('half outside, one breach', one_breach), ('half outside, every other point', every_other_point)]
+
+
+def run(points, iterations, seed):
+    from gcs_operations import conformance
+
+    cage = conformance.GeoCage([{'lat': LAT + dlat * HALF_CAGE_DEGREES, 'lng': LNG + dlng * HALF_CAGE_DEGREES}
+                                for dlat, dlng in ((-1, -1), (-1, 1), (1, 1), (1, -1), (-1, -1))])
+    rng = np.random.default_rng(seed)
+    timestamps = 1620000000 + np.arange(points, dtype=np.float64)
+    longitudes = np.full(points, LNG)
+
+    rows = []
+    for label, latitudes in flights(points, rng):
+        columns = {'timestamp': timestamps, 'latitude': latitudes, 'longitude': longitudes}
+        result = conformance.check(cage, columns, tolerance=0)
+        print('%s: %d breaching points in %d breaches' % (label, result['breaching_points'], len(result['breaches'])))
+        rows.append((label, summarize(time_calls(lambda: conformance.check(cage, columns, tolerance=0), iterations, warmup=1))))
+    print()
+    print_table('check of %d points' % points, rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    teardown = setup_django()
+    try:
+        run(args.points, args.iterations, args.seed)
+    finally:
+        teardown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
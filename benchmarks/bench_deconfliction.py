@@ -0,0 +1,140 @@
+"""
+Time airspace deconfliction of a new permission against a large number of active permissions.
+
+--permissions random geo-cages of a few hundred meters, flying for up to two hours over --days days around Bangalore,
+are loaded into the spatio-temporal index used by permission issuance. Checks of new operations are then timed
+against the index and against a scan of every active cage, and the time taken to add a permission to a loaded index
+is measured. The same permissions are then written to the benchmark database and permission_airspace.conflicts(),
+as called by permission issuance, is timed end to end: loading the index, checks when nothing changed and checks
+right after another permission was granted:
+
+    python -m benchmarks.bench_deconfliction --permissions 100000
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from shapely.geometry import box
+from shapely.prepared import prep
+
+from .utils import print_table, setup_django, summarize, time_calls
+
+LNG, LAT = 77.5946, 12.9716
+AREA_DEGREES = 0.5
+CAGE_DEGREES = 0.005
+
+
+def random_cage(rng, days):
+    lng = LNG + rng.uniform(-AREA_DEGREES, AREA_DEGREES)
+    lat = LAT + rng.uniform(-AREA_DEGREES, AREA_DEGREES)
+    start = rng.uniform(0, days * 86400)
+    return box(lng, lat, lng + rng.uniform(0.1, 1) * CAGE_DEGREES, lat + rng.uniform(0.1, 1) * CAGE_DEGREES), start, start + rng.uniform(600, 7200)
+
+
+def scan(cages, polygon, start, end):
+    prepared = prep(polygon)
+    return [key for key, (cage, cage_start, cage_end) in enumerate(cages) if cage_start < end and start < cage_end and prepared.intersects(cage)]
+
+
+def geo_cage(polygon):
+    return [{'lat': lat, 'lng': lng} for lng, lat in polygon.exterior.coords]
+
+
+def run_database(cages, queries, days, iterations, rng):
+    from gcs_operations.deconfliction import permission_airspace
+    from gcs_operations.models import FlightOperation, FlightPermission
+    from tests.gcs_objects import create_flight_operation
+
+    # The synthetic windows start at the epoch, they are moved to start now
+    base = datetime.now(timezone.utc)
+    template = create_flight_operation()
+    fields = dict(drone=template.drone, flight_plan=template.flight_plan, operator=template.operator, pilot=template.pilot)
+
+    def operations(windows):
+        return FlightOperation.objects.bulk_create([FlightOperation(start_datetime=base + timedelta(seconds=start), end_datetime=base + timedelta(seconds=end), **fields)
+                                                    for start, end in windows], batch_size=2000)
+
+    started = time.perf_counter()
+    granted = operations((start, end) for _, start, end in cages)
+    FlightPermission.objects.bulk_create([FlightPermission(operation=operation, status_code=FlightPermission.GRANTED, geo_cage=geo_cage(polygon))
+                                          for operation, (polygon, _, _) in zip(granted, cages)], batch_size=2000)
+    print('%d permissions written in %.2f s' % (len(cages), time.perf_counter() - started))
+
+    def conflicts(polygon, start, end):
+        return permission_airspace.conflicts(geo_cage(polygon), base + timedelta(seconds=start), base + timedelta(seconds=end))
+
+    queue = itertools.cycle(queries)
+    loaded = time_calls(lambda: (permission_airspace.reset(), conflicts(*next(queue))), 3, warmup=0)
+    unchanged = time_calls(lambda: conflicts(*next(queue)), iterations)
+
+    new_cages = [random_cage(rng, days) for _ in range(iterations)]
+    pending = iter(zip(operations((start, end) for _, start, end in new_cages), new_cages))
+    after_grant = []
+    for _ in range(iterations):
+        operation, (polygon, _, _) = next(pending)
+        FlightPermission(operation=operation, status_code=FlightPermission.GRANTED, geo_cage=geo_cage(polygon)).save()
+        started = time.perf_counter()
+        conflicts(*next(queue))
+        after_grant.append((time.perf_counter() - started) * 1000)
+
+    rows = [
+        ('load the index', summarize(loaded)),
+        ('check, nothing changed', summarize(unchanged)),
+        ('check after a grant', summarize(after_grant)),
+    ]
+    print_table('permission_airspace.conflicts()', rows)
+    return rows
+
+
+def run(permissions, days, iterations):
+    from gcs_operations.deconfliction import AirspaceIndex
+
+    rng = random.Random(42)
+    cages = [random_cage(rng, days) for _ in range(permissions)]
+    queries = [random_cage(rng, days) for _ in range(iterations)]
+
+    started = time.perf_counter()
+    index = AirspaceIndex()
+    for key, cage in enumerate(cages):
+        index.add(key, *cage)
+    added = time.perf_counter() - started
+    # The first query of every bucket builds its STRtree
+    started = time.perf_counter()
+    index.rebuild()
+    built = time.perf_counter() - started
+    print('%d permissions in %d time buckets, added in %.2f s, trees built in %.2f s' % (len(index), len(index.buckets), added, built))
+
+    for polygon, start, end in queries[:50]:
+        assert sorted(index.conflicts(polygon, start, end)) == scan(cages, polygon, start, end)
+
+    queue = iter(queries * 2)
+    new_keys = iter(range(permissions, permissions + iterations + 20))
+    rows = [
+        ('index', summarize(time_calls(lambda: index.conflicts(*next(queue)), iterations))),
+        ('scan every cage', summarize(time_calls(lambda: scan(cages, *next(queue)), max(1, iterations // 20), warmup=1))),
+        # Adds go to the pending lists until a bucket is rebuilt by a query
+        ('add a permission', summarize(time_calls(lambda: index.add(next(new_keys), *random_cage(rng, days)), iterations))),
+    ]
+    print_table('deconfliction check', rows)
+    return rows + run_database(cages, queries, days, iterations, rng)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--permissions', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args(argv)
+    teardown = setup_django()
+    try:
+        run(args.permissions, args.days, args.iterations)
+    finally:
+        teardown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Compare hashing a raw flight log by building the minified JSON string against the streaming canonical serializer.
+
+A synthetic log of about --size-mb megabytes of minified JSON is generated, then each approach is timed and its
+peak additional memory is measured with tracemalloc in a separate pass (tracemalloc slows the code down, so the
+timings are taken without it):
+
+    python -m benchmarks.bench_log_hashing --size-mb 100
+"""
+import argparse
+import gc
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+
+ROW_BYTES = 59  # minified size of one generated log entry, used to size the log
+
+
+def build_log(size_mb):
+    rows = int(size_mb * 1024 * 1024 / ROW_BYTES)
+    return {'permissionArtefact': 'benchmark', 'previousLogHash': '0' * 64,
+            'logEntries': [['POSITION', 1620000000 + i, 77.5946 + i * 1e-7, 12.9716 + i * 1e-7, 100.25, 0.5] for i in range(rows)]}
+
+
+def minified_digest(raw_log):
+    minified_raw_log = json.dumps(raw_log, separators=(',', ':'))
+    return hashlib.sha256(minified_raw_log.encode('utf-8').strip()).hexdigest()
+
+
+def streaming_digest(raw_log):
+    from common.canonical_json import json_digest
+    return json_digest(raw_log, separators=(',', ':'))
+
+
+def measure(fn, raw_log, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        digest = fn(raw_log)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn(raw_log)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return digest, min(timings), peak
+
+
+def run(size_mb, iterations):
+    raw_log = build_log(size_mb)
+    log_bytes = len(json.dumps(raw_log, separators=(',', ':')))
+    print('log: %d entries, %.1f MB minified' % (len(raw_log['logEntries']), log_bytes / 1024 / 1024))
+
+    results = {}
+    print('%-24s%12s%14s%16s' % ('approach', 'best (s)', 'MB/s', 'peak mem (MB)'))
+    for label, fn in (('json.dumps + sha256', minified_digest), ('streaming sha256', streaming_digest)):
+        digest, best, peak = measure(fn, raw_log, iterations)
+        results[label] = digest
+        print('%-24s%12.3f%14.1f%16.1f' % (label, best, log_bytes / 1024 / 1024 / best, peak / 1024 / 1024))
+
+    assert len(set(results.values())) == 1, results
+    print('digests identical: %s' % results['streaming sha256'])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=100)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args(argv)
+    run(args.size_mb, args.iterations)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
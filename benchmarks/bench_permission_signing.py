@@ -0,0 +1,70 @@
+"""
+Compare signing a flight permission locally with the Management Server key against the Flight Passport round trip.
+
+The remote path posts to the token endpoint of a local Passport stand-in, so the numbers are a lower bound for the
+real network round trip:
+
+    python -m benchmarks.bench_permission_signing --iterations 300
+"""
+import argparse
+import dataclasses
+import os
+import sys
+
+from .utils import print_table, setup_django, summarize, time_calls
+
+
+def run(iterations):
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+    from django.test import override_settings
+
+    from gcs_operations import data_signer
+    from gcs_operations.data_definitions import PermissionObject
+    from pki_framework.encrpytion_util import get_encryption_helper
+    from pki_framework.models import AerobridgeCredential
+    from pki_framework.signing_keys import signing_key_cache
+    from tests.passport_standin import PassportStandin
+
+    payload = dataclasses.asdict(PermissionObject(flight_plan_id='3b2d0a5e-97a4-4b29-9f36-8a4d4d3a8d1e',
+                                                  flight_operation_id='a3f7a3a8-1a52-4c55-8d2c-0d8e0f1b7a64',
+                                                  plan_file_hash='0' * 64))
+    private_keys = [('local RS256', rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+                    ('local ES256', ec.generate_private_key(ec.SECP256R1()))]
+
+    rows = []
+    with override_settings(CRYPTOGRAPHY_SALT=Fernet.generate_key().decode('utf-8')), PassportStandin() as standin:
+        os.environ.update({'FLIGHT_PASSPORT_PERMISSION_CLIENT_ID': 'benchmark', 'FLIGHT_PASSPORT_PERMISSION_CLIENT_SECRET': 'benchmark',
+                           'PASSPORT_URL': standin.url, 'PASSPORT_TOKEN_URL': '/oauth/token/'})
+        remote_signer = data_signer.SigningHelper()
+        rows.append(('passport round trip', summarize(time_calls(lambda: remote_signer.issue_jwt_permission(dict(payload)), iterations))))
+
+        for label, private_key in private_keys:
+            pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+            AerobridgeCredential.objects.filter(association=5).delete()
+            AerobridgeCredential.objects.create(name='Management Server Key', token_type=2, association=5,
+                                                token=get_encryption_helper().encrypt(pem))
+            signing_key_cache.invalidate()
+            local_signer = data_signer.LocalSigningHelper()
+            rows.append((label, summarize(time_calls(lambda: local_signer.issue_jwt_permission(dict(payload)), iterations))))
+
+    print_table('permission signing', rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    teardown = setup_django()
+    try:
+        run(args.iterations)
+    finally:
+        teardown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import os
+import statistics
+import sys
+import time
+
+
+def setup_django():
+    ''' Configure Django for a standalone benchmark run and return a function that tears the test database down '''
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aerobridge.settings')
+    os.environ.setdefault('DJANGO_SECRET', 'aerobridge-benchmarks')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+
+    def teardown():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return teardown
+
+
+def time_calls(fn, iterations, warmup=10):
+    ''' Call fn repeatedly and return the wall clock duration of every call in milliseconds '''
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(timings, pct):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(timings):
+    return {'p50': percentile(timings, 50), 'p90': percentile(timings, 90), 'p99': percentile(timings, 99),
+            'mean': statistics.mean(timings), 'n': len(timings)}
+
+
+def print_table(title, rows, columns=('p50', 'p90', 'p99', 'mean')):
+    ''' Print one row per (label, summary) pair with the latency columns in milliseconds '''
+    label_width = max([len(label) for label, _ in rows] + [len(title)])
+    print(title.ljust(label_width) + ''.join(('%s (ms)' % c).rjust(12) for c in columns))
+    for label, summary in rows:
+        print(label.ljust(label_width) + ''.join(('%.3f' % summary[c]).rjust(12) for c in columns))
+    print()
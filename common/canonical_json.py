@@ -0,0 +1,78 @@
+import hashlib
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+
+CONTAINERS = (dict, list, tuple)
+ROW_BATCH = 1000
+
+
+def _is_flat(items):
+    # True when every item is a list, tuple or dict of scalars, e.g. telemetry rows, so a batch of them is small enough to encode in one shot
+    values = set()
+    for item in items:
+        if type(item) is dict:
+            values.update(map(type, item.values()))
+        elif type(item) in (list, tuple):
+            values.update(map(type, item))
+        else:
+            return False
+    return not any(issubclass(value_type, CONTAINERS) for value_type in values)
+
+
+def _iter_json(value, encode, item_separator, key_separator):
+    # Containers of containers are walked so that no full serialization is built, everything else is encoded in one shot by the C encoder
+    if isinstance(value, dict) and value and all(isinstance(key, str) for key in value):
+        separator = '{'
+        for key, item in value.items():
+            yield separator + encode(key) + key_separator
+            yield from _iter_json(item, encode, item_separator, key_separator)
+            separator = item_separator
+        yield '}'
+    elif isinstance(value, CONTAINERS) and not isinstance(value, dict) and any(isinstance(item, CONTAINERS) for item in value):
+        separator = '['
+        for start in range(0, len(value), ROW_BATCH):
+            batch = list(value[start:start + ROW_BATCH])
+            if _is_flat(batch):
+                yield separator + encode(batch)[1:-1]
+                separator = item_separator
+                continue
+            for item in batch:
+                yield separator
+                yield from _iter_json(item, encode, item_separator, key_separator)
+                separator = item_separator
+        yield ']'
+    else:
+        yield encode(value)
+
+
+def iter_json(value, separators=(',', ':'), chunk_size=CHUNK_SIZE):
+    ''' Serialize value to JSON in chunks of about chunk_size characters, the concatenated chunks are identical to json.dumps(value, separators=separators) '''
+    encode = json.JSONEncoder(separators=separators).encode
+    item_separator, key_separator = separators
+    buffer, buffered = [], 0
+    for piece in _iter_json(value, encode, item_separator, key_separator):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def json_digest_and_size(value, separators=(',', ':')):
+    ''' SHA-256 hex digest and size in bytes of json.dumps(value, separators=separators) encoded as UTF-8, computed chunk by chunk without building the full string '''
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in iter_json(value, separators=separators):
+        encoded = chunk.encode('utf-8')
+        sha.update(encoded)
+        size += len(encoded)
+    return sha.hexdigest(), size
+
+
+def json_digest(value, separators=(',', ':')):
+    ''' SHA-256 hex digest of json.dumps(value, separators=separators) encoded as UTF-8 '''
+    return json_digest_and_size(value, separators)[0]
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import boto3
+import requests
+from botocore.config import Config
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    ''' Raised instead of calling an upstream whose circuit breaker is open '''
+    pass
+
+
+class CircuitBreaker():
+    ''' Opens after a number of consecutive failures and rejects calls until the reset timeout has passed, then lets a single trial call through to decide whether to close again '''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class UpstreamMetrics():
+    ''' Counts calls, errors and circuit breaker rejections of an upstream and keeps a window of recent latencies '''
+
+    def __init__(self, window=1000):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, error):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self._latencies.append(latency)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls, errors, rejected = self.calls, self.errors, self.rejected
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))] * 1000, 3)
+
+        return {'calls': calls, 'errors': errors, 'rejected': rejected,
+                'latency_ms': {'p50': percentile(50), 'p95': percentile(95), 'max': percentile(100)}}
+
+
+class UpstreamClient():
+    ''' A pooled, keep-alive requests session for one upstream with default timeouts, retries with backoff, a circuit breaker and metrics. Connection errors are retried for every method, error responses only for idempotent methods. '''
+
+    def __init__(self, name, timeout=10, retries=3, backoff_factor=0.5, pool_maxsize=10, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.metrics = UpstreamMetrics()
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def call(self, fn, *args, **kwargs):
+        ''' Call fn through the circuit breaker and record its latency, an exception or a 5xx response count as a failure '''
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpenError("Circuit breaker for %s is open" % self.name)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, error=True)
+            self.breaker.record_failure()
+            raise
+        failed = isinstance(result, requests.Response) and result.status_code >= 500
+        self.metrics.record(time.perf_counter() - start, error=failed)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.call(self.session.request, method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_upstream(name):
+    ''' Return the process wide client of an upstream, options come from UPSTREAM_HTTP_DEFAULTS overridden by UPSTREAM_HTTP[name] '''
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                options = dict(settings.UPSTREAM_HTTP_DEFAULTS)
+                options.update(settings.UPSTREAM_HTTP.get(name, {}))
+                client = _clients[name] = UpstreamClient(name, **options)
+    return client
+
+
+def reset_upstreams():
+    ''' Close and forget every client, e.g. after changing the upstream settings '''
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _s3_clients.clear()
+
+
+def upstream_metrics():
+    return {name: dict(client.metrics.snapshot(), circuit=client.breaker.state) for name, client in list(_clients.items())}
+
+
+_s3_clients = {}
+
+
+def get_s3_client(region_name, endpoint_url, aws_access_key_id, aws_secret_access_key):
+    ''' Return a cached, thread safe boto3 S3 client with a connection pool, timeouts and retries, one client is built per set of credentials '''
+    key = (region_name, endpoint_url, aws_access_key_id, aws_secret_access_key)
+    s3 = _s3_clients.get(key)
+    if s3 is None:
+        with _clients_lock:
+            s3 = _s3_clients.get(key)
+            if s3 is None:
+                options = dict(settings.UPSTREAM_HTTP_DEFAULTS)
+                options.update(settings.UPSTREAM_HTTP.get('s3', {}))
+                config = Config(connect_timeout=options['timeout'], read_timeout=options['timeout'], max_pool_connections=options['pool_maxsize'],
+                                retries={'max_attempts': options['retries'] + 1, 'mode': 'standard'})
+                s3 = _s3_clients[key] = boto3.client('s3', region_name=region_name, endpoint_url=endpoint_url, aws_access_key_id=aws_access_key_id,
+                                                     aws_secret_access_key=aws_secret_access_key, config=config)
+    return s3
@@ -3,10 +3,11 @@ from celery.decorators import task
 from gcs_operations.models import FlightPermission, Transaction, FlightLog
 from digitalsky_provider.models import DigitalSkyLog
 from .utils import ArtefactRequest, FlightLogPayload
+from common.http_client import get_upstream
 import os
 import uuid
 from io import BytesIO
-import json, requests
+import json
 import datetime
 from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())
@@ -30,7 +31,7 @@ def submit_flight_permission(permission_id):
 
         securl = os.getenv('DIGITAL_SKY_URL')  + 'digital-sky/public/rpa/permissionArtifact'
         
-        r = requests.post(securl, json=payload, headers=headers)
+        r = get_upstream('digitalsky').post(securl, json=payload, headers=headers)
 
         now = datetime.datetime.now()
         permission_response = json.loads(r.text)
@@ -56,7 +57,7 @@ def submit_flight_log(flight_log_id):
     permission_artefact_id = permission.id # get the id of the permission artefact TODO: This is not clear but can be the ID provided by DigitalSky
     signed_log_url = flight_log.signed_log # Get the URl of the signed log 
     
-    log_response = requests.get(signed_log_url)
+    log_response = get_upstream('digitalsky').get(signed_log_url)
     if log_response.status == 200:
         flight_log_file = BytesIO(log_response.read())
         flight_log_file.seek(0, os.SEEK_END)
@@ -72,7 +73,7 @@ def submit_flight_log(flight_log_id):
         t = Transaction(drone = drone, prefix="log_upload")
         t.save()
 
-        r = requests.post(securl, data=payload)
+        r = get_upstream('digitalsky').post(securl, data=payload)
         now = datetime.datetime.now()
         flight_log_upload_response = json.loads(r.text)
         if flight_log_upload_response.status_code == 201:
@@ -1,16 +1,15 @@
-from django.utils.decorators import method_decorator
 from rest_framework import generics
 from rest_framework import mixins
 
-from pki_framework.utils import requires_scopes
 from .models import DigitalSkyLog
 # Create your views here.
 from .serializers import DigitalSkyLogSerializer
 
 
-# @method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 # class LogList(mixins.ListModelMixin,
 #               generics.GenericAPIView):
+#     required_scopes = ['aerobridge.read']
+#
 #     queryset = DigitalSkyLog.objects.all()
 #     serializer_class = DigitalSkyLogSerializer
 #
@@ -18,9 +17,10 @@ from .serializers import DigitalSkyLogSerializer
 #         return self.list(request, *args, **kwargs)
 #
 #
-# @method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 # class LogDetail(mixins.RetrieveModelMixin,
 #                 generics.GenericAPIView):
+#     required_scopes = ['aerobridge.read']
+#
 #     queryset = DigitalSkyLog.objects.all()
 #     serializer_class = DigitalSkyLogSerializer
 #
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class GcsOperationsConfig(AppConfig):
     name = 'gcs_operations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from shapely import vectorized
+from shapely.geometry import Polygon
+from shapely.prepared import prep
+
+from . import telemetry
+from .models import FlightLog, FlightLogTelemetry, FlightPermission
+
+EARTH_RADIUS_METERS = 6371008.8
+CONFORMANCE_COLUMNS = ['timestamp', 'latitude', 'longitude']
+# Points closer than this to the boundary are on it, this absorbs the rounding of the projection
+BOUNDARY_EPSILON_METERS = 1e-6
+
+
+class GeoCage:
+    ''' A geo-cage stored on a FlightPermission (a ring of lat / lng dicts), projected to meters around its centroid so that containment and excursion distances can be computed for many points at once. The projection is equirectangular, which is accurate for cages of a few kilometers. '''
+
+    def __init__(self, geo_cage):
+        if not isinstance(geo_cage, list) or len(geo_cage) < 3:
+            raise ValueError("The geo-cage needs at least three points")
+        lat = np.array([float(point['lat']) for point in geo_cage])
+        lng = np.array([float(point['lng']) for point in geo_cage])
+        self.origin_lat = float(lat.mean())
+        self.origin_lng = float(lng.mean())
+        self.meters_per_degree_lat = math.radians(1) * EARTH_RADIUS_METERS
+        self.meters_per_degree_lng = self.meters_per_degree_lat * math.cos(math.radians(self.origin_lat))
+
+        x, y = self.project(lat, lng)
+        self.polygon = Polygon(zip(x, y))
+        if not self.polygon.is_valid or self.polygon.area == 0:
+            raise ValueError("The geo-cage is not a valid polygon")
+        self.prepared = prep(self.polygon)
+        ring = np.asarray(self.polygon.exterior.coords)
+        self.edge_starts = ring[:-1]
+        self.edge_vectors = ring[1:] - ring[:-1]
+
+    def project(self, latitudes, longitudes):
+        return (np.asarray(longitudes) - self.origin_lng) * self.meters_per_degree_lng, (np.asarray(latitudes) - self.origin_lat) * self.meters_per_degree_lat
+
+    def distances_to_boundary(self, x, y):
+        ''' Distance in meters from every point to the nearest edge of the cage '''
+        nearest = np.full(x.shape, np.inf)
+        for (sx, sy), (dx, dy) in zip(self.edge_starts, self.edge_vectors):
+            length = dx * dx + dy * dy
+            t = np.clip(((x - sx) * dx + (y - sy) * dy) / length, 0, 1) if length else 0
+            np.minimum(nearest, np.hypot(x - (sx + t * dx), y - (sy + t * dy)), out=nearest)
+        return nearest
+
+    def excursions(self, latitudes, longitudes):
+        ''' Distance in meters outside the cage of every point, 0 for points inside or on the boundary and NaN for points without a position '''
+        x, y = self.project(latitudes, longitudes)
+        excursion = np.zeros(x.shape)
+        positioned = np.isfinite(x) & np.isfinite(y)
+        excursion[~positioned] = np.nan
+        outside = positioned.copy()
+        outside[positioned] = ~vectorized.contains(self.prepared, x[positioned], y[positioned])
+        excursion[outside] = self.distances_to_boundary(x[outside], y[outside])
+        excursion[excursion < BOUNDARY_EPSILON_METERS] = 0
+        return excursion
+
+
+def _timestamp(value):
+    return value if math.isfinite(value) else None
+
+
+def check(geo_cage, columns, tolerance=None):
+    ''' Check the telemetry columns of a flight against a GeoCage. A point breaches the cage when it is more than tolerance meters outside it, consecutive breaching points form one breach interval. '''
+    tolerance = settings.GEO_CAGE_CONFORMANCE_TOLERANCE if tolerance is None else tolerance
+    timestamps = np.asarray(columns['timestamp'], dtype=np.float64)
+    excursion = geo_cage.excursions(np.asarray(columns['latitude'], dtype=np.float64), np.asarray(columns['longitude'], dtype=np.float64))
+    breaching = excursion > tolerance
+
+    # Indexes where a run of breaching points starts and ends (exclusive)
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], breaching, [False])).astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    # Largest excursion of every interval in one pass, the points between intervals do not breach and are left out
+    peaks = np.maximum.reduceat(np.where(breaching, excursion, -np.inf), starts) if starts.size else np.empty(0)
+    breaches = [{
+        'start_index': start, 'end_index': end - 1, 'point_count': end - start,
+        'start_time': _timestamp(start_time), 'end_time': _timestamp(end_time), 'max_excursion_meters': peak,
+    } for start, end, start_time, end_time, peak in zip(starts.tolist(), ends.tolist(), timestamps[starts].tolist(), timestamps[ends - 1].tolist(), peaks.tolist())]
+
+    checked = np.isfinite(excursion)
+    return {
+        'conformant': not breaches,
+        'point_count': int(excursion.size),
+        'checked_points': int(checked.sum()),
+        'breaching_points': int(breaching.sum()),
+        'max_excursion_meters': float(excursion[checked].max()) if checked.any() else 0.0,
+        'breaches': breaches,
+    }
+
+
+def _geo_cages(operation_ids):
+    ''' GeoCage of the granted permission of every operation, None when the operation has no usable geo-cage '''
+    cages = {}
+    permissions = FlightPermission.objects.filter(operation_id__in=operation_ids, status_code=FlightPermission.GRANTED).values_list('operation_id', 'geo_cage')
+    for operation_id, geo_cage in permissions:
+        try:
+            cages[operation_id] = GeoCage(geo_cage)
+        except (ValueError, KeyError, TypeError):
+            cages[operation_id] = None
+    return cages
+
+
+def _results(flight_logs, tolerance):
+    ''' Check (flight_log_id, operation_id) pairs, the telemetry of the logs is loaded in batches '''
+    cages = _geo_cages({operation_id for _, operation_id in flight_logs})
+    operations = dict(flight_logs)
+    checkable = [flight_log_id for flight_log_id, operation_id in flight_logs if cages.get(operation_id)]
+    telemetry.ingest_missing(checkable)
+    results = {}
+    for flight_log_id, operation_id in flight_logs:
+        if operation_id not in cages:
+            results[flight_log_id] = {'flight_log': flight_log_id, 'operation': operation_id, 'conformant': None, 'message': "The operation has no granted permission"}
+        elif cages[operation_id] is None:
+            results[flight_log_id] = {'flight_log': flight_log_id, 'operation': operation_id, 'conformant': None, 'message': "The permission geo-cage is not a valid polygon"}
+
+    rows = FlightLogTelemetry.objects.filter(flight_log_id__in=checkable).values('flight_log_id', *CONFORMANCE_COLUMNS)
+    for row in rows.iterator(chunk_size=100):
+        flight_log_id = row['flight_log_id']
+        result = check(cages[operations[flight_log_id]], telemetry.decode_row(row, CONFORMANCE_COLUMNS), tolerance)
+        results[flight_log_id] = {'flight_log': flight_log_id, 'operation': operations[flight_log_id], **result}
+    return [results[flight_log_id] for flight_log_id, _ in flight_logs if flight_log_id in results]
+
+
+def check_flight_log(flight_log_id, tolerance=None):
+    ''' Conformance of one flight log with the geo-cage of its permission, raises FlightLog.DoesNotExist '''
+    flight_log = FlightLog.objects.values_list('id', 'operation_id').get(id=flight_log_id)
+    return _results([flight_log], tolerance)[0]
+
+
+def audit(start, end, tolerance=None):
+    ''' Conformance of every flight log whose operation started in [start, end) '''
+    flight_logs = FlightLog.objects.filter(operation__start_datetime__gte=start, operation__start_datetime__lt=end) \
+        .order_by('operation__start_datetime', 'created_at').values_list('id', 'operation_id')
+    return _results(list(flight_logs), tolerance)
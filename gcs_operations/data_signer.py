@@ -1,14 +1,24 @@
+import dataclasses
 import json
 import logging
 from enum import Enum
 from os import environ as env
+import time
+from django.conf import settings
 from django.core.signing import Signer
+import jwt
 import requests
-import hashlib
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
 from dotenv import load_dotenv, find_dotenv
 
-from gcs_operations.models import FlightLog, SignedFlightLog
+from common.http_client import get_upstream
+from gcs_operations.data_definitions import PermissionObject
+from gcs_operations.log_chain import GENESIS_HASH, chain_hash, chain_heads, raw_log_digest
+from gcs_operations.models import FlightLog, FlightOperation, FlightPlan, SignedFlightLog
+from registry.models import Aircraft
+from pki_framework.key_store import jwks_store, PublicKeyNotFound
+from pki_framework.signing_keys import signing_key_cache
 
 load_dotenv(find_dotenv())
 logger = logging.getLogger(__name__)
@@ -47,7 +57,11 @@ class SigningHelper():
             data_payload["client_id"] = self.token_client_id
             data_payload["client_secret"] = self.token_client_secret
             data_payload["grant_type"] = "client_credentials"
-            signed_json = requests.post(self.passport_url + self.token_url, data=data_payload)
+            try:
+                signed_json = get_upstream('passport').post(self.passport_url + self.token_url, data=data_payload)
+            except requests.exceptions.RequestException as e:
+                logger.error("Error in connecting to the Auth server: %s" % e)
+                return False
 
         if signed_json.status_code == 200:
             signed_json = signed_json.json()
@@ -69,65 +83,145 @@ class SigningHelper():
         signed_json = signer.sign_object(data_to_sign)
         return signed_json
 
-def signed_flight_log_exists(flight_log):
-    return SignedFlightLog.objects.filter(raw_flight_log=flight_log).exists()
+class LocalSigningHelper():
+    ''' A class to sign flight permissions as JWS with the Management Server private key stored in Aerobridge, without a round trip to Flight Passport '''
 
+    def issue_jwt_permission(self, data_payload):
+        ''' This is a method to issue a JWT token for a flight permision, the response mirrors the one of the Passport token endpoint '''
+        try:
+            signing_key = signing_key_cache.get_signing_key()
+        except Exception as e:
+            logger.error("Management Server signing key could not be loaded %s" % e)
+            return False
 
-def sign_log(flightlog_id):
-    status = DataSigningStatus.NOT_FOUND
-    try:
+        now = int(time.time())
+        claims = dict(data_payload)
+        claims.update({"iss": settings.LOCAL_PERMISSION_ISSUER, "iat": now, "exp": now + settings.LOCAL_PERMISSION_TOKEN_LIFETIME})
+        access_token = jwt.encode(claims, signing_key.private_key, algorithm=signing_key.algorithm, headers={"kid": signing_key.kid})
+        return {"access_token": access_token, "token_type": "JWS", "expires_in": settings.LOCAL_PERMISSION_TOKEN_LIFETIME}
 
-        flight_log = FlightLog.objects.get(id=flightlog_id)
-    except ObjectDoesNotExist as oe:
-        logger.warning("Flight Log Object Does not exist: %s" % oe)
-        return {"status": status, "signed_flight_log": None, "message": "Invalid Flight Log referenced in the request"}
 
-    sfl_exists = signed_flight_log_exists(flight_log=flight_log)
+def get_permission_signer():
+    ''' Return the signer configured by PERMISSION_SIGNING_MODE '''
+    if settings.PERMISSION_SIGNING_MODE == 'local':
+        return LocalSigningHelper()
+    return SigningHelper()
 
-    if sfl_exists:  # Signed flight log does not exist
-        signed_flight_log = SignedFlightLog.objects.get(raw_flight_log=flight_log)
-        status = DataSigningStatus.CONFLICT
-        return {"status": status, "signed_flight_log": signed_flight_log,
-                "message": "Signed flight log already exist for that operation"}
 
-    else:
+# Claims every permission token carries, a token without them, e.g. a pilot's API access token, is not a permission
+PERMISSION_CLAIMS = [field.name for field in dataclasses.fields(PermissionObject)]
 
-        # get the raw log
 
-        flight_operation = flight_log.operation
-        flight_plan = flight_operation.flight_plan
-        raw_log = flight_log.raw_log
+class PermissionTokenVerifier():
+    ''' A class to verify many permission tokens offline, signatures are checked against the cached Management Server key and the cached Flight Passport JWKS '''
 
-        minified_raw_log = json.dumps(raw_log, separators=(',', ':'))
-        # sign the log and create a hash from the private key
-        # IF log chaining is required
-        # hs = hashlib.sha256(minified_raw_log.encode('utf-8')).hexdigest()
-        # add signature to JSON
+    def __init__(self):
+        try:
+            self.signing_key = signing_key_cache.get_signing_key()
+        except Exception:
+            self.signing_key = None
 
-        my_signing_helper = SigningHelper()
+    def verify(self, token, flight_operation_id=None):
+        ''' Verify the signature, expiry, issuer, audience and permission claims of a permission token, and that it was issued for flight_operation_id when one is given. Returns a dict with the validity, an error message and the token claims '''
         try:
-            
-            sha_signature = hashlib.sha256(minified_raw_log.encode('utf-8').strip()).hexdigest()
-            json_to_sign = {"raw_log_id": str(flight_log.id), "digest": sha_signature.hexdigest()}
-            signed_data = my_signing_helper.sign_json(json_to_sign)
-            if signed_data is None:
-                raise Exception
-        except Exception as e:
-            logger.error("Error in signing JSON %s" % e)
-            status = DataSigningStatus.INVALID
-            return {"status": status, "signed_flight_log": None,
-                    "message": "Error in signing your log, please contact your administrator"}
-        else:
-            signed_log = raw_log
-
-            signed_log['signature'] = signed_data['signature']
-            sfl = SignedFlightLog(raw_flight_log=flight_log, signed_log=signed_log)
-            sfl.save()
-            flight_operation.is_editable = False
-            flight_operation.save()
-            flight_log.is_editable = False
-            flight_log.save()
-            flight_plan.is_editable = False
-            flight_plan.save()
-        status = DataSigningStatus.SUCCESSFUL
-        return {"status": status, "signed_flight_log": sfl, "message": "Successfully signed raw log"}
+            kid = jwt.get_unverified_header(token).get('kid')
+            if self.signing_key is not None and kid == self.signing_key.kid:
+                public_key, algorithms = self.signing_key.public_key, [self.signing_key.algorithm]
+                issuer, audience = settings.LOCAL_PERMISSION_ISSUER, None
+            else:
+                public_key, algorithms = jwks_store.get_key(kid), ['RS256']
+                issuer, audience = 'https://{}/'.format(env.get('PASSPORT_DOMAIN')), settings.PERMISSION_TOKEN_AUDIENCE or None
+            claims = jwt.decode(token, public_key, algorithms=algorithms, issuer=issuer, audience=audience,
+                                options={'verify_aud': audience is not None, 'require': ['exp', 'iss'] + PERMISSION_CLAIMS})
+        except PublicKeyNotFound:
+            return {"valid": False, "error": "Token signed by an unknown key", "claims": None}
+        except jwt.ExpiredSignatureError:
+            return {"valid": False, "error": "Token Signature has expired", "claims": None}
+        except jwt.InvalidSignatureError:
+            return {"valid": False, "error": "Invalid signature in token", "claims": None}
+        except (jwt.InvalidIssuerError, jwt.InvalidAudienceError, jwt.MissingRequiredClaimError):
+            return {"valid": False, "error": "Token is not a flight permission", "claims": None}
+        except Exception:
+            return {"valid": False, "error": "Invalid token", "claims": None}
+        if flight_operation_id is not None and str(claims['flight_operation_id']) != str(flight_operation_id):
+            return {"valid": False, "error": "Token was issued for another operation", "claims": None}
+        return {"valid": True, "error": None, "claims": claims}
+
+
+def signed_flight_log_exists(flight_log):
+    return SignedFlightLog.objects.filter(raw_flight_log=flight_log).exists()
+
+
+def build_signed_flight_log(flight_log, signing_helper, previous_log_hash=GENESIS_HASH, sequence=1):
+    ''' Sign the raw log of a flight log in memory, chained to the previous signed log of the aircraft, and return an unsaved SignedFlightLog '''
+    raw_log = flight_log.raw_log
+    digest = raw_log_digest(raw_log)
+    json_to_sign = {"raw_log_id": str(flight_log.id), "digest": digest, "previous_log_hash": previous_log_hash}
+    signed_data = signing_helper.sign_json(json_to_sign)
+    if signed_data is None:
+        raise ValueError("No signature returned for flight log %s" % flight_log.id)
+
+    signed_log = dict(raw_log)
+    signed_log['signature'] = signed_data
+    signed_log = json.dumps(signed_log)
+    # json.dumps escapes non ASCII characters, so the length is the size in bytes
+    return SignedFlightLog(raw_flight_log=flight_log, signed_log=signed_log, signed_log_size=len(signed_log), aircraft_id=flight_log.operation.drone_id,
+                           sequence=sequence, raw_log_digest=digest, previous_log_hash=previous_log_hash, chain_hash=chain_hash(previous_log_hash, digest))
+
+
+def sign_logs(flightlog_ids):
+    ''' Sign many flight logs at once. The logs are fetched and locked in one query, chained to the latest signed log of their aircraft, signed in memory and the signed logs and is_editable flags are written with bulk queries in a single transaction. Returns a dict of flight log id to the same status / signed_flight_log / message dict as sign_log '''
+    flightlog_ids = list(dict.fromkeys(str(flightlog_id) for flightlog_id in flightlog_ids))
+    results = {}
+    my_signing_helper = SigningHelper()
+    now = timezone.now()
+
+    with transaction.atomic():
+        flight_logs = FlightLog.objects.select_for_update(of=('self',)).select_related('operation__flight_plan', 'raw_flight_log').filter(id__in=flightlog_ids)
+        flight_logs = {str(flight_log.id): flight_log for flight_log in flight_logs}
+        # Lock the aircraft so that concurrent batches append to each log chain one after the other
+        aircraft_ids = list(Aircraft.objects.select_for_update().filter(id__in={flight_log.operation.drone_id for flight_log in flight_logs.values()}).values_list('id', flat=True))
+        heads = chain_heads(aircraft_ids)
+
+        signed_flight_logs = []
+        for flightlog_id in flightlog_ids:
+            flight_log = flight_logs.get(flightlog_id)
+            if flight_log is None:
+                results[flightlog_id] = {"status": DataSigningStatus.NOT_FOUND, "signed_flight_log": None, "message": "Invalid Flight Log referenced in the request"}
+                continue
+            try:
+                results[flightlog_id] = {"status": DataSigningStatus.CONFLICT, "signed_flight_log": flight_log.raw_flight_log,
+                                         "message": "Signed flight log already exist for that operation"}
+                continue
+            except SignedFlightLog.DoesNotExist:
+                pass
+            try:
+                sequence, previous_log_hash = heads.get(flight_log.operation.drone_id, (0, GENESIS_HASH))
+                sfl = build_signed_flight_log(flight_log, my_signing_helper, previous_log_hash=previous_log_hash, sequence=sequence + 1)
+            except Exception as e:
+                logger.error("Error in signing JSON %s" % e)
+                results[flightlog_id] = {"status": DataSigningStatus.INVALID, "signed_flight_log": None,
+                                         "message": "Error in signing your log, please contact your administrator"}
+                continue
+            signed_flight_logs.append(sfl)
+            heads[sfl.aircraft_id] = (sfl.sequence, sfl.chain_hash)
+            results[flightlog_id] = {"status": DataSigningStatus.SUCCESSFUL, "signed_flight_log": sfl, "message": "Successfully signed raw log"}
+
+        if signed_flight_logs:
+            SignedFlightLog.objects.bulk_create(signed_flight_logs)
+            # bulk_update does not touch auto_now fields, updated_at is set explicitly
+            signed_logs = [sfl.raw_flight_log for sfl in signed_flight_logs]
+            operations = list({flight_log.operation_id: flight_log.operation for flight_log in signed_logs}.values())
+            plans = list({operation.flight_plan_id: operation.flight_plan for operation in operations}.values())
+            for obj in signed_logs + operations + plans:
+                obj.is_editable = False
+                obj.updated_at = now
+            FlightLog.objects.bulk_update(signed_logs, ['is_editable', 'updated_at'])
+            FlightOperation.objects.bulk_update(operations, ['is_editable', 'updated_at'])
+            FlightPlan.objects.bulk_update(plans, ['is_editable', 'updated_at'])
+
+    return results
+
+
+def sign_log(flightlog_id):
+    return sign_logs([flightlog_id])[str(flightlog_id)]
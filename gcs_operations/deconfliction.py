@@ -0,0 +1,232 @@
+import logging
+import math
+import threading
+import warnings
+
+from django.conf import settings
+from django.utils import timezone
+from shapely.errors import ShapelyDeprecationWarning
+from shapely.geometry import Polygon
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+from .models import AirspaceSequence, FlightPermission
+
+logger = logging.getLogger(__name__)
+
+
+def cage_polygon(geo_cage):
+    ''' Polygon in lng / lat of a geo-cage stored as a ring of lat / lng dicts '''
+    return Polygon([(float(point['lng']), float(point['lat'])) for point in geo_cage])
+
+
+class _Entry:
+    __slots__ = ('key', 'polygon', 'bounds', 'start', 'end')
+
+    def __init__(self, key, polygon, start, end):
+        self.key = key
+        self.polygon = polygon
+        # Shapely builds the envelope geometry on every access, it is kept once a query checks the entry while it is pending
+        self.bounds = None
+        self.start = start
+        self.end = end
+
+
+class _Bucket:
+    ''' The entries whose time window overlaps one time bucket. Entries are indexed in an STRtree, entries added since it was built are kept in a short pending list that is scanned, and removed entries are skipped until the tree is rebuilt. '''
+
+    def __init__(self):
+        self.entries = {}
+        self.tree = None
+        self.tree_entries = []
+        self.pending = []
+        self.removed = set()
+
+    def add(self, entry):
+        self.entries[entry.key] = entry
+        self.removed.discard(entry.key)
+        self.pending.append(entry)
+
+    def remove(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.removed.add(key)
+
+    def rebuild(self):
+        self.tree_entries = list(self.entries.values())
+        with warnings.catch_warnings():
+            # Shapely 1.8 warns about the 2.0 API on every STRtree, the index based query used here works on both
+            warnings.simplefilter('ignore', ShapelyDeprecationWarning)
+            self.tree = STRtree([entry.polygon for entry in self.tree_entries]) if self.tree_entries else None
+        self.pending = []
+        self.removed = set()
+
+    def candidates(self, polygon, rebuild_threshold):
+        if len(self.pending) > rebuild_threshold or len(self.removed) > rebuild_threshold:
+            self.rebuild()
+        if self.tree is not None:
+            query = getattr(self.tree, 'query_items', self.tree.query)
+            for index in query(polygon):
+                entry = self.tree_entries[index]
+                if entry.key not in self.removed and self.entries.get(entry.key) is entry:
+                    yield entry
+        bounds = polygon.bounds
+        for entry in self.pending:
+            if self.entries.get(entry.key) is not entry:
+                continue
+            if entry.bounds is None:
+                entry.bounds = entry.polygon.bounds
+            minx, miny, maxx, maxy = entry.bounds
+            if minx <= bounds[2] and bounds[0] <= maxx and miny <= bounds[3] and bounds[1] <= maxy:
+                yield entry
+
+
+class AirspaceIndex:
+    ''' A spatio-temporal index of geo-cages. Every entry is put in the time buckets its [start, end) window overlaps, a query only looks at the buckets of its own window and at the cages whose bounding boxes overlap in their STRtrees, then checks the time windows and the exact geometries. Entries are added and removed one at a time. '''
+
+    def __init__(self, bucket_seconds=3600, rebuild_threshold=64):
+        self.bucket_seconds = bucket_seconds
+        self.rebuild_threshold = rebuild_threshold
+        self.buckets = {}
+        self.entry_buckets = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entry_buckets)
+
+    def __contains__(self, key):
+        return key in self.entry_buckets
+
+    def _bucket_range(self, start, end):
+        first = math.floor(start / self.bucket_seconds)
+        last = max(first, math.ceil(end / self.bucket_seconds) - 1)
+        return range(first, last + 1)
+
+    def add(self, key, polygon, start, end):
+        ''' Add or replace the cage of key, start and end are POSIX timestamps '''
+        entry = _Entry(key, polygon, start, end)
+        with self.lock:
+            self.remove(key)
+            bucket_ids = self._bucket_range(start, end)
+            for bucket_id in bucket_ids:
+                self.buckets.setdefault(bucket_id, _Bucket()).add(entry)
+            self.entry_buckets[key] = bucket_ids
+
+    def remove(self, key):
+        with self.lock:
+            for bucket_id in self.entry_buckets.pop(key, ()):
+                bucket = self.buckets.get(bucket_id)
+                if bucket is not None:
+                    bucket.remove(key)
+                    if not bucket.entries:
+                        del self.buckets[bucket_id]
+
+    def rebuild(self):
+        ''' Build the STRtree of every bucket now instead of on the first query of each bucket '''
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.rebuild()
+
+    def prune(self, before):
+        ''' Drop every entry whose window ended before the timestamp before '''
+        with self.lock:
+            expired = [key for key, bucket_ids in self.entry_buckets.items() if bucket_ids.stop * self.bucket_seconds <= before]
+            for key in expired:
+                self.remove(key)
+        return len(expired)
+
+    def conflicts(self, polygon, start, end, exclude=None):
+        ''' Keys of the entries whose window overlaps [start, end) and whose cage intersects polygon '''
+        prepared = prep(polygon)
+        found = []
+        seen = set()
+        with self.lock:
+            for bucket_id in self._bucket_range(start, end):
+                bucket = self.buckets.get(bucket_id)
+                if bucket is None:
+                    continue
+                for entry in bucket.candidates(polygon, self.rebuild_threshold):
+                    if entry.key in seen or entry.key == exclude:
+                        continue
+                    seen.add(entry.key)
+                    if entry.start < end and start < entry.end and prepared.intersects(entry.polygon):
+                        found.append(entry.key)
+        return found
+
+
+class PermissionAirspace:
+    ''' The AirspaceIndex of the geo-cages of granted permissions whose operation has not ended. It is loaded from the database on first use and, before every check, synced with the permissions whose airspace sequence is above the last one seen, which takes a single primary key read when nothing changed. Deleted permissions are removed by a signal in this process, elsewhere they stay until their operation ends. '''
+
+    def __init__(self):
+        self.index = None
+        self.sequence = None
+        self.pruned_at = None
+        self.lock = threading.Lock()
+
+    def _permissions(self, after_sequence=None):
+        permissions = FlightPermission.objects.values_list(
+            'id', 'status_code', 'geo_cage', 'operation__start_datetime', 'operation__end_datetime')
+        if after_sequence is not None:
+            permissions = permissions.filter(airspace_sequence__gt=after_sequence)
+        else:
+            permissions = permissions.filter(status_code=FlightPermission.GRANTED, operation__end_datetime__gt=timezone.now())
+        return permissions.iterator(chunk_size=2000)
+
+    def _apply(self, row):
+        key, status_code, geo_cage, start_datetime, end_datetime = row
+        if status_code != FlightPermission.GRANTED or not geo_cage:
+            self.index.remove(key)
+            return
+        try:
+            polygon = cage_polygon(geo_cage)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Permission %s has an unusable geo-cage and is not deconflicted: %s" % (key, e))
+            self.index.remove(key)
+            return
+        self.index.add(key, polygon, start_datetime.timestamp(), end_datetime.timestamp())
+
+    def sync(self):
+        ''' Load the index, or apply the permissions changed since the last sync '''
+        with self.lock:
+            now = timezone.now().timestamp()
+            # Changes are committed in sequence order, every change up to the value read here is visible to the query that follows
+            sequence = AirspaceSequence.current()
+            if self.index is None:
+                self.index = AirspaceIndex(settings.AIRSPACE_INDEX_BUCKET_SECONDS)
+                for row in self._permissions():
+                    self._apply(row)
+                # Every bucket is full of pending entries, the checks that follow should not each pay for a tree
+                self.index.rebuild()
+            elif sequence != self.sequence:
+                for row in self._permissions(self.sequence):
+                    self._apply(row)
+            self.sequence = sequence
+            # Ended operations never conflict, they are dropped once per time bucket to keep the index small
+            if self.pruned_at is None or now - self.pruned_at >= self.index.bucket_seconds:
+                self.index.prune(now)
+                self.pruned_at = now
+        return self.index
+
+    def remove(self, flight_permission_id):
+        if self.index is not None:
+            with self.lock:
+                self.index.remove(flight_permission_id)
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+            self.sequence = None
+            self.pruned_at = None
+
+    def conflicts(self, geo_cage, start_datetime, end_datetime, exclude=None):
+        ''' Ids of the granted permissions whose geo-cage and time window overlap those of a new operation '''
+        index = self.sync()
+        return index.conflicts(cage_polygon(geo_cage), start_datetime.timestamp(), end_datetime.timestamp(), exclude=exclude)
+
+
+permission_airspace = PermissionAirspace()
+
+
+def lock_airspace():
+    ''' Hold the airspace lock until the current transaction commits. An issuance takes it after its optimistic check, checks again and saves its permission before releasing it, so two processes never both grant overlapping operations. '''
+    # The counter is not advanced, a sync made under the lock must not skip changes should this transaction roll back
+    AirspaceSequence.advance(step=0)
@@ -0,0 +1,50 @@
+import logging
+from dataclasses import asdict
+
+from shapely.geometry import shape
+from shapely.ops import unary_union
+
+from common.canonical_json import json_digest
+from .data_definitions import LatLng
+from .models import FlightPlan
+
+logger = logging.getLogger(__name__)
+
+
+def plan_file_digest(plan_file_json):
+    ''' The plan_file_hash that is signed into a flight permission '''
+    return json_digest(plan_file_json, separators=(', ', ': '))
+
+
+def build_geo_cage(geo_json):
+    ''' The minimum rotated rectangle around every feature of the plan GeoJSON, as a ring of lat / lng dicts '''
+    shp_features = [shape(feature['geometry']) for feature in geo_json['features']]
+    geo_cage = unary_union(shp_features).minimum_rotated_rectangle
+    return [asdict(LatLng(lat=float(coord[1]), lng=float(coord[0]))) for coord in geo_cage.exterior.coords]
+
+
+def refresh_plan_digests(flight_plan):
+    ''' Update the content digests of a flight plan before it is saved. The geo-cage is only rebuilt when the GeoJSON content changed, and is copied from any plan with the same content instead of being computed again. '''
+    digest = json_digest(flight_plan.geo_json)
+    if digest != flight_plan.geo_json_digest or flight_plan.geo_cage is None:
+        flight_plan.geo_json_digest = digest
+        flight_plan.geo_cage = FlightPlan.objects.filter(geo_json_digest=digest, geo_cage__isnull=False).exclude(id=flight_plan.id) \
+            .values_list('geo_cage', flat=True).first()
+        if flight_plan.geo_cage is None and isinstance(flight_plan.geo_json, dict) and flight_plan.geo_json.get('features'):
+            try:
+                flight_plan.geo_cage = build_geo_cage(flight_plan.geo_json)
+            except Exception as e:
+                # A plan without usable geometry can still be saved, issuing a permission for it fails in plan_geo_cage
+                logger.warning("No geo-cage could be built for flight plan %s: %s" % (flight_plan.id, e))
+    flight_plan.plan_file_digest = plan_file_digest(flight_plan.plan_file_json)
+
+
+def plan_geo_cage(flight_plan):
+    ''' Return the geo-cage and plan file digest of a flight plan. They are kept up to date when the plan is saved, plans saved before they were stored get them computed and stored on first use. '''
+    if flight_plan.geo_cage is None or not flight_plan.plan_file_digest:
+        refresh_plan_digests(flight_plan)
+        if flight_plan.geo_cage is None:
+            flight_plan.geo_cage = build_geo_cage(flight_plan.geo_json)
+        FlightPlan.objects.filter(id=flight_plan.id).update(geo_json_digest=flight_plan.geo_json_digest, geo_cage=flight_plan.geo_cage,
+                                                             plan_file_digest=flight_plan.plan_file_digest)
+    return flight_plan.geo_cage, flight_plan.plan_file_digest
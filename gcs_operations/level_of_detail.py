@@ -0,0 +1,94 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from shapely.geometry import LineString, mapping, shape
+
+from . import telemetry
+from .models import FlightLog, FlightLogTelemetry, FlightPlan
+
+TILE_SIZE = 256
+MAX_ZOOM = 22
+
+
+def clamp_zoom(zoom):
+    return max(0, min(MAX_ZOOM, int(zoom)))
+
+
+def tolerance(zoom):
+    ''' Width in degrees of one map pixel at the equator at a web map zoom level, detail smaller than this cannot be seen '''
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def simplify_line(coordinates, zoom):
+    ''' Douglas-Peucker simplification of a list of [lng, lat] points for a zoom level, the first and last points are always kept '''
+    if len(coordinates) < 3:
+        return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2).tolist()
+    simplified = LineString(coordinates).simplify(tolerance(zoom), preserve_topology=False)
+    return [list(point) for point in simplified.coords]
+
+
+def track_cache_key(flight_log_id, updated_at, zoom):
+    return 'gcs_operations:log_track:%s:%s:%d' % (flight_log_id, updated_at.timestamp(), zoom)
+
+
+def plan_cache_key(flight_plan_id, updated_at, zoom):
+    return 'gcs_operations:plan_geo_json:%s:%s:%d' % (flight_plan_id, updated_at.timestamp(), zoom)
+
+
+def precompute_tracks(flight_log_id, zooms=None):
+    ''' Simplify the track of a flight log for every zoom level (LEVEL_OF_DETAIL_ZOOM_LEVELS by default) from one read of its telemetry and cache the results, returns them keyed by zoom. Raises FlightLog.DoesNotExist. '''
+    zooms = [clamp_zoom(zoom) for zoom in (settings.LEVEL_OF_DETAIL_ZOOM_LEVELS if zooms is None else zooms)]
+    if not telemetry.ingest_missing([flight_log_id]):
+        raise FlightLog.DoesNotExist("No flight log %s" % flight_log_id)
+    row = FlightLogTelemetry.objects.filter(flight_log_id=flight_log_id).values('updated_at', 'latitude', 'longitude').get()
+    columns = telemetry.decode_row(row, ['latitude', 'longitude'])
+    coordinates = np.column_stack((np.asarray(columns['longitude']), np.asarray(columns['latitude'])))
+    coordinates = coordinates[np.isfinite(coordinates).all(axis=1)]
+
+    tracks = {}
+    for zoom in zooms:
+        tracks[zoom] = {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': simplify_line(coordinates, zoom)},
+                        'properties': {'flight_log': str(flight_log_id), 'zoom': zoom, 'point_count': len(coordinates)}}
+    cache.set_many({track_cache_key(flight_log_id, row['updated_at'], zoom): track for zoom, track in tracks.items()},
+                   settings.LEVEL_OF_DETAIL_CACHE_TTL)
+    return tracks
+
+
+def simplified_track(flight_log_id, zoom):
+    ''' The track of a flight log as a GeoJSON LineString feature simplified for a zoom level. Raises FlightLog.DoesNotExist. '''
+    zoom = clamp_zoom(zoom)
+    updated_at = FlightLogTelemetry.objects.filter(flight_log_id=flight_log_id).values_list('updated_at', flat=True).first()
+    track = cache.get(track_cache_key(flight_log_id, updated_at, zoom)) if updated_at else None
+    if track is None:
+        track = precompute_tracks(flight_log_id, [zoom])[zoom]
+    return track
+
+
+def simplify_geo_json(geo_json, zoom):
+    ''' Simplify every feature geometry of a GeoJSON FeatureCollection for a zoom level, polygons stay valid '''
+    features = []
+    for feature in geo_json.get('features', []):
+        simplified = dict(feature)
+        if feature.get('geometry'):
+            simplified['geometry'] = mapping(shape(feature['geometry']).simplify(tolerance(zoom), preserve_topology=True))
+        features.append(simplified)
+    return dict(geo_json, features=features)
+
+
+def precompute_plans(flight_plan, zooms=None):
+    ''' Simplify the GeoJSON of a flight plan for every zoom level and cache the results, returns them keyed by zoom '''
+    zooms = [clamp_zoom(zoom) for zoom in (settings.LEVEL_OF_DETAIL_ZOOM_LEVELS if zooms is None else zooms)]
+    geo_jsons = {zoom: simplify_geo_json(flight_plan.geo_json, zoom) for zoom in zooms}
+    cache.set_many({plan_cache_key(flight_plan.id, flight_plan.updated_at, zoom): geo_json for zoom, geo_json in geo_jsons.items()},
+                   settings.LEVEL_OF_DETAIL_CACHE_TTL)
+    return geo_jsons
+
+
+def simplified_plan(flight_plan_id, zoom):
+    ''' The GeoJSON of a flight plan simplified for a zoom level, the plan is only loaded when it is not cached. Raises FlightPlan.DoesNotExist. '''
+    zoom = clamp_zoom(zoom)
+    updated_at = FlightPlan.objects.values_list('updated_at', flat=True).get(id=flight_plan_id)
+    geo_json = cache.get(plan_cache_key(flight_plan_id, updated_at, zoom))
+    if geo_json is None:
+        geo_json = precompute_plans(FlightPlan.objects.only('id', 'geo_json', 'updated_at').get(id=flight_plan_id), [zoom])[zoom]
+    return geo_json
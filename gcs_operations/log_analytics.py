@@ -0,0 +1,87 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import telemetry
+from .models import FlightLogTelemetry
+
+EARTH_RADIUS_METERS = 6371008.8
+SUMMARY_COLUMNS = ['timestamp', 'latitude', 'longitude', 'altitude']
+# Bump when the summary fields change so that cached summaries are recomputed
+SUMMARY_VERSION = 1
+
+
+def haversine_distances(latitudes, longitudes):
+    ''' Great circle distance in meters between every pair of consecutive points '''
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def summarize(columns):
+    ''' Compute the summary of a flight from its telemetry columns, points without a position are left out of the track and missing values are ignored '''
+    timestamps = np.asarray(columns['timestamp'], dtype=np.float64)
+    latitudes = np.asarray(columns['latitude'], dtype=np.float64)
+    longitudes = np.asarray(columns['longitude'], dtype=np.float64)
+    altitudes = np.asarray(columns['altitude'], dtype=np.float64)
+
+    known_times = timestamps[np.isfinite(timestamps)]
+    known_altitudes = altitudes[np.isfinite(altitudes)]
+    positioned = np.isfinite(latitudes) & np.isfinite(longitudes)
+    lat, lon, times = latitudes[positioned], longitudes[positioned], timestamps[positioned]
+
+    distance = max_ground_speed = None
+    bounding_box = None
+    if lat.size:
+        bounding_box = [float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())]
+        steps = haversine_distances(lat, lon)
+        distance = float(steps.sum())
+        elapsed = np.diff(times)
+        timed = np.isfinite(elapsed) & (elapsed > 0)
+        if timed.any():
+            max_ground_speed = float((steps[timed] / elapsed[timed]).max())
+
+    return {
+        'point_count': int(timestamps.size),
+        'start_time': float(known_times.min()) if known_times.size else None,
+        'end_time': float(known_times.max()) if known_times.size else None,
+        'duration_seconds': float(known_times.max() - known_times.min()) if known_times.size else None,
+        'distance_meters': distance,
+        'max_altitude': float(known_altitudes.max()) if known_altitudes.size else None,
+        'min_altitude': float(known_altitudes.min()) if known_altitudes.size else None,
+        'max_ground_speed': max_ground_speed,
+        'bounding_box': bounding_box,
+    }
+
+
+def cache_key(flight_log_id, updated_at):
+    return 'gcs_operations:log_summary:%d:%s:%s' % (SUMMARY_VERSION, flight_log_id, updated_at.timestamp())
+
+
+def flight_log_summaries(flight_log_ids):
+    ''' Return the summary of every existing flight log in flight_log_ids keyed by id. Summaries are cached per version of the log telemetry, which is rebuilt whenever the log is saved, so a changed log is never served a stale summary. '''
+    versions = dict(FlightLogTelemetry.objects.filter(flight_log_id__in=flight_log_ids).values_list('flight_log_id', 'updated_at'))
+    if len(versions) < len(set(flight_log_ids)) and telemetry.ingest_missing(flight_log_ids) - set(versions):
+        versions = dict(FlightLogTelemetry.objects.filter(flight_log_id__in=flight_log_ids).values_list('flight_log_id', 'updated_at'))
+    keys = {flight_log_id: cache_key(flight_log_id, updated_at) for flight_log_id, updated_at in versions.items()}
+    cached = cache.get_many(keys.values())
+    summaries = {flight_log_id: cached[key] for flight_log_id, key in keys.items() if key in cached}
+
+    missing = [flight_log_id for flight_log_id in keys if flight_log_id not in summaries]
+    if missing:
+        computed = {}
+        rows = FlightLogTelemetry.objects.filter(flight_log_id__in=missing).values('flight_log_id', 'updated_at', *SUMMARY_COLUMNS)
+        for row in rows.iterator():
+            summary = summarize(telemetry.decode_row(row, SUMMARY_COLUMNS))
+            summaries[row['flight_log_id']] = summary
+            computed[cache_key(row['flight_log_id'], row['updated_at'])] = summary
+        cache.set_many(computed, settings.FLIGHT_LOG_SUMMARY_CACHE_TTL)
+    return summaries
+
+
+def flight_log_summary(flight_log_id):
+    ''' Return the summary of one flight log, None if it does not exist '''
+    return flight_log_summaries([flight_log_id]).get(flight_log_id)
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from common.canonical_json import json_digest
+
+from .models import FlightLogChainCheckpoint, SignedFlightLog
+
+GENESIS_HASH = '0' * 64
+
+
+def raw_log_digest(raw_log):
+    ''' SHA-256 of the minified raw log, this is the digest that is signed. The log is hashed while it is serialized so multi-hour logs are never held in memory as a string. '''
+    return json_digest(raw_log, separators=(',', ':'))
+
+
+def chain_hash(previous_log_hash, digest):
+    ''' Link a raw log digest to the chain hash of the previous signed log of the same aircraft '''
+    return hashlib.sha256((previous_log_hash + digest).encode('utf-8')).hexdigest()
+
+
+def chain_heads(aircraft_ids):
+    ''' Return a dict of aircraft id to (sequence, chain_hash) of the latest signed log of each aircraft, in one query '''
+    latest_sequence = SignedFlightLog.objects.filter(aircraft=OuterRef('aircraft')).order_by('-sequence').values('sequence')[:1]
+    heads = SignedFlightLog.objects.filter(aircraft_id__in=aircraft_ids, sequence=Subquery(latest_sequence)).values_list('aircraft_id', 'sequence', 'chain_hash')
+    return {aircraft_id: (sequence, head_hash) for aircraft_id, sequence, head_hash in heads}
+
+
+def verify_chain(aircraft_id, full=False):
+    ''' Verify the signed log chain of an aircraft. Verification resumes after the latest checkpoint and stores new checkpoints as it goes, full drops the checkpoints and rehashes the chain from the first log. '''
+    start_sequence, previous_log_hash = 0, GENESIS_HASH
+    if full:
+        FlightLogChainCheckpoint.objects.filter(aircraft_id=aircraft_id).delete()
+    else:
+        checkpoint = FlightLogChainCheckpoint.objects.filter(aircraft_id=aircraft_id).order_by('-sequence').first()
+        if checkpoint is not None:
+            stored_hash = SignedFlightLog.objects.filter(aircraft_id=aircraft_id, sequence=checkpoint.sequence).values_list('chain_hash', flat=True).first()
+            if stored_hash != checkpoint.chain_hash:
+                # A verified part of the chain was rewritten, only a full verification can tell where
+                return {"aircraft": str(aircraft_id), "valid": False, "resumed_from": checkpoint.sequence, "verified": 0, "verified_to": checkpoint.sequence,
+                        "head": checkpoint.chain_hash, "error": {"sequence": checkpoint.sequence, "signed_flight_log": None,
+                                                                 "message": "Signed log chain changed after it was verified"}}
+            start_sequence, previous_log_hash = checkpoint.sequence, checkpoint.chain_hash
+
+    entries = SignedFlightLog.objects.filter(aircraft_id=aircraft_id, sequence__gt=start_sequence).order_by('sequence') \
+        .values_list('id', 'sequence', 'previous_log_hash', 'raw_log_digest', 'chain_hash', 'raw_flight_log__raw_log')
+
+    interval = settings.FLIGHT_LOG_CHAIN_CHECKPOINT_INTERVAL
+    checkpoints = []
+    expected_sequence = start_sequence + 1
+    error = None
+    for signed_flight_log_id, sequence, entry_previous_hash, entry_digest, entry_chain_hash, raw_log in entries.iterator(chunk_size=500):
+        if sequence != expected_sequence:
+            error = "Signed log %d is missing from the chain" % expected_sequence
+        elif entry_previous_hash != previous_log_hash:
+            error = "Previous log hash does not match the chain"
+        elif raw_log_digest(raw_log) != entry_digest:
+            error = "Raw log does not match its signed digest"
+        elif chain_hash(previous_log_hash, entry_digest) != entry_chain_hash:
+            error = "Chain hash does not match the raw log digest"
+        if error:
+            error = {"sequence": sequence, "signed_flight_log": str(signed_flight_log_id), "message": error}
+            break
+        previous_log_hash = entry_chain_hash
+        if sequence % interval == 0:
+            checkpoints.append(FlightLogChainCheckpoint(aircraft_id=aircraft_id, sequence=sequence, chain_hash=entry_chain_hash))
+        expected_sequence += 1
+
+    verified_to = expected_sequence - 1
+    if verified_to > start_sequence and (not checkpoints or checkpoints[-1].sequence != verified_to):
+        checkpoints.append(FlightLogChainCheckpoint(aircraft_id=aircraft_id, sequence=verified_to, chain_hash=previous_log_hash))
+    if checkpoints:
+        FlightLogChainCheckpoint.objects.bulk_create(checkpoints, ignore_conflicts=True)
+
+    return {"aircraft": str(aircraft_id), "valid": error is None, "resumed_from": start_sequence,
+            "verified": verified_to - start_sequence, "verified_to": verified_to, "head": previous_log_hash, "error": error}
@@ -0,0 +1,68 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.db.models.functions import Coalesce, Length, Substr
+
+from .models import SignedFlightLog
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    ''' Raised when a Range header does not overlap the signed log '''
+
+
+def signed_log_info(signed_flight_log_id):
+    ''' Size and chain hash of a signed log without loading it, the size of logs signed before it was stored is computed by the database. Raises SignedFlightLog.DoesNotExist. '''
+    return SignedFlightLog.objects.filter(id=signed_flight_log_id).annotate(size=Coalesce('signed_log_size', Length('signed_log'))) \
+        .values('size', 'chain_hash').get()
+
+
+def parse_range(header, size):
+    ''' Parse a single byte range e.g. bytes=0-1023, bytes=1024- or bytes=-512 into inclusive (start, end), None when the header is missing or not a single byte range and should be ignored '''
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range, the last n bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def iter_signed_log(signed_flight_log_id, start, end, chunk_size=None):
+    ''' Yield the bytes start to end (inclusive) of a signed log. Every chunk is read from the database with its own substring query, so the whole log is never held in memory. Signed logs are ASCII JSON, so character positions are byte positions. '''
+    chunk_size = chunk_size or settings.SIGNED_LOG_DOWNLOAD_CHUNK_SIZE
+    position = start
+    while position <= end:
+        length = min(chunk_size, end - position + 1)
+        chunk = SignedFlightLog.objects.filter(id=signed_flight_log_id).annotate(chunk=Substr('signed_log', position + 1, length)) \
+            .values_list('chunk', flat=True).get()
+        if not chunk:
+            return
+        yield chunk.encode('utf-8')
+        position += length
+
+
+def gzip_chunks(chunks):
+    ''' Compress a stream of chunks into a gzip stream '''
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() == 'gzip':
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
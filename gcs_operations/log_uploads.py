@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import FlightLog, FlightLogUploadSession
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    ''' Raised when a chunk or a finalize request cannot be accepted, carries the HTTP status the view should answer with '''
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def upload_path(session_id):
+    return os.path.join(settings.FLIGHT_LOG_UPLOAD_DIR, '%s.part' % session_id)
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def write_chunk(session_id, index, stream, length, checksum):
+    ''' Append chunk index to the upload file, the chunk is read from the request stream in blocks and hashed as it is written. A retried chunk that was already acknowledged with the same checksum is accepted again without writing. Returns the updated session. '''
+    if length is None or length < 0:
+        raise UploadError("A Content-Length is required", 411)
+    if length > settings.FLIGHT_LOG_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError("Chunks can be at most %d bytes" % settings.FLIGHT_LOG_UPLOAD_MAX_CHUNK_SIZE, 413)
+    checksum = (checksum or '').lower()
+    if len(checksum) != 64:
+        raise UploadError("The X-Chunk-Sha256 header with the SHA-256 of the chunk is required")
+
+    with transaction.atomic():
+        # Serializes concurrent requests for the same session
+        session = FlightLogUploadSession.objects.select_for_update().get(id=session_id)
+        if session.status != FlightLogUploadSession.OPEN:
+            raise UploadError("Upload session is already finalized", 409)
+        if index < session.received_chunks:
+            if session.chunk_checksums[index] != checksum:
+                raise UploadError("Chunk %d was already acknowledged with a different checksum" % index, 409)
+            return session
+        if index != session.received_chunks:
+            raise UploadError("Expected chunk %d" % session.received_chunks, 409)
+        if session.total_chunks is not None and index >= session.total_chunks:
+            raise UploadError("The upload only has %d chunks" % session.total_chunks, 409)
+
+        path = upload_path(session.id)
+        os.makedirs(settings.FLIGHT_LOG_UPLOAD_DIR, exist_ok=True)
+        sha = hashlib.sha256()
+        with open(path, 'ab') as f:
+            # Drop whatever an interrupted request wrote after the last acknowledged chunk
+            f.truncate(session.received_bytes)
+            f.seek(session.received_bytes)
+            remaining = length
+            while remaining > 0:
+                block = stream.read(min(READ_SIZE, remaining))
+                if not block:
+                    break
+                f.write(block)
+                sha.update(block)
+                remaining -= len(block)
+            if remaining or sha.hexdigest() != checksum:
+                f.truncate(session.received_bytes)
+                raise UploadError("Chunk %d is incomplete or does not match its checksum" % index)
+
+        session.received_chunks += 1
+        session.received_bytes += length
+        session.chunk_checksums.append(checksum)
+        session.save(update_fields=['received_chunks', 'received_bytes', 'chunk_checksums', 'updated_at'])
+    return session
+
+
+def finalize(session_id):
+    ''' Check the assembled upload and create the FlightLog from it, returns the session with its flight_log '''
+    with transaction.atomic():
+        session = FlightLogUploadSession.objects.select_for_update().get(id=session_id)
+        if session.status != FlightLogUploadSession.OPEN:
+            raise UploadError("Upload session is already finalized", 409)
+        if session.total_chunks is not None and session.received_chunks != session.total_chunks:
+            raise UploadError("Received %d of %d chunks" % (session.received_chunks, session.total_chunks), 409)
+        path = upload_path(session.id)
+        if not session.received_chunks or not os.path.exists(path):
+            raise UploadError("No chunks were uploaded", 409)
+        if session.sha256 and file_sha256(path) != session.sha256.lower():
+            raise UploadError("The uploaded log does not match its SHA-256", 422)
+        try:
+            with open(path, 'rb') as f:
+                raw_log = json.load(f)
+        except ValueError as e:
+            raise UploadError("The uploaded log is not valid JSON: %s" % e, 422)
+
+        session.flight_log = FlightLog.objects.create(operation_id=session.operation_id, raw_log=raw_log)
+        session.status = FlightLogUploadSession.COMPLETED
+        session.save(update_fields=['flight_log', 'status', 'updated_at'])
+        transaction.on_commit(lambda: discard(session.id))
+    return session
+
+
+def discard(session_id):
+    try:
+        os.remove(upload_path(session_id))
+    except FileNotFoundError:
+        pass
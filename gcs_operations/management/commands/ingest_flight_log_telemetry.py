@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from gcs_operations import telemetry
+from gcs_operations.models import FlightLog
+
+
+class Command(BaseCommand):
+    help = 'Build the columnar telemetry of flight logs that do not have it yet, e.g. logs saved before the telemetry store existed or changed with queryset updates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the telemetry of every flight log')
+
+    def handle(self, *args, **options):
+        flight_logs = FlightLog.objects.all() if options['rebuild'] else \
+            FlightLog.objects.filter(Q(telemetry__isnull=True) | Q(telemetry__raw_log_digest=''))
+        built = failed = 0
+        for flight_log in flight_logs.only('id', 'raw_log').iterator(chunk_size=100):
+            try:
+                telemetry.ingest(flight_log)
+            except Exception as e:
+                failed += 1
+                self.stderr.write('Flight log %s could not be ingested: %s' % (flight_log.id, e))
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS('Built the telemetry of %d flight logs, %d failed' % (built, failed)))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from gcs_operations import permissions_issuer
+
+
+class Command(BaseCommand):
+    help = 'Issue the permissions of flight operations as they enter the issuance window, one hour before they start, so that the permission endpoint only looks them up. Several workers can run this at the same time, run it from cron or with --loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and scan for upcoming operations every --interval seconds')
+        parser.add_argument('--interval', type=int, default=settings.PERMISSION_PREISSUE_INTERVAL, help='Seconds between two scans with --loop')
+        parser.add_argument('--batch-size', type=int, default=settings.PERMISSION_PREISSUE_BATCH_SIZE, help='Number of operations claimed and issued at a time')
+
+    def run_once(self, batch_size):
+        try:
+            counts = permissions_issuer.preissue_permissions(batch_size=batch_size)
+        except Exception as e:
+            self.stderr.write('Permissions could not be pre-issued: %s' % e)
+            return
+        if counts or not self.loop:
+            summary = ', '.join('%d %s' % (count, status.lower()) for status, count in sorted(counts.items())) or 'no upcoming operations'
+            self.stdout.write(self.style.SUCCESS('Pre-issued permissions: %s' % summary))
+
+    def handle(self, *args, **options):
+        self.loop = options['loop']
+        while True:
+            self.run_once(options['batch_size'])
+            if not self.loop:
+                break
+            time.sleep(options['interval'])
+            # A long running worker must not keep a connection the database has dropped
+            close_old_connections()
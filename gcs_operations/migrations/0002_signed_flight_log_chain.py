@@ -0,0 +1,79 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import hashlib
+import json
+import uuid
+
+
+def chain_existing_signed_logs(apps, schema_editor):
+    ''' Chain the logs signed before chaining existed per aircraft in the order they were signed '''
+    SignedFlightLog = apps.get_model('gcs_operations', 'SignedFlightLog')
+    heads = {}
+    for signed_flight_log in SignedFlightLog.objects.select_related('raw_flight_log__operation').order_by('created_at').iterator():
+        aircraft_id = signed_flight_log.raw_flight_log.operation.drone_id
+        sequence, previous_log_hash = heads.get(aircraft_id, (0, '0' * 64))
+        minified_raw_log = json.dumps(signed_flight_log.raw_flight_log.raw_log, separators=(',', ':'))
+        digest = hashlib.sha256(minified_raw_log.encode('utf-8').strip()).hexdigest()
+        signed_flight_log.aircraft_id = aircraft_id
+        signed_flight_log.sequence = sequence + 1
+        signed_flight_log.raw_log_digest = digest
+        signed_flight_log.previous_log_hash = previous_log_hash
+        signed_flight_log.chain_hash = hashlib.sha256((previous_log_hash + digest).encode('utf-8')).hexdigest()
+        signed_flight_log.save(update_fields=['aircraft', 'sequence', 'raw_log_digest', 'previous_log_hash', 'chain_hash'])
+        heads[aircraft_id] = (signed_flight_log.sequence, signed_flight_log.chain_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registry', '0001_initial'),
+        ('gcs_operations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='aircraft',
+            field=models.ForeignKey(help_text='The aircraft whose log chain this signed log is part of', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='signed_flight_logs', to='registry.aircraft'),
+        ),
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='chain_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the previous log hash and the raw log digest', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='previous_log_hash',
+            field=models.CharField(blank=True, default='', help_text='Chain hash of the previous signed log of the aircraft', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='raw_log_digest',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 digest of the minified raw log', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='sequence',
+            field=models.PositiveIntegerField(help_text='Position of this signed log in the log chain of the aircraft, starting at 1', null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='signedflightlog',
+            unique_together={('aircraft', 'sequence')},
+        ),
+        migrations.RunPython(chain_existing_signed_logs, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='FlightLogChainCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sequence', models.PositiveIntegerField()),
+                ('chain_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('aircraft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_chain_checkpoints', to='registry.aircraft')),
+            ],
+            options={
+                'unique_together': {('aircraft', 'sequence')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0002_signed_flight_log_chain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightLogUploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('total_chunks', models.PositiveIntegerField(blank=True, help_text='Number of chunks the client will send, if known', null=True)),
+                ('sha256', models.CharField(blank=True, default='', help_text='Optional SHA-256 of the whole log, checked when the upload is finalized', max_length=64)),
+                ('received_chunks', models.PositiveIntegerField(default=0, help_text='Number of chunks acknowledged so far, this is also the index of the next chunk')),
+                ('received_bytes', models.BigIntegerField(default=0)),
+                ('chunk_checksums', models.JSONField(default=list, help_text='SHA-256 of every acknowledged chunk, in order')),
+                ('status', models.CharField(choices=[('open', 'open'), ('completed', 'completed')], default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('flight_log', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='gcs_operations.flightlog')),
+                ('operation', models.ForeignKey(help_text='The operation the uploaded log belongs to', on_delete=django.db.models.deletion.CASCADE, to='gcs_operations.flightoperation')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0003_flight_log_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightLogTelemetry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('timestamp', models.BinaryField()),
+                ('latitude', models.BinaryField()),
+                ('longitude', models.BinaryField()),
+                ('altitude', models.BinaryField()),
+                ('crc', models.BinaryField()),
+                ('entry_type', models.BinaryField(help_text='Index of the entry type of every point in entry_type_labels, one byte per point')),
+                ('entry_type_labels', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('flight_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry', to='gcs_operations.flightlog')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:33
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def size_existing_signed_logs(apps, schema_editor):
+    ''' Signed logs are ASCII JSON, so their length in the database is their size in bytes '''
+    SignedFlightLog = apps.get_model('gcs_operations', 'SignedFlightLog')
+    SignedFlightLog.objects.update(signed_log_size=Length('signed_log'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0004_flight_log_telemetry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightlogtelemetry',
+            name='raw_log_digest',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 digest of the minified raw log', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='flightlogtelemetry',
+            name='raw_log_size',
+            field=models.PositiveBigIntegerField(help_text='Size in bytes of the minified raw log', null=True),
+        ),
+        migrations.AddField(
+            model_name='signedflightlog',
+            name='signed_log_size',
+            field=models.PositiveBigIntegerField(help_text='Size in bytes of the signed log', null=True),
+        ),
+        migrations.RunPython(size_existing_signed_logs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0005_list_payload_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightplan',
+            name='geo_cage',
+            field=models.JSONField(blank=True, editable=False, help_text='Geo-cage of the GeoJSON as a ring of lat / lng points, set when the plan is saved', null=True),
+        ),
+        migrations.AddField(
+            model_name='flightplan',
+            name='geo_json_digest',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='SHA-256 of the minified GeoJSON, plans with the same digest share their geo-cage', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='flightplan',
+            name='plan_file_digest',
+            field=models.CharField(blank=True, default='', editable=False, help_text='SHA-256 of the plan file that is signed into flight permissions', max_length=64),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0006_flight_plan_geo_cage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='flightoperation',
+            name='start_datetime',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Specify Flight start date and time in Indian Standard Time (IST)'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+def create_airspace_sequence(apps, schema_editor):
+    ''' The counter row is locked by every issuance, it is created once here instead of by the first concurrent issuances '''
+    AirspaceSequence = apps.get_model('gcs_operations', 'AirspaceSequence')
+    AirspaceSequence.objects.get_or_create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0007_flight_operation_start_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirspaceSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='flightpermission',
+            name='airspace_sequence',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, help_text='Value of the airspace sequence when the permission or its operation was last saved'),
+        ),
+        migrations.RunPython(create_airspace_sequence, migrations.RunPython.noop),
+    ]
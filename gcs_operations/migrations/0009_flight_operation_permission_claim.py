@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gcs_operations', '0008_airspace_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightoperation',
+            name='permission_claimed_until',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Other workers do not pre-issue the permission of this operation until then', null=True),
+        ),
+    ]
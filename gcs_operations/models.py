@@ -1,4 +1,5 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 import uuid
 
 # Create your models here.
@@ -19,6 +20,9 @@ class FlightPlan(models.Model):
     plan_file_json = models.JSONField(help_text = "Paste the QGCS flight plan JSON, for more information about the Plan File Format see: https://dev.qgroundcontrol.com/master/en/file_formats/plan.html", default = dict)
     geo_json = models.JSONField(default=dict, help_text="Paste the flight plan as GeoJSON")
     is_editable = models.BooleanField(default=True, help_text="Set whether the flight plan can be edited. Once the flight log has been signed a flight plan cannot be edited.")
+    geo_json_digest = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False, help_text="SHA-256 of the minified GeoJSON, plans with the same digest share their geo-cage")
+    geo_cage = models.JSONField(null=True, blank=True, editable=False, help_text="Geo-cage of the GeoJSON as a ring of lat / lng points, set when the plan is saved")
+    plan_file_digest = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="SHA-256 of the plan file that is signed into flight permissions")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -28,7 +32,29 @@ class FlightPlan(models.Model):
     def __str__(self):
         return self.name 
 
-class FlightOperation(models.Model):
+class AirspaceFieldsMixin(object):
+    ''' Remembers the values of airspace_fields loaded from the database, so that a save only advances the airspace sequence when deconfliction is on and one of them changed '''
+    airspace_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_airspace_values = instance.airspace_values()
+        return instance
+
+    def airspace_values(self):
+        # Deferred fields are not in __dict__, a deferred field loaded later counts as changed
+        return tuple(self.__dict__.get(field, models.DEFERRED) for field in self.airspace_fields)
+
+    def airspace_changed(self, update_fields=None):
+        if not settings.AIRSPACE_DECONFLICTION:
+            return False
+        if update_fields is not None and not set(update_fields) & set(self.airspace_fields):
+            return False
+        return self._state.adding or getattr(self, '_loaded_airspace_values', None) != self.airspace_values()
+
+
+class FlightOperation(AirspaceFieldsMixin, models.Model):
     ''' A flight operation object for NPNT permission ''' 
     OPERATION_TYPES = ((0, _('VLOS')),(1, _('BVLOS')),)
     
@@ -42,11 +68,25 @@ class FlightOperation(models.Model):
     pilot = models.ForeignKey(Pilot, models.CASCADE)
     is_editable = models.BooleanField(default=True, help_text="Set whether the flight operation can be edited. Once the flight log has been signed a flight operation cannot be edited.")
     
-    start_datetime = models.DateTimeField(default= tz.now, help_text="Specify Flight start date and time in Indian Standard Time (IST)")
+    start_datetime = models.DateTimeField(default= tz.now, db_index=True, help_text="Specify Flight start date and time in Indian Standard Time (IST)")
     end_datetime = models.DateTimeField(default=tz.now, help_text="Specify Flight end date and time in Indian Standard Time (IST)")
+    permission_claimed_until = models.DateTimeField(null=True, blank=True, editable=False, help_text="Other workers do not pre-issue the permission of this operation until then")
     created_at = models.DateTimeField(auto_now_add=True)
 
     updated_at = models.DateTimeField(auto_now=True)
+
+    airspace_fields = ('start_datetime', 'end_datetime')
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or not self.airspace_changed(kwargs.get('update_fields')):
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                # The time window of a permission is that of its operation, other processes pick the change up with the permission's new sequence
+                FlightPermission.objects.filter(operation_id=self.id).update(airspace_sequence=AirspaceSequence.advance())
+        self._loaded_airspace_values = self.airspace_values()
+
     def __unicode__(self):
        return self.name + ' ' + self.flight_plan.name
 
@@ -68,7 +108,24 @@ class Transaction(models.Model):
         txn_id = transaction_prefix +"_" +str(self.id) 
         return txn_id
     
-class FlightPermission(models.Model):
+class AirspaceSequence(models.Model):
+    ''' A single row counter that numbers the changes of flight permissions, see gcs_operations.deconfliction '''
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def advance(cls, step=1):
+        ''' Add step to the counter and return its new value. The row stays locked until the transaction commits, so changes are committed in sequence order and checks made while holding it are not raced by another process. '''
+        while not cls.objects.filter(id=1).update(value=models.F('value') + step):
+            with transaction.atomic():
+                cls.objects.get_or_create(id=1)
+        return cls.objects.values_list('value', flat=True).get(id=1)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(id=1).values_list('value', flat=True).first() or 0
+
+
+class FlightPermission(AirspaceFieldsMixin, models.Model):
     GRANTED = 'granted'
     DENIED = 'denied'
     PENDING = 'pending'
@@ -85,11 +142,25 @@ class FlightPermission(models.Model):
     geo_cage = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    airspace_sequence = models.BigIntegerField(default=0, db_index=True, editable=False, help_text="Value of the airspace sequence when the permission or its operation was last saved")
 
     status_code = models.CharField(
         max_length=20,
         choices=PERMISSION_STATUS_CHOICES,
         default=DENIED, help_text="Permissions")
+
+    airspace_fields = ('status_code', 'geo_cage')
+
+    def save(self, *args, **kwargs):
+        if not self.airspace_changed(kwargs.get('update_fields')):
+            super().save(*args, **kwargs)
+        else:
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'airspace_sequence'}
+            with transaction.atomic():
+                self.airspace_sequence = AirspaceSequence.advance()
+                super().save(*args, **kwargs)
+        self._loaded_airspace_values = self.airspace_values()
     
     def __unicode__(self):
        return self.operation.name
@@ -113,20 +184,91 @@ class FlightLog(models.Model):
     def __str__(self):
         return self.operation.name
     
+class FlightLogTelemetry(models.Model):
+    ''' The log entries of a FlightLog as zlib compressed little endian float64 columns, so that a field can be read without parsing the raw log. The raw log stays the source of truth, this is rebuilt whenever the log is saved. '''
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    flight_log = models.OneToOneField(FlightLog, models.CASCADE, related_name='telemetry')
+    point_count = models.PositiveIntegerField(default=0)
+    timestamp = models.BinaryField()
+    latitude = models.BinaryField()
+    longitude = models.BinaryField()
+    altitude = models.BinaryField()
+    crc = models.BinaryField()
+    entry_type = models.BinaryField(help_text="Index of the entry type of every point in entry_type_labels, one byte per point")
+    entry_type_labels = models.JSONField(default=list)
+    raw_log_size = models.PositiveBigIntegerField(null=True, help_text="Size in bytes of the minified raw log")
+    raw_log_digest = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 digest of the minified raw log")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s (%d points)' % (self.flight_log_id, self.point_count)
+
+
+class FlightLogUploadSession(models.Model):
+    ''' A resumable upload of a raw flight log in ordered chunks, the chunks are appended to a file on the server and the session is finalized into a FlightLog '''
+    OPEN = 'open'
+    COMPLETED = 'completed'
+
+    STATUS_CHOICES = [
+        (OPEN, 'open'),
+        (COMPLETED, 'completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    operation = models.ForeignKey(FlightOperation, models.CASCADE, help_text="The operation the uploaded log belongs to")
+    total_chunks = models.PositiveIntegerField(null=True, blank=True, help_text="Number of chunks the client will send, if known")
+    sha256 = models.CharField(max_length=64, blank=True, default='', help_text="Optional SHA-256 of the whole log, checked when the upload is finalized")
+    received_chunks = models.PositiveIntegerField(default=0, help_text="Number of chunks acknowledged so far, this is also the index of the next chunk")
+    received_bytes = models.BigIntegerField(default=0)
+    chunk_checksums = models.JSONField(default=list, help_text="SHA-256 of every acknowledged chunk, in order")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=OPEN)
+    flight_log = models.OneToOneField('FlightLog', models.SET_NULL, null=True, blank=True, related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s (%s)' % (self.id, self.status)
+
+
 class SignedFlightLog(models.Model):
     ''' As of August 2021, it is unclear if the flight logs will be signed by the GCS or if the flight log will be signed by the management server. By sepearating the flight log and signed flight log we enable either cases. '''
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     raw_flight_log = models.OneToOneField(FlightLog, on_delete=models.CASCADE, related_name ="raw_flight_log")
     signed_log = models.TextField(help_text="Flight log signed by the drone private key")
+    signed_log_size = models.PositiveBigIntegerField(null=True, help_text="Size in bytes of the signed log")
+    aircraft = models.ForeignKey(Aircraft, models.CASCADE, null=True, related_name='signed_flight_logs', help_text="The aircraft whose log chain this signed log is part of")
+    sequence = models.PositiveIntegerField(null=True, help_text="Position of this signed log in the log chain of the aircraft, starting at 1")
+    raw_log_digest = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 digest of the minified raw log")
+    previous_log_hash = models.CharField(max_length=64, blank=True, default='', help_text="Chain hash of the previous signed log of the aircraft")
+    chain_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 of the previous log hash and the raw log digest")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        unique_together = ('aircraft', 'sequence')
+
     def __unicode__(self):
        return self.raw_flight_log.operation.name
 
     def __str__(self):
         return self.raw_flight_log.operation.name
-    
+
+
+class FlightLogChainCheckpoint(models.Model):
+    ''' A point up to which the signed log chain of an aircraft has been verified, verification resumes from the latest checkpoint instead of rehashing the whole chain '''
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    aircraft = models.ForeignKey(Aircraft, models.CASCADE, related_name='log_chain_checkpoints')
+    sequence = models.PositiveIntegerField()
+    chain_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('aircraft', 'sequence')
+
+    def __str__(self):
+        return '%s #%d' % (self.aircraft_id, self.sequence)
+
 
 class CloudFile(models.Model):
     UPLOAD_TYPE = (
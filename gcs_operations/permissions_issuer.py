@@ -1,64 +1,291 @@
 import dataclasses
-from gcs_operations.models import FlightOperation, FlightPermission
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from enum import Enum
+from gcs_operations.models import AirspaceSequence, FlightOperation, FlightPermission
 import json
-from dataclasses import asdict
-import hashlib
-from .data_definitions import PermissionObject, LatLng
+from .data_definitions import PermissionObject
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
 from . import data_signer
-from shapely.geometry import shape
-from shapely.ops import unary_union
+from . import deconfliction
+from . import geo_cages
 import logging
 logger = logging.getLogger(__name__)
 
+
+class PermissionIssuanceStatus(Enum):
+    NOT_FOUND = 0
+    INVALID = 1
+    EXISTS = 2
+    ISSUED = 3
+    FAILED = 4
+
+
+# Permissions are issued for operations starting between one minute and one hour from now
+ISSUANCE_WINDOW_OPENS = 3600
+ISSUANCE_WINDOW_CLOSES = 60
+
+
+def in_issuance_window(start_datetime, now=None):
+    operation_start_time_delta = (start_datetime - (now or timezone.now())).total_seconds()
+    return ISSUANCE_WINDOW_CLOSES < operation_start_time_delta < ISSUANCE_WINDOW_OPENS
+
+
+def permission_payload(flight_operation, h_digest):
+    data_to_sign = PermissionObject(flight_operation_id=str(flight_operation.id), flight_plan_id=str(flight_operation.flight_plan_id), plan_file_hash=h_digest)
+    return json.loads(json.dumps(dataclasses.asdict(data_to_sign)))
+
+
+def request_permission_token(my_data_signer, data_payload):
+    ''' The signed permission token, an error dict when the signer failed or False when it returned nothing '''
+    try:
+        return my_data_signer.issue_jwt_permission(data_payload=data_payload)
+    except Exception as e:
+        logger.error("Error in getting permission JSON from Auth server %s" % e)
+        return {'error': "Permission was granted but could not get a permission token"}
+
+
+def token_request_failed(signed_json):
+    return not signed_json or 'error' in signed_json
+
+
+# A caller that finds the operation claimed by another process checks this often whether its permission was written
+CLAIM_POLL_INTERVAL = 0.2
+
+
+def claim_operation(flight_operation_id):
+    ''' Claim an operation for issuing its permission in a short transaction and return it with its existing permission. While another process holds an unexpired claim the caller waits for that permission, for at most PERMISSION_ISSUE_LEASE seconds after which it takes the claim over '''
+    give_up_waiting = time.monotonic() + settings.PERMISSION_ISSUE_LEASE
+    while True:
+        with transaction.atomic():
+            flight_operation = FlightOperation.objects.select_for_update(of=('self',)).select_related('flight_plan').get(id=flight_operation_id)
+            existing = FlightPermission.objects.filter(operation=flight_operation).first()
+            now = timezone.now()
+            claimed_elsewhere = flight_operation.permission_claimed_until is not None and flight_operation.permission_claimed_until > now
+            if existing is not None or not claimed_elsewhere or time.monotonic() >= give_up_waiting:
+                if existing is None:
+                    flight_operation.permission_claimed_until = now + timedelta(seconds=settings.PERMISSION_ISSUE_LEASE)
+                    FlightOperation.objects.filter(id=flight_operation.id).update(permission_claimed_until=flight_operation.permission_claimed_until)
+                return flight_operation, existing
+        time.sleep(CLAIM_POLL_INTERVAL)
+
+
 def issue_permission(flight_operation_id):
 
-    ''' A class to issue permission JWS '''
-
-    flight_operation = FlightOperation.objects.get(id = flight_operation_id)    
-    ## Check airspace via the DSS
-    flight_plan = flight_operation.flight_plan   
-    airspace_clearance = True   
-    # Generate Geocage and save it. 
-    # Get Geojson
-    geo_json = flight_plan.geo_json
-    g_c = []
-    shp_features = []
-    for feature in geo_json['features']:
-        shp_features.append(shape(feature['geometry']))
-    combined_features = unary_union(shp_features)
-    
-    geo_cage = combined_features.minimum_rotated_rectangle
-    for coord in list(geo_cage.exterior.coords):
-        ll = LatLng(lat = float(coord[1]), lng = float(coord[0]))
-        g_c.append(asdict(ll))
-    
-    if airspace_clearance: 
-        status_code  = 'granted' 
-        plan_file = flight_plan.plan_file_json
-        h_digest = hashlib.sha256(json.dumps(plan_file).encode('utf-8')).hexdigest()        
-        my_data_signer = data_signer.SigningHelper()    
-        data_to_sign = PermissionObject(flight_operation_id= str(flight_operation.id), flight_plan_id= str(flight_plan.id), plan_file_hash = h_digest)    
-        permission_payload = json.loads(json.dumps(dataclasses.asdict(data_to_sign)))        
-        try:
-            signed_json = my_data_signer.issue_jwt_permission(data_payload= permission_payload)    
-        except Exception as e: 
-            logger.error("Error in getting permission JSON from Auth server %s" % e)            
-            signed_json = {'error': "Permission was granted but could not get a permission token"}
-
-    else: 
-        status_code  = 'denied'
-        signed_json = {}
-
-    if not signed_json: 
-        status_code = 'denied'
-        signed_json = {}
-    
-    flight_permission = FlightPermission(operation = flight_operation, token = signed_json,status_code=status_code, geo_cage = g_c)
-    flight_permission.save()
+    ''' A class to issue permission JWS. The operation is claimed in a short transaction, the token is requested outside of any transaction and the permission is written under the operation and airspace locks, callers in other processes wait for it instead of requesting their own token '''
 
-    # Permission has been issued , lock the operation
+    flight_operation, existing = claim_operation(flight_operation_id)
+    if existing is not None:
+        return {"flight_permission": existing}
+    try:
+        ## Check airspace via the DSS
+        flight_plan = flight_operation.flight_plan   
+        # The geo-cage and plan file digest are computed when the plan is saved and shared by plans with the same content
+        g_c, h_digest = geo_cages.plan_geo_cage(flight_plan)
+        ## Check the airspace against the geo-cages of the other granted permissions flying at the same time
+        conflicts = []
+        if settings.AIRSPACE_DECONFLICTION:
+            conflicts = deconfliction.permission_airspace.conflicts(g_c, flight_operation.start_datetime, flight_operation.end_datetime)
+        airspace_clearance = not conflicts
+        if conflicts:
+            logger.info("Permission for operation %s denied, its geo-cage conflicts with permissions %s" % (flight_operation.id, ', '.join(map(str, conflicts))))
+        
+        if airspace_clearance: 
+            status_code  = 'granted' 
+            my_data_signer = data_signer.get_permission_signer()    
+            signed_json = request_permission_token(my_data_signer, permission_payload(flight_operation, h_digest))
 
-    flight_operation.is_editable = False
-    flight_operation.save()
+        else: 
+            status_code  = 'denied'
+            signed_json = {}
+
+        if not signed_json: 
+            status_code = 'denied'
+            signed_json = {}
+
+        with transaction.atomic():
+            # A caller that took the claim over may have written its permission while the token was requested
+            list(FlightOperation.objects.select_for_update().filter(id=flight_operation.id).values_list('id', flat=True))
+            existing = FlightPermission.objects.filter(operation=flight_operation).first()
+            if existing is not None:
+                return {"flight_permission": existing}
+
+            if status_code == 'granted' and settings.AIRSPACE_DECONFLICTION:
+                # Another process may have granted an overlapping operation while the token was requested, check again under the airspace lock held until the permission is committed
+                deconfliction.lock_airspace()
+                conflicts = deconfliction.permission_airspace.conflicts(g_c, flight_operation.start_datetime, flight_operation.end_datetime)
+                if conflicts:
+                    logger.info("Permission for operation %s denied, permissions %s were granted while its token was requested" % (flight_operation.id, ', '.join(map(str, conflicts))))
+                    status_code = 'denied'
+                    signed_json = {}
+
+            flight_permission = FlightPermission(operation = flight_operation, token = signed_json,status_code=status_code, geo_cage = g_c)
+            try:
+                with transaction.atomic():
+                    flight_permission.save()
+            except IntegrityError:
+                # Databases without row locks, e.g. SQLite, let a concurrent issuance through, its permission is the one that counts
+                return {"flight_permission": FlightPermission.objects.get(operation = flight_operation)}
+
+            # Permission has been issued , lock the operation
+
+            flight_operation.is_editable = False
+            flight_operation.permission_claimed_until = None
+            flight_operation.save(update_fields=['is_editable', 'permission_claimed_until', 'updated_at'])
+    except BaseException:
+        # Waiting callers take over now instead of when the claim expires
+        FlightOperation.objects.filter(id=flight_operation.id, Operation__isnull=True).update(permission_claimed_until=None)
+        raise
     
-    return {"flight_permission": flight_permission}
\ No newline at end of file
+    return {"flight_permission": flight_permission}
+
+
+_issuances_in_flight = {}
+_issuances_lock = threading.Lock()
+
+
+def issue_permission_once(flight_operation_id):
+    ''' Issue the permission of an operation with issue_permission, concurrent calls for the same operation in this process wait for the first one and share its permission instead of requesting their own token '''
+    key = str(flight_operation_id)
+    with _issuances_lock:
+        issuance = _issuances_in_flight.get(key)
+        leader = issuance is None
+        if leader:
+            issuance = _issuances_in_flight[key] = Future()
+    if not leader:
+        return issuance.result()
+
+    try:
+        flight_permission = issue_permission(flight_operation_id)['flight_permission']
+    except Exception as e:
+        issuance.set_exception(e)
+        raise
+    else:
+        issuance.set_result(flight_permission)
+        return flight_permission
+    finally:
+        with _issuances_lock:
+            _issuances_in_flight.pop(key, None)
+
+
+def issue_permissions(flight_operation_ids, retry_failed_tokens=False):
+    ''' Issue the permissions of many flight operations at once. Every operation is checked against the issuance window and deconflicted against the granted permissions and the operations granted earlier in the batch, the tokens are requested from Flight Passport on a pool of PERMISSION_ISSUE_WORKERS threads sharing its pooled session, and the grants are checked again under the airspace lock before the permissions and is_editable flags are written with bulk queries in a single transaction. With retry_failed_tokens, operations whose token could not be requested get no permission and the FAILED status instead of a denial, so that they can be issued again. Returns a dict of operation id to a status / flight_permission / message dict. '''
+    flight_operation_ids = list(dict.fromkeys(str(flight_operation_id) for flight_operation_id in flight_operation_ids))
+    results = {}
+    now = timezone.now()
+    flight_operations = {str(o.id): o for o in FlightOperation.objects.select_related('flight_plan').filter(id__in=flight_operation_ids)}
+    existing = {str(p.operation_id): p for p in FlightPermission.objects.filter(operation_id__in=list(flight_operations))}
+    airspace = deconfliction.permission_airspace.sync() if settings.AIRSPACE_DECONFLICTION else None
+    batch_airspace = deconfliction.AirspaceIndex(settings.AIRSPACE_INDEX_BUCKET_SECONDS)
+
+    to_issue = []
+    for flight_operation_id in flight_operation_ids:
+        flight_operation = flight_operations.get(flight_operation_id)
+        if flight_operation is None:
+            results[flight_operation_id] = {"status": PermissionIssuanceStatus.NOT_FOUND, "flight_permission": None, "message": "Invalid Flight Operation referenced in the request"}
+        elif flight_operation_id in existing:
+            results[flight_operation_id] = {"status": PermissionIssuanceStatus.EXISTS, "flight_permission": existing[flight_operation_id],
+                                            "message": "A permission already exists for that operation"}
+        elif not in_issuance_window(flight_operation.start_datetime, now):
+            results[flight_operation_id] = {"status": PermissionIssuanceStatus.INVALID, "flight_permission": None,
+                                            "message": "Cannot issue permissions for operations whose start time is in the past or more than a hour from now"}
+        else:
+            try:
+                g_c, h_digest = geo_cages.plan_geo_cage(flight_operation.flight_plan)
+                polygon = deconfliction.cage_polygon(g_c)
+            except Exception as e:
+                logger.error("No geo-cage for the flight plan of operation %s: %s" % (flight_operation_id, e))
+                results[flight_operation_id] = {"status": PermissionIssuanceStatus.INVALID, "flight_permission": None, "message": "The flight plan has no usable geo-cage"}
+                continue
+            start, end = flight_operation.start_datetime.timestamp(), flight_operation.end_datetime.timestamp()
+            conflicts = []
+            if airspace is not None:
+                conflicts = airspace.conflicts(polygon, start, end) + batch_airspace.conflicts(polygon, start, end)
+            if conflicts:
+                logger.info("Permission for operation %s denied, its geo-cage conflicts with %s" % (flight_operation_id, ', '.join(map(str, conflicts))))
+            else:
+                batch_airspace.add(flight_operation_id, polygon, start, end)
+            to_issue.append((flight_operation, g_c, h_digest, not conflicts))
+
+    my_data_signer = data_signer.get_permission_signer()
+    payloads = [permission_payload(flight_operation, h_digest) for flight_operation, _, h_digest, cleared in to_issue if cleared]
+    if settings.PERMISSION_SIGNING_MODE == 'local' or len(payloads) < 2:
+        # Local signing is CPU bound and reads the signing key from the database, it gains nothing from threads
+        tokens = [request_permission_token(my_data_signer, payload) for payload in payloads]
+    else:
+        with ThreadPoolExecutor(max_workers=min(settings.PERMISSION_ISSUE_WORKERS, len(payloads))) as executor:
+            tokens = list(executor.map(lambda payload: request_permission_token(my_data_signer, payload), payloads))
+    tokens = iter(tokens)
+
+    flight_permissions = []
+    for flight_operation, g_c, h_digest, cleared in to_issue:
+        signed_json = next(tokens) if cleared else {}
+        if cleared and retry_failed_tokens and token_request_failed(signed_json):
+            results[str(flight_operation.id)] = {"status": PermissionIssuanceStatus.FAILED, "flight_permission": None,
+                                                 "message": "The permission token could not be requested, the permission is issued again later"}
+            continue
+        status_code = FlightPermission.GRANTED if signed_json else FlightPermission.DENIED
+        flight_permissions.append(FlightPermission(operation=flight_operation, token=signed_json or {}, status_code=status_code, geo_cage=g_c))
+
+    with transaction.atomic():
+        # Lock the operations and skip those whose permission was issued while the tokens were requested
+        locked = list(FlightOperation.objects.select_for_update().filter(id__in=[p.operation_id for p in flight_permissions]).values_list('id', flat=True))
+        issued_meanwhile = {str(p.operation_id): p for p in FlightPermission.objects.filter(operation_id__in=locked)}
+        for flight_operation_id, flight_permission in issued_meanwhile.items():
+            results[flight_operation_id] = {"status": PermissionIssuanceStatus.EXISTS, "flight_permission": flight_permission,
+                                            "message": "A permission already exists for that operation"}
+        flight_permissions = [p for p in flight_permissions if str(p.operation_id) not in issued_meanwhile]
+        if flight_permissions:
+            if settings.AIRSPACE_DECONFLICTION:
+                # Held until the permissions are committed, the grants of other processes made meanwhile are checked again under it
+                deconfliction.lock_airspace()
+                airspace = deconfliction.permission_airspace.sync()
+                for flight_permission in flight_permissions:
+                    if flight_permission.status_code != FlightPermission.GRANTED:
+                        continue
+                    flight_operation = flight_permission.operation
+                    conflicts = airspace.conflicts(deconfliction.cage_polygon(flight_permission.geo_cage), flight_operation.start_datetime.timestamp(), flight_operation.end_datetime.timestamp())
+                    if conflicts:
+                        logger.info("Permission for operation %s denied, permissions %s were granted while its token was requested" % (flight_operation.id, ', '.join(map(str, conflicts))))
+                        flight_permission.status_code = FlightPermission.DENIED
+                        flight_permission.token = {}
+                # bulk_create does not call save, the permissions are stamped with one sequence
+                airspace_sequence = AirspaceSequence.advance()
+                for flight_permission in flight_permissions:
+                    flight_permission.airspace_sequence = airspace_sequence
+            FlightPermission.objects.bulk_create(flight_permissions)
+            # Permission has been issued , lock the operations, bulk_update does not touch auto_now fields so updated_at is set explicitly
+            operations = [flight_permission.operation for flight_permission in flight_permissions]
+            for flight_operation in operations:
+                flight_operation.is_editable = False
+                flight_operation.updated_at = now
+            FlightOperation.objects.bulk_update(operations, ['is_editable', 'updated_at'])
+        for flight_permission in flight_permissions:
+            results[str(flight_permission.operation_id)] = {"status": PermissionIssuanceStatus.ISSUED, "flight_permission": flight_permission, "message": "Permission %s" % flight_permission.status_code}
+
+    return {flight_operation_id: results[flight_operation_id] for flight_operation_id in flight_operation_ids}
+
+
+def preissue_permissions(batch_size=None):
+    ''' Issue the permissions of the operations that entered the issuance window and have none yet, in start time order. Every batch of operations is claimed in a short transaction that leases them to this worker for PERMISSION_PREISSUE_LEASE seconds, and issue_permissions then requests the tokens outside of any transaction and does not write a permission twice, so several workers can run this at the same time. Operations that could not be issued, e.g. without a usable geo-cage or because Flight Passport did not return a token, get no permission and are retried once their lease expires, only the airspace check writes a denial. Returns the number of operations per PermissionIssuanceStatus name. '''
+    batch_size = batch_size or settings.PERMISSION_PREISSUE_BATCH_SIZE
+    counts = {}
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            upcoming = FlightOperation.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                Q(permission_claimed_until__isnull=True) | Q(permission_claimed_until__lte=now),
+                start_datetime__gt=now + timedelta(seconds=ISSUANCE_WINDOW_CLOSES), start_datetime__lt=now + timedelta(seconds=ISSUANCE_WINDOW_OPENS),
+                Operation__isnull=True).order_by('start_datetime')
+            flight_operation_ids = list(upcoming.values_list('id', flat=True)[:batch_size])
+            FlightOperation.objects.filter(id__in=flight_operation_ids).update(permission_claimed_until=now + timedelta(seconds=settings.PERMISSION_PREISSUE_LEASE))
+        if not flight_operation_ids:
+            break
+        for result in issue_permissions(flight_operation_ids, retry_failed_tokens=True).values():
+            counts[result['status'].name] = counts.get(result['status'].name, 0) + 1
+    return counts
@@ -3,12 +3,14 @@ import json
 import arrow
 import geojson
 from geojson import LineString, Point, Polygon, Feature, FeatureCollection
+from django.conf import settings
 from rest_framework import serializers
 
 from registry.models import Firmware
 from .data_definitions import PlanFile, PlanFileMission, SimpleMissionItem, ComplexMissionItem, \
     TransectStyleComplexItem, CameraCalcData
-from .models import Transaction, FlightOperation, FlightPlan, FlightLog, FlightPermission, CloudFile, SignedFlightLog
+from .models import Transaction, FlightOperation, FlightPlan, FlightLog, FlightPermission, CloudFile, SignedFlightLog, \
+    FlightLogUploadSession
 
 
 class FirmwareSerializer(serializers.ModelSerializer):
@@ -256,7 +258,7 @@ class FlightPlanSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FlightPlan
-        exclude = ('is_editable', 'geo_json',)
+        exclude = ('is_editable', 'geo_json', 'geo_json_digest', 'geo_cage', 'plan_file_digest',)
         ordering = ['-created_at']
 
 
@@ -278,7 +280,7 @@ class FlightOperationListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FlightOperation
-        fields = '__all__'
+        exclude = ('permission_claimed_until',)
         ordering = ['-created_at']
 
 
@@ -289,7 +291,7 @@ class FlightOperationSerializer(serializers.ModelSerializer):
     # flight_plan = FlightPlanSerializer(read_only=True)
     class Meta:
         model = FlightOperation
-        exclude = ('is_editable',)
+        exclude = ('is_editable', 'permission_claimed_until',)
         ordering = ['-created_at']
 
 
@@ -298,7 +300,7 @@ class FlightPermissionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FlightPermission
-        fields = '__all__'
+        exclude = ('airspace_sequence',)
         ordering = ['-created_at']
 
 
@@ -320,6 +322,20 @@ class FlightOperationPermissionSerializer(serializers.ModelSerializer):
         ordering = ['-created_at']
 
 
+class FlightPermissionVerifySerializer(serializers.Serializer):
+    ''' A serializer for a batch of permission tokens and / or operation ids to verify '''
+    tokens = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    operation_ids = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+
+    def validate(self, data):
+        total = len(data['tokens']) + len(data['operation_ids'])
+        if total == 0:
+            raise serializers.ValidationError("Provide at least one token or operation id to verify")
+        if total > settings.PERMISSION_VERIFY_BATCH_LIMIT:
+            raise serializers.ValidationError("At most %d tokens and operation ids can be verified in one request" % settings.PERMISSION_VERIFY_BATCH_LIMIT)
+        return data
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     ''' A serializer to the transaction view '''
 
@@ -345,6 +361,76 @@ class FlightLogSerializer(serializers.ModelSerializer):
         ordering = ['-created_at']
 
 
+class FlightLogListSerializer(serializers.ModelSerializer):
+    ''' A serializer for lists of Flight Logs, the raw log is replaced by its size, point count, digest and signed state, see FlightLogList '''
+    raw_log_size = serializers.IntegerField(read_only=True)
+    point_count = serializers.IntegerField(read_only=True)
+    raw_log_digest = serializers.CharField(read_only=True)
+    is_signed = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = FlightLog
+        fields = ['id', 'operation', 'raw_log_size', 'point_count', 'raw_log_digest', 'is_signed', 'created_at', 'updated_at']
+        ordering = ['-created_at']
+
+
+class FlightPermissionIssueBatchSerializer(serializers.Serializer):
+    ''' A serializer for the operations whose permissions are issued in one batch '''
+    operation_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_operation_ids(self, value):
+        if len(value) > settings.PERMISSION_ISSUE_BATCH_LIMIT:
+            raise serializers.ValidationError("At most %d permissions can be issued in one request" % settings.PERMISSION_ISSUE_BATCH_LIMIT)
+        return value
+
+
+class FlightLogSignBatchSerializer(serializers.Serializer):
+    ''' A serializer for the ids of flight logs to sign in one batch '''
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_ids(self, value):
+        if len(value) > settings.FLIGHT_LOG_SIGN_BATCH_LIMIT:
+            raise serializers.ValidationError("At most %d flight logs can be signed in one request" % settings.FLIGHT_LOG_SIGN_BATCH_LIMIT)
+        return value
+
+
+class FlightLogSummaryBatchSerializer(serializers.Serializer):
+    ''' A serializer for the operations whose flight log summaries are requested in one batch '''
+    operation_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_operation_ids(self, value):
+        if len(value) > settings.FLIGHT_LOG_SUMMARY_BATCH_LIMIT:
+            raise serializers.ValidationError("At most %d operations can be summarized in one request" % settings.FLIGHT_LOG_SUMMARY_BATCH_LIMIT)
+        return value
+
+
+class FlightLogConformanceAuditSerializer(serializers.Serializer):
+    ''' A serializer for the date range of a geo-cage conformance audit, the range includes start and excludes end '''
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    tolerance = serializers.FloatField(min_value=0, required=False)
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError("end must be after start")
+        return data
+
+
+class LevelOfDetailSerializer(serializers.Serializer):
+    ''' A serializer for the web map zoom level a track or plan is simplified for '''
+    zoom = serializers.IntegerField(min_value=0, max_value=22, required=False)
+
+
+class FlightLogUploadSessionSerializer(serializers.ModelSerializer):
+    ''' A serializer for resumable flight log uploads, next_chunk is the index the client should send next '''
+    next_chunk = serializers.IntegerField(source='received_chunks', read_only=True)
+
+    class Meta:
+        model = FlightLogUploadSession
+        fields = ['id', 'operation', 'total_chunks', 'sha256', 'next_chunk', 'received_bytes', 'status', 'flight_log', 'created_at', 'updated_at']
+        read_only_fields = ['received_bytes', 'status', 'flight_log']
+
+
 class SignedFlightLogSerializer(serializers.ModelSerializer):
     ''' A serializer for Signed Flight Logs '''
 
@@ -354,6 +440,15 @@ class SignedFlightLogSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class SignedFlightLogListSerializer(serializers.ModelSerializer):
+    ''' A serializer for lists of Signed Flight Logs without the signed log itself '''
+
+    class Meta:
+        model = SignedFlightLog
+        ordering = ['-created_at']
+        fields = ['id', 'raw_flight_log', 'aircraft', 'sequence', 'signed_log_size', 'raw_log_digest', 'previous_log_hash', 'chain_hash', 'created_at', 'updated_at']
+
+
 class CloudFileSerializer(serializers.ModelSerializer):
     ''' A serializer for Cloud Files '''
 
@@ -0,0 +1,56 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import deconfliction
+from . import geo_cages
+from . import level_of_detail
+from . import telemetry
+from .models import FlightLog, FlightPermission, FlightPlan
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=FlightLog)
+def ingest_flight_log_telemetry(sender, instance, raw=False, **kwargs):
+    if raw:  # fixture loading
+        return
+
+    def ingest():
+        try:
+            telemetry.ingest(instance)
+            level_of_detail.precompute_tracks(instance.id)
+        except Exception as e:
+            logger.error("Telemetry of flight log %s could not be ingested: %s" % (instance.id, e))
+
+    transaction.on_commit(ingest)
+
+
+@receiver(pre_save, sender=FlightPlan)
+def refresh_flight_plan_digests(sender, instance, raw=False, **kwargs):
+    if raw:  # fixture loading, the digests are computed when a permission is first issued
+        return
+    geo_cages.refresh_plan_digests(instance)
+
+
+@receiver(post_save, sender=FlightPlan)
+def simplify_flight_plan(sender, instance, raw=False, **kwargs):
+    if raw:  # fixture loading
+        return
+
+    def simplify():
+        try:
+            level_of_detail.precompute_plans(instance)
+        except Exception as e:
+            logger.error("Flight plan %s could not be simplified: %s" % (instance.id, e))
+
+    transaction.on_commit(simplify)
+
+
+@receiver(post_delete, sender=FlightPermission)
+def remove_deconflicted_permission(sender, instance, **kwargs):
+    # The instance loses its id once deleted
+    flight_permission_id = instance.id
+    transaction.on_commit(lambda: deconfliction.permission_airspace.remove(flight_permission_id))
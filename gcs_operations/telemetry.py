@@ -0,0 +1,119 @@
+import logging
+import math
+import sys
+import zlib
+from array import array
+
+from common.canonical_json import json_digest_and_size
+from .models import FlightLog, FlightLogTelemetry
+
+logger = logging.getLogger(__name__)
+
+# Column name to the key of the value in a LogEntry (see digitalsky_provider.utils) and its index when entries are sent as lists
+NUMERIC_COLUMNS = {
+    'timestamp': ('timeStamp', 1),
+    'longitude': ('longitude', 2),
+    'latitude': ('latitude', 3),
+    'altitude': ('altitude', 4),
+    'crc': ('crc', 5),
+}
+COLUMNS = list(NUMERIC_COLUMNS) + ['entry_type']
+MAX_ENTRY_TYPES = 256
+
+
+def encode_column(values):
+    ''' Compress an array as little endian bytes '''
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def decode_column(blob, typecode='d'):
+    values = array(typecode)
+    values.frombytes(zlib.decompress(bytes(blob)))
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def extract_columns(raw_log):
+    ''' Convert the logEntries of a raw log into one array per column, a value that is missing or not a number becomes NaN '''
+    entries = raw_log.get('logEntries', []) if isinstance(raw_log, dict) else []
+    columns = {name: array('d') for name in NUMERIC_COLUMNS}
+    entry_types = array('B')
+    labels = {}
+    for entry in entries:
+        if isinstance(entry, dict):
+            entry_type = entry.get('entryType')
+            for name, (key, _) in NUMERIC_COLUMNS.items():
+                columns[name].append(_number(entry.get(key)))
+        elif isinstance(entry, (list, tuple)):
+            entry_type = entry[0] if entry else None
+            for name, (_, index) in NUMERIC_COLUMNS.items():
+                columns[name].append(_number(entry[index]) if index < len(entry) else math.nan)
+        else:
+            continue
+        label = str(entry_type) if entry_type is not None else ''
+        if label not in labels:
+            if len(labels) == MAX_ENTRY_TYPES:
+                raise ValueError("A flight log can have at most %d entry types" % MAX_ENTRY_TYPES)
+            labels[label] = len(labels)
+        entry_types.append(labels[label])
+    columns['entry_type'] = entry_types
+    return columns, list(labels)
+
+
+def ingest(flight_log):
+    ''' Build or rebuild the columnar telemetry of a flight log together with the size and digest of its minified raw log, so lists can show them without loading the log '''
+    columns, labels = extract_columns(flight_log.raw_log)
+    encoded = {name: encode_column(values) for name, values in columns.items()}
+    raw_log_digest, raw_log_size = json_digest_and_size(flight_log.raw_log)
+    telemetry, _ = FlightLogTelemetry.objects.update_or_create(flight_log=flight_log, defaults=dict(
+        encoded, point_count=len(columns['entry_type']), entry_type_labels=labels, raw_log_size=raw_log_size, raw_log_digest=raw_log_digest))
+    return telemetry
+
+
+def ingest_missing(flight_log_ids):
+    ''' Build the telemetry of the given flight logs that do not have it yet, returns the ids of the logs that exist '''
+    existing = set(FlightLogTelemetry.objects.filter(flight_log_id__in=flight_log_ids).values_list('flight_log_id', flat=True))
+    for flight_log in FlightLog.objects.filter(id__in=set(flight_log_ids) - existing):
+        ingest(flight_log)
+        existing.add(flight_log.id)
+    return existing
+
+
+def decode_row(row, columns):
+    ''' Decode the columns of a FlightLogTelemetry values() row. Entry types are returned as labels, every other column as an array of floats. '''
+    result = {}
+    for name in columns:
+        if name == 'entry_type':
+            labels = row['entry_type_labels']
+            result[name] = [labels[code] for code in decode_column(row[name], 'B')]
+        else:
+            result[name] = decode_column(row[name])
+    return result
+
+
+def column_fields(columns):
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError("Unknown telemetry columns: %s" % ', '.join(sorted(unknown)))
+    return list(columns) + (['entry_type_labels'] if 'entry_type' in columns else [])
+
+
+def read_columns(flight_log_id, columns):
+    ''' Return a dict of the requested columns of a flight log, only those columns are loaded from the database. Raises FlightLog.DoesNotExist. '''
+    fields = column_fields(columns)
+    row = FlightLogTelemetry.objects.filter(flight_log_id=flight_log_id).values(*fields).first()
+    if row is None:
+        ingest(FlightLog.objects.get(id=flight_log_id))
+        row = FlightLogTelemetry.objects.filter(flight_log_id=flight_log_id).values(*fields).first()
+    return decode_row(row, columns)
@@ -8,19 +8,36 @@ urlpatterns = [
     
     path('flight-plans', gcs_views.FlightPlanList.as_view(), name='flight-plan-list'),    
     path('flight-plans/<uuid:pk>', gcs_views.FlightPlanDetail.as_view(), name='flight-plan-detail'),
+    path('flight-plans/<uuid:pk>/geo-json', gcs_views.FlightPlanGeoJSON.as_view(), name='flight-plan-geo-json'),
     
     path('flight-operations', gcs_views.FlightOperationList.as_view(), name='flight-operation-list'),
+    path('flight-operations/permissions', gcs_views.FlightPermissionIssueBatch.as_view(), name='flight-operation-permission-batch'),
     path('flight-operations/<uuid:pk>', gcs_views.FlightOperationDetail.as_view(), name='flight-operation-detail'),
     path("flight-operations/<uuid:operation_id>/permission", gcs_views.FlightPermissionGenerate.as_view(), name="flight-operation-permission"),    
     
     path('flight-logs', gcs_views.FlightLogList.as_view(), name='log-list'),
+    path('flight-logs/uploads', gcs_views.FlightLogUploadList.as_view(), name='log-upload-list'),
+    path('flight-logs/uploads/<uuid:pk>', gcs_views.FlightLogUploadDetail.as_view(), name='log-upload-detail'),
+    path('flight-logs/uploads/<uuid:pk>/chunks/<int:index>', gcs_views.FlightLogUploadChunk.as_view(), name='log-upload-chunk'),
+    path('flight-logs/uploads/<uuid:pk>/finalize', gcs_views.FlightLogUploadFinalize.as_view(), name='log-upload-finalize'),
+    path('flight-logs/conformance', gcs_views.FlightLogConformanceAudit.as_view(), name='log-conformance-audit'),
+    path('flight-logs/summary', gcs_views.FlightLogSummaryBatch.as_view(), name='log-summary-batch'),
+    path('flight-logs/sign', gcs_views.FlightLogSignBatch.as_view(), name='log-sign-batch'),
     path('flight-logs/<uuid:pk>', gcs_views.FlightLogDetail.as_view(), name='log-detail'),
+    path('flight-logs/<uuid:pk>/telemetry', gcs_views.FlightLogTelemetry.as_view(), name='log-telemetry'),
+    path('flight-logs/<uuid:pk>/conformance', gcs_views.FlightLogConformance.as_view(), name='log-conformance'),
+    path('flight-logs/<uuid:pk>/raw', gcs_views.FlightLogRaw.as_view(), name='log-raw'),
+    path('flight-logs/<uuid:pk>/track', gcs_views.FlightLogTrack.as_view(), name='log-track'),
+    path('flight-logs/<uuid:pk>/summary', gcs_views.FlightLogSummary.as_view(), name='log-summary'),
     path('flight-logs/<uuid:pk>/sign', gcs_views.FlightLogSign.as_view(), name='log-sign'),
 
     path('signed-flight-logs', gcs_views.SignedFlightLogList.as_view(), name='signed-log-list'),
     path('signed-flight-logs/<uuid:pk>', gcs_views.SignedFlightLogDetail.as_view(), name='signed-log-detail'),
+    path('signed-flight-logs/<uuid:pk>/download', gcs_views.SignedFlightLogDownload.as_view(), name='signed-log-download'),
+    path('signed-flight-logs/chain/<uuid:aircraft_id>/verify', gcs_views.SignedFlightLogChainVerify.as_view(), name='signed-log-chain-verify'),
 
     path("flight-permissions", gcs_views.FlightPermissionApplicationList.as_view(), name="flight-permissions-list"),
+    path("flight-permissions/verify", gcs_views.FlightPermissionVerify.as_view(), name="flight-permissions-verify"),
     path("flight-permissions/<uuid:pk>", gcs_views.FlightPermissionApplicationDetail.as_view(), name="flight-permissions-detail"),  
 
     path("files", gcs_views.CloudFileList.as_view(), name="file_list"),
@@ -3,12 +3,12 @@ import os
 import tempfile
 from os import environ as env
 
-import arrow
-import boto3
 from botocore.exceptions import ClientError
 from botocore.exceptions import NoCredentialsError
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils.decorators import method_decorator
 from dotenv import load_dotenv, find_dotenv
 from rest_framework import generics
 from rest_framework import mixins
@@ -18,14 +18,25 @@ from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common.canonical_json import iter_json
+from common.http_client import get_s3_client, get_upstream
 from gcs_operations.models import CloudFile
-from pki_framework.utils import requires_scopes
-from registry.models import Firmware
+from registry.models import Aircraft, Firmware
+from . import conformance
 from . import data_signer
+from . import level_of_detail
+from . import log_analytics
+from . import log_chain
+from . import log_downloads
+from . import log_uploads
+from . import telemetry
 from . import permissions_issuer
-from .models import SignedFlightLog, FlightOperation, FlightPlan, FlightLog, FlightPermission
+from .models import SignedFlightLog, FlightOperation, FlightPlan, FlightLog, FlightPermission, FlightLogUploadSession
 from .serializers import FlightPlanSerializer, FlightOperationSerializer, FlightLogSerializer, FirmwareSerializer, \
-    FlightPermissionSerializer, CloudFileSerializer, SignedFlightLogSerializer
+    FlightPermissionSerializer, CloudFileSerializer, SignedFlightLogSerializer, FlightPermissionVerifySerializer, \
+    FlightLogSignBatchSerializer, FlightLogUploadSessionSerializer, FlightLogSummaryBatchSerializer, \
+    FlightLogConformanceAuditSerializer, LevelOfDetailSerializer, FlightLogListSerializer, SignedFlightLogListSerializer, \
+    FlightPermissionIssueBatchSerializer
 
 logger = logging.getLogger(__name__)
 
@@ -49,19 +60,20 @@ def upload_file(file_name, bucket, object_name=None):
         object_name = file_name
 
     # Upload the file
-    s3_client = boto3.client('s3')
+    s3_client = get_s3_client(region_name=None, endpoint_url=None, aws_access_key_id=None, aws_secret_access_key=None)
     try:
-        response = s3_client.upload_file(file_name, bucket, object_name)
+        response = get_upstream('s3').call(s3_client.upload_file, file_name, bucket, object_name)
     except ClientError as e:
         logger.error("Error in S3 upload %s" % e)
         return False
     return True
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class FirmwareList(mixins.ListModelMixin,
                    mixins.CreateModelMixin,
                    generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = Firmware.objects.all()
     serializer_class = FirmwareSerializer
 
@@ -72,10 +84,11 @@ class FirmwareList(mixins.ListModelMixin,
         return self.create(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class FirmwareDetail(mixins.RetrieveModelMixin,
                      mixins.UpdateModelMixin,
                      generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = Firmware.objects.all()
     serializer_class = FirmwareSerializer
 
@@ -83,10 +96,11 @@ class FirmwareDetail(mixins.RetrieveModelMixin,
         return self.retrieve(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class FlightPlanList(mixins.ListModelMixin,
                      mixins.CreateModelMixin,
                      generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightPlan.objects.all()
     serializer_class = FlightPlanSerializer
 
@@ -97,11 +111,12 @@ class FlightPlanList(mixins.ListModelMixin,
         return self.create(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class FlightPlanDetail(mixins.RetrieveModelMixin,
                        mixins.UpdateModelMixin,
                        mixins.DestroyModelMixin,
                        generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightPlan.objects.all()
     serializer_class = FlightPlanSerializer
 
@@ -115,10 +130,25 @@ class FlightPlanDetail(mixins.RetrieveModelMixin,
     #     return self.destroy(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
+class FlightPlanGeoJSON(APIView):
+    ''' The GeoJSON of a flight plan simplified for a web map zoom level e.g. ?zoom=14 '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        serializer = LevelOfDetailSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            geo_json = level_of_detail.simplified_plan(pk, serializer.validated_data.get('zoom', settings.LEVEL_OF_DETAIL_DEFAULT_ZOOM))
+        except FlightPlan.DoesNotExist:
+            return Response({"message": "No flight plan found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(geo_json)
+
+
 class FlightOperationList(mixins.ListModelMixin,
                           mixins.CreateModelMixin,
                           generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightOperation.objects.all()
     serializer_class = FlightOperationSerializer
 
@@ -129,11 +159,12 @@ class FlightOperationList(mixins.ListModelMixin,
         return self.create(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class FlightOperationDetail(mixins.RetrieveModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.DestroyModelMixin,
                             generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = FlightOperation.objects.all()
     serializer_class = FlightOperationSerializer
 
@@ -147,27 +178,20 @@ class FlightOperationDetail(mixins.RetrieveModelMixin,
     #     return self.destroy(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class FlightPermissionGenerate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     def put(self, request, operation_id, format=None):
-        flight_operation = get_object_or_404(FlightOperation, pk=operation_id)
-
-        permission = FlightPermission.objects.filter(operation=flight_operation).exists()
-        if permission:
-            f_p = FlightPermission.objects.get(operation=flight_operation)
-        else:
-            now = arrow.now()
-            start_datetime = flight_operation.start_datetime
-            operation_start_time_delta = start_datetime - now
-
-            if not (
-                    operation_start_time_delta.total_seconds() < 3600 and operation_start_time_delta.total_seconds() > 60):
+        # Permissions are usually issued ahead of time by the preissue_flight_permissions command, this is a single query lookup
+        f_p = FlightPermission.objects.select_related('operation').filter(operation_id=operation_id).first()
+        if f_p is None:
+            flight_operation = get_object_or_404(FlightOperation, pk=operation_id)
+            if not permissions_issuer.in_issuance_window(flight_operation.start_datetime):
                 raise serializers.ValidationError(
                     "Cannot issue permissions for operations whose start time is in the past or more than a hour from now")
 
-            f_permission = permissions_issuer.issue_permission(flight_operation_id=flight_operation.id)
-            f_p = f_permission['flight_permission']
+            # A retried request waits for the issuance already in flight and shares its permission
+            f_p = permissions_issuer.issue_permission_once(flight_operation.id)
         if not f_p:
             raise serializers.ValidationError("Error in creating / issuing a permission object, please see server logs")
         else:
@@ -176,13 +200,42 @@ class FlightPermissionGenerate(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
+class FlightPermissionIssueBatch(APIView):
+    ''' Issue the permissions of many flight operations in one request, every operation gets its own PermissionIssuanceStatus in the response '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    def post(self, request, format=None):
+        serializer = FlightPermissionIssueBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        issue_results = permissions_issuer.issue_permissions(serializer.validated_data['operation_ids'])
+
+        results = []
+        for flight_operation_id, issue_result in issue_results.items():
+            flight_permission = issue_result['flight_permission']
+            results.append({"operation": flight_operation_id, "status": issue_result['status'].name, "message": issue_result['message'],
+                            "flight_permission": FlightPermissionSerializer(flight_permission).data if flight_permission else None})
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class FlightLogList(mixins.ListModelMixin,
                     mixins.CreateModelMixin,
                     generics.GenericAPIView):
+    ''' Lists flight logs without their raw log, which is served by FlightLogRaw, so a page costs the same whatever the size of the logs '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightLog.objects.all()
     serializer_class = FlightLogSerializer
 
+    def get_queryset(self):
+        if self.request.method != 'GET':
+            return super().get_queryset()
+        return FlightLog.objects.defer('raw_log').annotate(
+            raw_log_size=F('telemetry__raw_log_size'), point_count=F('telemetry__point_count'), raw_log_digest=F('telemetry__raw_log_digest'),
+            is_signed=Exists(SignedFlightLog.objects.filter(raw_flight_log=OuterRef('pk')))).order_by('-created_at')
+
+    def get_serializer_class(self):
+        return FlightLogListSerializer if self.request.method == 'GET' else FlightLogSerializer
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
@@ -190,11 +243,22 @@ class FlightLogList(mixins.ListModelMixin,
         return self.create(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
+class FlightLogRaw(APIView):
+    ''' Stream the raw log of a flight log as minified JSON, it is serialized in chunks instead of being rendered in one piece '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        flight_log = get_object_or_404(FlightLog.objects.only('id', 'raw_log'), pk=pk)
+        chunks = (chunk.encode('utf-8') for chunk in iter_json(flight_log.raw_log))
+        return StreamingHttpResponse(chunks, content_type='application/json')
+
+
 class FlightLogDetail(mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
                       mixins.DestroyModelMixin,
                       generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightLog.objects.all()
     serializer_class = FlightLogSerializer
 
@@ -208,8 +272,143 @@ class FlightLogDetail(mixins.RetrieveModelMixin,
         return self.destroy(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
+class FlightLogUploadList(mixins.CreateModelMixin,
+                          generics.GenericAPIView):
+    ''' Start a resumable flight log upload '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    queryset = FlightLogUploadSession.objects.all()
+    serializer_class = FlightLogUploadSessionSerializer
+
+    def post(self, request, *args, **kwargs):
+        return self.create(request, *args, **kwargs)
+
+
+class FlightLogUploadDetail(mixins.RetrieveModelMixin,
+                            generics.GenericAPIView):
+    ''' The state of an upload, an interrupted client resumes at next_chunk '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    queryset = FlightLogUploadSession.objects.all()
+    serializer_class = FlightLogUploadSessionSerializer
+
+    def get(self, request, *args, **kwargs):
+        return self.retrieve(request, *args, **kwargs)
+
+
+class FlightLogUploadChunk(APIView):
+    ''' Append one chunk to an upload, the body is the raw chunk and X-Chunk-Sha256 its SHA-256 '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    def put(self, request, pk, index, format=None):
+        get_object_or_404(FlightLogUploadSession, pk=pk)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or -1)
+        except ValueError:
+            length = -1
+        try:
+            # The chunk is streamed from the request, request.data / request.body are never read
+            session = log_uploads.write_chunk(pk, index, request.stream, length, request.headers.get('X-Chunk-Sha256'))
+        except log_uploads.UploadError as ue:
+            return Response({"message": ue.message}, status=ue.status_code)
+        return Response(FlightLogUploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+
+class FlightLogUploadFinalize(APIView):
+    ''' Assemble the uploaded chunks into a FlightLog '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    def post(self, request, pk, format=None):
+        get_object_or_404(FlightLogUploadSession, pk=pk)
+        try:
+            session = log_uploads.finalize(pk)
+        except log_uploads.UploadError as ue:
+            return Response({"message": ue.message}, status=ue.status_code)
+        return Response(FlightLogSerializer(session.flight_log).data, status=status.HTTP_201_CREATED)
+
+
+class FlightLogTelemetry(APIView):
+    ''' Read selected telemetry columns of a flight log e.g. ?columns=latitude,longitude, without parsing the raw log '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        columns = [c for c in request.query_params.get('columns', ','.join(telemetry.COLUMNS)).split(',') if c]
+        try:
+            data = telemetry.read_columns(pk, columns)
+        except FlightLog.DoesNotExist:
+            return Response({"message": "No flight Log found"}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as ve:
+            return Response({"message": str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+        # NaN marks a missing value and is not valid JSON
+        data = {name: [None if value != value else value for value in values] for name, values in data.items()}
+        return Response({"point_count": len(next(iter(data.values()), [])), "columns": data})
+
+
+class FlightLogTrack(APIView):
+    ''' The track of a flight log as a GeoJSON LineString simplified for a web map zoom level e.g. ?zoom=14 '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        serializer = LevelOfDetailSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            track = level_of_detail.simplified_track(pk, serializer.validated_data.get('zoom', settings.LEVEL_OF_DETAIL_DEFAULT_ZOOM))
+        except FlightLog.DoesNotExist:
+            return Response({"message": "No flight Log found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(track)
+
+
+class FlightLogSummary(APIView):
+    ''' Duration, track length, altitude envelope, maximum ground speed and bounding box of a flight log '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        summary = log_analytics.flight_log_summary(pk)
+        if summary is None:
+            return Response({"message": "No flight Log found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(summary)
+
+
+class FlightLogSummaryBatch(APIView):
+    ''' Summaries of the flight logs of a list of operations '''
+    required_scopes = ['aerobridge.read']
+
+    def post(self, request, format=None):
+        serializer = FlightLogSummaryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        flight_logs = list(FlightLog.objects.filter(operation_id__in=serializer.validated_data['operation_ids']).order_by('created_at').values_list('id', 'operation_id'))
+        summaries = log_analytics.flight_log_summaries([flight_log_id for flight_log_id, _ in flight_logs])
+        results = [{"flight_log": flight_log_id, "operation": operation_id, "summary": summaries.get(flight_log_id)} for flight_log_id, operation_id in flight_logs]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class FlightLogConformance(APIView):
+    ''' Check the telemetry of a flight log against the geo-cage of its flight permission, reports every breach interval and the maximum excursion '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        try:
+            result = conformance.check_flight_log(pk)
+        except FlightLog.DoesNotExist:
+            return Response({"message": "No flight Log found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+class FlightLogConformanceAudit(APIView):
+    ''' Geo-cage conformance of every flight log whose operation started in a date range e.g. ?start=2022-01-01T00:00:00Z&end=2022-02-01T00:00:00Z '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, format=None):
+        serializer = FlightLogConformanceAuditSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        results = conformance.audit(data['start'], data['end'], data.get('tolerance'))
+        return Response({"checked": sum(1 for r in results if r['conformant'] is not None),
+                         "non_conformant": sum(1 for r in results if r['conformant'] is False), "results": results})
+
+
 class FlightLogSign(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     def put(self, request, pk, format=None):
         sign_result = data_signer.sign_log(pk)
@@ -228,19 +427,38 @@ class FlightLogSign(APIView):
             return Response({"message": "Invalid data"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
+class FlightLogSignBatch(APIView):
+    ''' Sign many flight logs in one request, every id gets its own DataSigningStatus in the response '''
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
+    def post(self, request, format=None):
+        serializer = FlightLogSignBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sign_results = data_signer.sign_logs(serializer.validated_data['ids'])
+
+        results = []
+        for flightlog_id, sign_result in sign_results.items():
+            signed_flight_log = sign_result['signed_flight_log']
+            results.append({"id": flightlog_id, "status": sign_result['status'].name, "message": sign_result['message'],
+                            "signed_flight_log": SignedFlightLogSerializer(signed_flight_log).data if signed_flight_log else None})
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class SignedFlightLogList(mixins.ListModelMixin,
                           generics.GenericAPIView):
-    queryset = SignedFlightLog.objects.all()
-    serializer_class = SignedFlightLogSerializer
+    required_scopes = ['aerobridge.read']
+
+    queryset = SignedFlightLog.objects.defer('signed_log').order_by('-created_at')
+    serializer_class = SignedFlightLogListSerializer
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class SignedFlightLogDetail(mixins.RetrieveModelMixin,
                             generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = SignedFlightLog.objects.all()
     serializer_class = SignedFlightLogSerializer
 
@@ -248,8 +466,56 @@ class SignedFlightLogDetail(mixins.RetrieveModelMixin,
         return self.retrieve(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
+class SignedFlightLogDownload(APIView):
+    ''' Download a signed log as a stream of chunks, supports a single HTTP byte range and gzip so large logs can be fetched without loading them into memory '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, pk, format=None):
+        try:
+            info = log_downloads.signed_log_info(pk)
+        except SignedFlightLog.DoesNotExist:
+            return Response({"message": "No signed flight log found"}, status=status.HTTP_404_NOT_FOUND)
+        size = info['size']
+        try:
+            byte_range = log_downloads.parse_range(request.headers.get('Range'), size)
+        except log_downloads.RangeNotSatisfiable:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        chunks = log_downloads.iter_signed_log(pk, start, end)
+        if byte_range is None and log_downloads.accepts_gzip(request.headers.get('Accept-Encoding')):
+            response = StreamingHttpResponse(log_downloads.gzip_chunks(chunks), content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(chunks, content_type='application/json')
+            response['Content-Length'] = end - start + 1
+            if byte_range is not None:
+                response.status_code = status.HTTP_206_PARTIAL_CONTENT
+                response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        response['Accept-Ranges'] = 'bytes'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = 'attachment; filename="signed-flight-log-%s.json"' % pk
+        if info['chain_hash']:
+            # The gzip representation has different bytes, so it gets its own ETag
+            response['ETag'] = '"%s%s"' % (info['chain_hash'], '-gzip' if response.has_header('Content-Encoding') else '')
+        return response
+
+
+class SignedFlightLogChainVerify(APIView):
+    ''' Verify the signed log chain of an aircraft, incrementally from the last checkpoint or from the first log with ?full=true '''
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, aircraft_id, format=None):
+        aircraft = get_object_or_404(Aircraft, pk=aircraft_id)
+        full = request.query_params.get('full', '').lower() in ('1', 'true')
+        return Response(log_chain.verify_chain(aircraft.id, full=full), status=status.HTTP_200_OK)
+
+
 class FlightPermissionApplicationList(mixins.ListModelMixin, generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = FlightPermission.objects.all()
     serializer_class = FlightPermissionSerializer
 
@@ -257,8 +523,9 @@ class FlightPermissionApplicationList(mixins.ListModelMixin, generics.GenericAPI
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class FlightPermissionApplicationDetail(mixins.CreateModelMixin, generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = FlightPermission.objects.all()
     serializer_class = FlightPermissionSerializer
 
@@ -266,8 +533,46 @@ class FlightPermissionApplicationDetail(mixins.CreateModelMixin, generics.Generi
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
+class FlightPermissionVerify(APIView):
+    ''' Verify many permission tokens at once, tokens can be sent directly or looked up by their operation id, every signature is checked against cached keys '''
+    required_scopes = ['aerobridge.read']
+
+    def post(self, request, format=None):
+        serializer = FlightPermissionVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tokens = serializer.validated_data['tokens']
+        operation_ids = serializer.validated_data['operation_ids']
+
+        verifier = data_signer.PermissionTokenVerifier()
+        results = []
+        for token in tokens:
+            result = verifier.verify(token)
+            result['token'] = token
+            results.append(result)
+
+        if operation_ids:
+            permissions = FlightPermission.objects.filter(operation_id__in=operation_ids).values_list('operation_id', 'status_code', 'token')
+            permission_by_operation = {operation_id: (status_code, token) for operation_id, status_code, token in permissions}
+            for operation_id in operation_ids:
+                status_code, token = permission_by_operation.get(operation_id, (None, {}))
+                access_token = token.get('access_token') if isinstance(token, dict) else None
+                if status_code is None:
+                    result = {"valid": False, "error": "No permission issued for this operation", "claims": None}
+                elif status_code != FlightPermission.GRANTED or not access_token:
+                    result = {"valid": False, "error": "Permission for this operation was not granted", "claims": None}
+                else:
+                    result = verifier.verify(access_token, flight_operation_id=operation_id)
+                result['operation_id'] = str(operation_id)
+                result['status_code'] = status_code
+                results.append(result)
+
+        valid_count = sum(1 for result in results if result['valid'])
+        return Response({"valid": valid_count, "invalid": len(results) - valid_count, "results": results}, status=status.HTTP_200_OK)
+
+
 class CloudFileList(mixins.ListModelMixin, generics.GenericAPIView):
+    required_scopes = ['aerobridge.read']
+
     queryset = CloudFile.objects.all()
     serializer_class = CloudFileSerializer
 
@@ -275,11 +580,12 @@ class CloudFileList(mixins.ListModelMixin, generics.GenericAPIView):
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class CloudFileDetail(mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
                       mixins.DestroyModelMixin,
                       generics.GenericAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     queryset = CloudFile.objects.all()
     serializer_class = CloudFileSerializer
 
@@ -287,8 +593,9 @@ class CloudFileDetail(mixins.RetrieveModelMixin,
         return self.retrieve(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.write']), name='dispatch')
 class CloudFileUpload(APIView):
+    required_scopes = ['aerobridge.write']
+
     parser_classes = (MultiPartParser,)
 
     def put(self, request, document_type, format=None):
@@ -309,12 +616,12 @@ class CloudFileUpload(APIView):
                     f.write(chunk)
                 f.flush()
 
-                s3 = boto3.client('s3', region_name=env.get('S3_REGION_NAME', 0), endpoint_url=endpoint_url,
-                                  aws_access_key_id=env.get('S3_ACCESS_KEY', 0),
-                                  aws_secret_access_key=env.get('S3_SECRET_KEY', 0))
+                s3 = get_s3_client(region_name=env.get('S3_REGION_NAME', 0), endpoint_url=endpoint_url,
+                                   aws_access_key_id=env.get('S3_ACCESS_KEY', 0),
+                                   aws_secret_access_key=env.get('S3_SECRET_KEY', 0))
 
                 try:
-                    s3.upload_fileobj(f, BUCKET_NAME, os.path.join(file_type, file_name))
+                    get_upstream('s3').call(s3.upload_fileobj, f, BUCKET_NAME, os.path.join(file_type, file_name))
                 except NoCredentialsError as ne:
                     logger.error("S3 Error, credentails not found / supplied %s" % ne)
                     return Response({"detail": "File not uploaded, problem  with Cloud Bucket credentials"},
@@ -1,16 +1,24 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
 # Create your views here.
-from pki_framework.utils import requires_scopes, BearerAuth
-from django.utils.decorators import method_decorator
-from django.views import View
-from django.http import HttpResponse
-import json
-
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
-class PingView(View):        
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from common.http_client import upstream_metrics
+
+class PingView(APIView):        
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request):
+        return Response({"message":"pong"})
+
+
+class UpstreamMetricsView(APIView):
+    ''' Latency, error and circuit breaker state of every outbound upstream used by this process '''
+    required_scopes = ['aerobridge.read']
+
     def get(self, request):
-        return HttpResponse(json.dumps({"message":"pong"}))
+        return Response(upstream_metrics())
 
 
 class HomeView(TemplateView):
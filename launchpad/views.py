@@ -19,6 +19,7 @@ from .serializers import AircraftAssemblySerializer, PersonSerializer, AddressSe
 from pki_framework.serializers import AerobridgeCredentialSerializer, AerobridgeCredentialGetSerializer
 # from pki_framework.forms import TokenCreateForm
 from pki_framework import encrpytion_util
+from pki_framework.permissions import RequiredScopesMixin
 from jetway.pagination import StandardResultsSetPagination
 from rest_framework.generics import DestroyAPIView
 from .forms import PersonCreateForm, AddressCreateForm, OperatorCreateForm , AircraftCreateForm, CompanyCreateForm, FirmwareCreateForm, FlightLogCreateForm, FlightOperationCreateForm, AircraftDetailCreateForm, FlightPlanCreateForm,  ContactCreateForm, PilotCreateForm, ActivityCreateForm,CustomCloudFileCreateForm, AuthorizationCreateForm, TokenCreateForm, AircraftComponentCreateForm,AircraftModelCreateForm, AircraftMasterComponentCreateForm, AircraftAssemblyCreateForm, IncidentCreateForm, AircraftAssemblyUpdateForm
@@ -31,8 +32,8 @@ import tempfile
 import arrow
 from django.db.models import Exists, OuterRef
 from rest_framework.parsers import MultiPartParser
-import boto3
-from gcs_operations import data_signer, permissions_issuer
+from common.http_client import get_s3_client, get_upstream
+from gcs_operations import data_signer, level_of_detail, permissions_issuer
 from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
 from botocore.exceptions import NoCredentialsError
@@ -46,26 +47,34 @@ from supply_chain_operations.utils import IncidentCalendar
 from datetime import datetime,timedelta, date
 from django.utils.safestring import mark_safe
 import calendar
+import json
+import logging
 
 import os
 
 
 load_dotenv(find_dotenv())
+logger = logging.getLogger(__name__)
 
-class HomeView(TemplateView):
+class HomeView(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     template_name = 'launchpad/basecamp.html'
 
-class DigitalSkyReadFirst(TemplateView):
+class DigitalSkyReadFirst(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     template_name = 'launchpad/digital_sky/digitalsky_read_first.html'
     
-class FlightPermissionsReadFirst(TemplateView):
+class FlightPermissionsReadFirst(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     template_name = 'launchpad/flight_permission/flight_permissions_read_first.html'
     
-class ManufacturingReadFirst(TemplateView):
+class ManufacturingReadFirst(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     template_name = 'launchpad/company/manufacturing_read_first.html'
 
 ### Person Views 
 class PeopleList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/person/person_list.html'
 
@@ -74,6 +83,7 @@ class PeopleList(APIView):
         return Response({'people': queryset})
     
 class PersonUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/person/person_update.html'
 
@@ -92,6 +102,7 @@ class PersonUpdate(APIView):
 
 
 class PersonDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/person/person_detail.html'
 
@@ -101,7 +112,8 @@ class PersonDetail(APIView):
         return Response({'serializer': serializer, 'person': person})
 
 
-class PersonCreateView(CreateView):
+class PersonCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': PersonCreateForm()}
         return render(request, 'launchpad/person/person_create.html', context)
@@ -120,6 +132,7 @@ class PersonCreateView(CreateView):
     
     
 class AddressList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/address/address_list.html'
 
@@ -128,6 +141,7 @@ class AddressList(APIView):
         return Response({'addresses': queryset})
     
 class AddressDetail(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/address/address_detail.html'
 
@@ -144,7 +158,8 @@ class AddressDetail(APIView):
         serializer.save()
         return redirect('addresses-list')
 
-class AddressCreateView(CreateView):
+class AddressCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AddressCreateForm()}
         return render(request, 'launchpad/address/address_create.html', context)
@@ -163,6 +178,7 @@ class AddressCreateView(CreateView):
     
     
 class OperatorList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/operator/operator_list.html'
 
@@ -171,6 +187,7 @@ class OperatorList(APIView):
         return Response({'operators': queryset})
     
 class OperatorDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/operator/operator_detail.html'
 
@@ -181,6 +198,7 @@ class OperatorDetail(APIView):
 
 
 class OperatorUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/operator/operator_update.html'
 
@@ -198,7 +216,8 @@ class OperatorUpdate(APIView):
         serializer.save()
         return redirect('operators-list')
 
-class OperatorCreateView(CreateView):
+class OperatorCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     template_name = 'launchpad/operator/operator_create.html'
     form_class = OperatorCreateForm
     model= Operator
@@ -216,6 +235,7 @@ class OperatorCreateView(CreateView):
 ### Contact Views
     
 class ContactsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/contact/contact_list.html'
 
@@ -224,6 +244,7 @@ class ContactsList(APIView):
         return Response({'contacts': queryset})
     
 class ContactsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/contact/contact_detail.html'
 
@@ -234,6 +255,7 @@ class ContactsDetail(APIView):
         return Response({'serializer': serializer, 'contact': contact})
 
 class ContactsUpdate(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/contact/contact_update.html'
 
@@ -244,7 +266,8 @@ class ContactsUpdate(APIView):
         return Response({'serializer': serializer, 'contact': contact})
 
 
-class ContactsCreateView(CreateView):
+class ContactsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': ContactCreateForm()}
         return render(request, 'launchpad/contact/contact_create.html', context)
@@ -261,6 +284,7 @@ class ContactsCreateView(CreateView):
 ### Flight Pilot Views
     
 class PilotsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/pilot/pilot_list.html'
 
@@ -269,6 +293,7 @@ class PilotsList(APIView):
         return Response({'pilots': queryset})
     
 class PilotsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/pilot/pilot_detail.html'
 
@@ -279,6 +304,7 @@ class PilotsDetail(APIView):
 
 
 class PilotsUpdate(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/pilot/pilot_update.html'
 
@@ -288,7 +314,8 @@ class PilotsUpdate(APIView):
         return Response({'serializer': serializer, 'pilot': pilot})
 
 
-class PilotsCreateView(CreateView):
+class PilotsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': PilotCreateForm()}
         return render(request, 'launchpad/pilot/pilot_create.html', context)
@@ -306,6 +333,7 @@ class PilotsCreateView(CreateView):
 ### Authorizationa Views
     
 class AuthorizationsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/authorization/authorization_list.html'
 
@@ -314,6 +342,7 @@ class AuthorizationsList(APIView):
         return Response({'authorizations': queryset})
     
 class AuthorizationsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/authorization/authorization_detail.html'
 
@@ -323,6 +352,7 @@ class AuthorizationsDetail(APIView):
         return Response({'serializer': serializer, 'authorization': authorization})
 
 class AuthorizationsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/authorization/authorization_update.html'
 
@@ -340,7 +370,8 @@ class AuthorizationsUpdate(APIView):
         return redirect('authorizations-list')
 
 
-class AuthorizationsCreateView(CreateView):
+class AuthorizationsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AuthorizationCreateForm()}
         return render(request, 'launchpad/authorization/authorization_create.html', context)
@@ -360,6 +391,7 @@ class AuthorizationsCreateView(CreateView):
 ### Activites Views
     
 class ActivitiesList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/activity/activity_list.html'
 
@@ -368,6 +400,7 @@ class ActivitiesList(APIView):
         return Response({'activities': queryset})
     
 class ActivitiesDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/activity/activity_detail.html'
 
@@ -377,6 +410,7 @@ class ActivitiesDetail(APIView):
         return Response({'serializer': serializer, 'activity': activity})
 
 class ActivitiesUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/activity/activity_update.html'
 
@@ -394,7 +428,8 @@ class ActivitiesUpdate(APIView):
         return redirect('activities-list')
 
 
-class ActivitiesCreateView(CreateView):
+class ActivitiesCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': ActivityCreateForm()}
         return render(request, 'launchpad/activity/activity_create.html', context)
@@ -412,6 +447,7 @@ class ActivitiesCreateView(CreateView):
 ### Aircraft Views
     
 class AircraftList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft/aircraft_list.html'
     pagination_class = StandardResultsSetPagination
@@ -467,6 +503,7 @@ class AircraftList(APIView):
         return Response(payload)
 
 class AircraftDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft/aircraft_detail.html'
 
@@ -487,6 +524,7 @@ class AircraftDetail(APIView):
 
 
 class AircraftComponents(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft/aircraft_components.html'
 
@@ -498,6 +536,7 @@ class AircraftComponents(APIView):
 
 
 class AircraftUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft/aircraft_update.html'
 
@@ -514,7 +553,8 @@ class AircraftUpdate(APIView):
         serializer.save()
         return redirect('aircrafts-list')
 
-class AircraftCreateView(CreateView):
+class AircraftCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AircraftCreateForm()}
         return render(request, 'launchpad/aircraft/aircraft_create.html', context)
@@ -532,6 +572,7 @@ class AircraftCreateView(CreateView):
 ### Aircraft Extended Views
     
 class AircraftExtendedList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_extended/aircraft_extended_list.html'
 
@@ -540,6 +581,7 @@ class AircraftExtendedList(APIView):
         return Response({'aircraft_extended': queryset})
     
 class AircraftExtendedDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_extended/aircraft_extended_detail.html'
 
@@ -550,6 +592,7 @@ class AircraftExtendedDetail(APIView):
         return Response({'serializer': serializer, 'aircraft_extended': aircraft_detail})
 
 class AircraftExtendedUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_extended/aircraft_extended_update.html'
 
@@ -566,7 +609,8 @@ class AircraftExtendedUpdate(APIView):
         serializer.save()
         return redirect('aircraft-extended-list')
 
-class AircraftExtendedCreateView(CreateView):
+class AircraftExtendedCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AircraftDetailCreateForm()}
         return render(request, 'launchpad/aircraft_extended/aircraft_extended_create.html', context)
@@ -585,6 +629,7 @@ class AircraftExtendedCreateView(CreateView):
 ### Aircraft Assemblies Views
     
 class AircraftAssembliesList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_assembly/aircraft_assembly_list.html'
 
@@ -609,6 +654,7 @@ class AircraftAssembliesList(APIView):
                
         
 class AircraftAssembliesDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_assembly/aircraft_assembly_detail.html'
 
@@ -621,6 +667,7 @@ class AircraftAssembliesDetail(APIView):
         return Response({'serializer': serializer, 'aircraft_assembly': aircraft_assembly,'assembly_components':assembly_components})
 
 class AircraftAssembliesUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_assembly/aircraft_assembly_update.html'
 
@@ -638,6 +685,7 @@ class AircraftAssembliesUpdate(APIView):
         return redirect('aircraft-assemblies-list')
 
 class AircraftAssembliesComponentsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     
     def get(self, request, aircraft_assembly_id):
         aircraft_assembly_exists = AircraftAssembly.objects.filter(id = aircraft_assembly_id).exists()
@@ -669,7 +717,8 @@ class AircraftAssembliesComponentsUpdate(APIView):
         return render(request, 'launchpad/aircraft_assembly/aircraft_assembly_component_update.html', context)
 
 
-class AircraftAssembliesCreateView(CreateView):
+class AircraftAssembliesCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request,aircraft_model_id):
 
         aircraft_model = AircraftModel.objects.filter(id = aircraft_model_id).exists()
@@ -712,6 +761,7 @@ class AircraftAssembliesCreateView(CreateView):
 ### Aircraft Models Views
     
 class AircraftModelsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_model/aircraft_models_list.html'
 
@@ -767,6 +817,7 @@ class AircraftModelsList(APIView):
 
         
 class AircraftModelsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_model/aircraft_models_detail.html'
 
@@ -779,6 +830,7 @@ class AircraftModelsDetail(APIView):
         return Response({'serializer': serializer, 'aircraft_model': aircraft_model,'aircraft_master_components':aircraft_master_components})
 
 class AircraftModelsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_model/aircraft_models_update.html'
 
@@ -795,7 +847,8 @@ class AircraftModelsUpdate(APIView):
         serializer.save()
         return redirect('aircraft-models-list')
 
-class AircraftModelsCreateView(CreateView):
+class AircraftModelsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AircraftModelCreateForm()}
         return render(request, 'launchpad/aircraft_model/aircraft_models_create.html', context)
@@ -811,6 +864,7 @@ class AircraftModelsCreateView(CreateView):
       
 
 class AircraftModelMasterComponents(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_model/aircraft_model_components.html'
 
@@ -823,6 +877,7 @@ class AircraftModelMasterComponents(APIView):
 ### Aircraft Master Component Views
     
 class AircraftMasterComponentsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_master_component/aircraft_master_components_list.html'
 
@@ -879,6 +934,7 @@ class AircraftMasterComponentsList(APIView):
           
     
 class AircraftMasterComponentsStockDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_master_component_stock_keeping/aircraft_master_components_stock_keeping.html'
 
@@ -942,6 +998,7 @@ class AircraftMasterComponentsStockDetail(APIView):
 
           
 class AircraftMasterComponentsFamilyList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_master_component/aircraft_master_components_list.html'
 
@@ -998,6 +1055,7 @@ class AircraftMasterComponentsFamilyList(APIView):
 
         
 class AircraftMasterComponentsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_master_component/aircraft_master_components_detail.html'
 
@@ -1009,6 +1067,7 @@ class AircraftMasterComponentsDetail(APIView):
         return Response({'serializer': serializer, 'aircraft_master_component': aircraft_master_component, 'components':components})
 
 class AircraftMasterComponentsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_master_component/aircraft_master_components_update.html'
 
@@ -1025,7 +1084,8 @@ class AircraftMasterComponentsUpdate(APIView):
         serializer.save()
         return redirect('aircraft-master-components-list')
 
-class AircraftMasterComponentsCreateView(CreateView):
+class AircraftMasterComponentsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': AircraftMasterComponentCreateForm()}
         return render(request, 'launchpad/aircraft_master_component/aircraft_master_components_create.html', context)
@@ -1044,6 +1104,7 @@ class AircraftMasterComponentsCreateView(CreateView):
 ### Aircraft Component Views
     
 class AircraftComponentsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_list.html'
 
@@ -1104,6 +1165,7 @@ class AircraftComponentsList(APIView):
         return Response(payload)
         
 class AircraftComponentsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_detail.html'
 
@@ -1116,6 +1178,7 @@ class AircraftComponentsDetail(APIView):
         return Response({'serializer': serializer, 'aircraft_component': aircraft_component, 'component_in_assembly':component_in_assembly})
 
 class AircraftComponentsRemove(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_remove.html'
 
@@ -1140,6 +1203,7 @@ class AircraftComponentsRemove(APIView):
         return Response({'serializer': serializer, 'aircraft_component': aircraft_component})
 
 class AircraftComponentsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_update.html'
 
@@ -1156,7 +1220,8 @@ class AircraftComponentsUpdate(APIView):
         serializer.save()
         return redirect('aircraft-components-list')
 
-class AircraftComponentsCreateView(CreateView):
+class AircraftComponentsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     form_class = AircraftComponentCreateForm
     template_name = 'launchpad/aircraft_component/aircraft_components_create.html'
     def get_context_data(self, *args, **kwargs):
@@ -1174,6 +1239,7 @@ class AircraftComponentsCreateView(CreateView):
         return redirect('aircraft-components-list-filtered',view_type='available')
         
 class AircraftComponentsSearchView(APIView):
+    required_scopes = ['aerobridge.read']
     model = AircraftComponent
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_search.html' 
@@ -1200,6 +1266,7 @@ class AircraftComponentsSearchView(APIView):
         return Response({'aircraft_components': components})
         
 class AircraftComponentsHistoryView(APIView):
+    required_scopes = ['aerobridge.read']
     model = AircraftComponent
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_history.html' 
@@ -1223,7 +1290,8 @@ class AircraftComponentsHistoryView(APIView):
         return Response({'aircraft_component_history': all_component_history_diff })
         
         
-class AircraftComponentsSearchResultsView(ListView):
+class AircraftComponentsSearchResultsView(RequiredScopesMixin, ListView):
+    required_scopes = ['aerobridge.read']
     model = AircraftComponent
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/aircraft_component/aircraft_components_search_results.html' 
@@ -1241,6 +1309,7 @@ class AircraftComponentsSearchResultsView(ListView):
 ### Company Views
     
 class CompaniesList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/company/company_list.html'
 
@@ -1249,6 +1318,7 @@ class CompaniesList(APIView):
         return Response({'companies': queryset})
     
 class CompaniesDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/company/company_detail.html'
 
@@ -1259,6 +1329,7 @@ class CompaniesDetail(APIView):
 
 
 class CompaniesUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/company/company_update.html'
 
@@ -1277,7 +1348,8 @@ class CompaniesUpdate(APIView):
         serializer.save()
         return redirect('companies-list')
 
-class CompanyCreateView(CreateView):
+class CompanyCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': CompanyCreateForm()}
         return render(request, 'launchpad/company/company_create.html', context)
@@ -1295,6 +1367,7 @@ class CompanyCreateView(CreateView):
 ### Firmware Views
     
 class FirmwaresList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/firmware/firmware_list.html'
 
@@ -1303,6 +1376,7 @@ class FirmwaresList(APIView):
         return Response({'firmwares': queryset})
 
 class FirmwaresDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/firmware/firmware_detail.html'
 
@@ -1312,6 +1386,7 @@ class FirmwaresDetail(APIView):
         return Response({'serializer': serializer, 'firmware': firmware})
 
 class FirmwaresUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/firmware/firmware_update.html'
 
@@ -1328,7 +1403,8 @@ class FirmwaresUpdate(APIView):
         serializer.save()
         return redirect('firmwares-list')
 
-class FirmwareCreateView(CreateView):
+class FirmwareCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     def get(self, request, *args, **kwargs):
         context = {'form': FirmwareCreateForm()}
@@ -1346,6 +1422,7 @@ class FirmwareCreateView(CreateView):
 ### Flight Plan Views
     
 class FlightPlansList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_plan/flightplan_list.html'
     pagination_class = StandardResultsSetPagination
@@ -1402,16 +1479,25 @@ class FlightPlansList(APIView):
         return Response(payload)
 
 class FlightPlansDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_plan/flightplan_detail.html'
 
     def get(self, request, flightplan_id):
         flightplan = get_object_or_404(FlightPlan, pk=flightplan_id)
         serializer = FlightPlanReadSerializer(flightplan)
-        return Response({'serializer': serializer, 'flightplan': flightplan})
+        try:
+            geo_json = level_of_detail.simplified_plan(flightplan.id, settings.LEVEL_OF_DETAIL_DEFAULT_ZOOM)
+        except Exception as e:
+            # Plans whose geometry cannot be simplified are drawn as stored
+            logger.warning("Flight plan %s could not be simplified: %s" % (flightplan.id, e))
+            geo_json = flightplan.geo_json
+        geo_json = json.dumps(geo_json)
+        return Response({'serializer': serializer, 'flightplan': flightplan, 'geo_json': geo_json})
 
 
 class FlightPlansUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_plan/flightplan_update.html'
     serializer_class = FlightPlanSerializer
@@ -1428,7 +1514,8 @@ class FlightPlansUpdate(APIView):
         serializer.save()
         return redirect('flightplans-list')
 
-class FlightPlanCreateView(CreateView):
+class FlightPlanCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     
     def get(self, request, *args, **kwargs):
         context = {'form': FlightPlanCreateForm()}
@@ -1447,7 +1534,8 @@ class FlightPlanCreateView(CreateView):
 ## Flight Operation Views
     
 
-class FlightOperationsCalendar(generic.ListView):
+class FlightOperationsCalendar(RequiredScopesMixin, generic.ListView):
+    required_scopes = ['aerobridge.read']
     model = FlightOperation
     template_name = 'launchpad/flight_operation/flightoperation_calendar.html'
 
@@ -1495,6 +1583,7 @@ class FlightOperationsCalendar(generic.ListView):
 
 
 class FlightOperationsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_operation/flightoperation_list.html'
     pagination_class = StandardResultsSetPagination
@@ -1551,6 +1640,7 @@ class FlightOperationsList(APIView):
         return Response(payload)
 
 class FlightOperationsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_operation/flightoperation_detail.html'
 
@@ -1566,6 +1656,7 @@ class FlightOperationsDetail(APIView):
 
 
 class FlightOperationsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_operation/flightoperation_update.html'
 
@@ -1582,7 +1673,8 @@ class FlightOperationsUpdate(APIView):
         serializer.save()
         return redirect('flightoperations-list')
 
-class FlightOperationCreateView(CreateView):
+class FlightOperationCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': FlightOperationCreateForm()}
         return render(request, 'launchpad/flight_operation/flightoperation_create.html', context)
@@ -1600,6 +1692,7 @@ class FlightOperationCreateView(CreateView):
         return render(request, 'launchpad/flight_operation/flightoperation_create.html', context)
   
 class FlightOperationPermissionCreateView(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_operation/flightoperation_permission_thanks.html'
     
@@ -1618,8 +1711,7 @@ class FlightOperationPermissionCreateView(APIView):
                 
                 return Response({'errors': "Cannot issue permissions for operations whose start time is in the past or more than a hour from now"})
             
-            flight_permission = permissions_issuer.issue_permission(flight_operation_id = flight_operation.id)
-            flight_permission = flight_permission['flight_permission']
+            flight_permission = permissions_issuer.issue_permission_once(flight_operation.id)
                     
         return Response({'flightpermissions': flight_permission})
 
@@ -1627,6 +1719,7 @@ class FlightOperationPermissionCreateView(APIView):
 ### Flight Permission Views
     
 class FlightPermissionsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_permission/flightpermission_list.html'
     pagination_class = StandardResultsSetPagination
@@ -1684,6 +1777,7 @@ class FlightPermissionsList(APIView):
         
     
 class FlightPermissionsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_permission/flightpermission_detail.html'
 
@@ -1713,6 +1807,7 @@ class FlightPermissionsDetail(APIView):
     
     
 class FlightPermissionDigitalSkyList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flightpermission_digitalsky_list.html'
     
@@ -1726,6 +1821,7 @@ class FlightPermissionDigitalSkyList(APIView):
 
 
 class FlightPermissionDigitalSkyRequest(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_permission_digital_sky/flightpermission_digitalsky_detail.html'
     
@@ -1741,12 +1837,14 @@ class FlightPermissionDigitalSkyRequest(APIView):
 
         return redirect('flightpermissions-digitalsky-thanks')
     
-class FlightPermissionDigitalSkyThanks(TemplateView):
+class FlightPermissionDigitalSkyThanks(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     
     template_name = 'launchpad/flight_permission_digital_sky/flightpermission_digitalsky_thanks.html'
 
     
 class FlightPermissionsArtefactList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_permission_digital_sky/flightpermission_list.html'
 
@@ -1755,6 +1853,7 @@ class FlightPermissionsArtefactList(APIView):
         return Response({'flightpermissions': queryset})
     
 class FlightPermissionsArtefactDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_permission_digital_sky/flightpermission_detail.html'
 
@@ -1768,14 +1867,16 @@ class FlightPermissionsArtefactDetail(APIView):
 ### Flight Logs Views
     
 class FlightLogsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_log/flightlog_list.html'
 
     def get(self, request):
-        queryset = FlightLog.objects.all()
+        queryset = FlightLog.objects.defer('raw_log').select_related('operation')
         return Response({'flightlogs': queryset})
     
-class FlightLogsCalender(generic.ListView):
+class FlightLogsCalender(RequiredScopesMixin, generic.ListView):
+    required_scopes = ['aerobridge.read']
     model = FlightLog
     template_name = 'launchpad/flight_log/flightlog_calendar.html'
 
@@ -1826,6 +1927,7 @@ class FlightLogsCalender(generic.ListView):
 
 
 class FlightLogsSign(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_log/flightlog_sign_thanks.html'
 
@@ -1835,16 +1937,25 @@ class FlightLogsSign(APIView):
     
 
 class FlightLogsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_log/flightlog_detail.html'
 
     def get(self, request, flightlog_id):
         flightlog = get_object_or_404(FlightLog, pk=flightlog_id)
         serializer = FlightLogSerializer(flightlog)
-        return Response({'serializer': serializer, 'flightlog': flightlog})
+        try:
+            track = level_of_detail.simplified_track(flightlog.id, settings.LEVEL_OF_DETAIL_DEFAULT_ZOOM)
+        except Exception as e:
+            logger.warning("The track of flight log %s could not be simplified: %s" % (flightlog.id, e))
+            track = None
+        # The map is only drawn for logs with at least one position
+        track = json.dumps(track) if track and track['geometry']['coordinates'] else None
+        return Response({'serializer': serializer, 'flightlog': flightlog, 'track': track})
 
         
 class FlightLogsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/flight_log/flightlog_update.html'
 
@@ -1852,7 +1963,14 @@ class FlightLogsUpdate(APIView):
         
         flightlog = get_object_or_404(FlightLog, pk=flightlog_id)
         serializer = FlightLogSerializer(flightlog)
-        return Response({'serializer': serializer, 'flightlog': flightlog})
+        try:
+            track = level_of_detail.simplified_track(flightlog.id, settings.LEVEL_OF_DETAIL_DEFAULT_ZOOM)
+        except Exception as e:
+            logger.warning("The track of flight log %s could not be simplified: %s" % (flightlog.id, e))
+            track = None
+        # The map is only drawn for logs with at least one position
+        track = json.dumps(track) if track and track['geometry']['coordinates'] else None
+        return Response({'serializer': serializer, 'flightlog': flightlog, 'track': track})
 
     def post(self, request, flightlog_id):
         
@@ -1866,7 +1984,8 @@ class FlightLogsUpdate(APIView):
         return redirect('flightlogs-list')
 
 
-class FlightLogCreateView(CreateView):
+class FlightLogCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     def get(self, request, *args, **kwargs):
         context = {'form': FlightLogCreateForm()}
         return render(request, 'launchpad/flight_log/flightlog_create.html', context)
@@ -1922,14 +2041,16 @@ class FlightLogCreateView(CreateView):
 
     
 class SignedFlightLogsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/signed_flight_log/signed_flightlog_list.html'
 
     def get(self, request):
-        queryset = SignedFlightLog.objects.all()
+        queryset = SignedFlightLog.objects.defer('signed_log').select_related('raw_flight_log__operation').defer('raw_flight_log__raw_log')
         return Response({'signed_flightlogs': queryset})
     
 class SignedFlightLogsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/signed_flight_log/signed_flightlog_detail.html'
 
@@ -2009,10 +2130,12 @@ class SignedFlightLogsDetail(APIView):
     
     
 # Aerobridge Credentials View
-class CredentialsReadFirst(TemplateView):    
+class CredentialsReadFirst(RequiredScopesMixin, TemplateView):
+    required_scopes = ['aerobridge.read']
     template_name = 'launchpad/credential/credentials_read_first.html'
     
 class CredentialsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/credential/credential_list.html'
     pagination_class = StandardResultsSetPagination
@@ -2068,6 +2191,7 @@ class CredentialsList(APIView):
         return Response(payload)
     
 class CredentialsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/credential/credential_detail.html'
 
@@ -2078,6 +2202,7 @@ class CredentialsDetail(APIView):
 
 
 class CredentialsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/credential/credential_update.html'
 
@@ -2095,7 +2220,8 @@ class CredentialsUpdate(APIView):
         serializer.save()
         return redirect('credentials-list')
 
-class CredentialsDelete(DestroyAPIView):  
+class CredentialsDelete(DestroyAPIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     serializer_class = AerobridgeCredentialSerializer
     def get_credential(self, pk):
         try:
@@ -2110,7 +2236,8 @@ class CredentialsDelete(DestroyAPIView):
         return redirect('credentials-list')
 
 
-class CredentialsCreateView(CreateView):
+class CredentialsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/credential/credentials_create.html'
     form_class = TokenCreateForm
@@ -2119,9 +2246,7 @@ class CredentialsCreateView(CreateView):
     def form_valid(self, form):
         self.object = form.save(commit=False)
         
-        secret_key = settings.CRYPTOGRAPHY_SALT.encode('utf-8')
-
-        f = encrpytion_util.EncrpytionHelper(secret_key= secret_key)
+        f = encrpytion_util.get_encryption_helper()
         
         enc_token = f.encrypt(message = form.data['credential'].encode('utf-8'))
         self.object.token = enc_token
@@ -2134,6 +2259,7 @@ class CredentialsCreateView(CreateView):
 # Cloud Files View
     
 class CloudFilesList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/cloud_file/cloudfiles_list.html'
     serializers = CloudFileSerializer
@@ -2142,6 +2268,7 @@ class CloudFilesList(APIView):
         return Response({'cloudfiles': queryset})
     
 class CloudFilesDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/cloud_file/cloudfiles_detail.html'
 
@@ -2152,6 +2279,7 @@ class CloudFilesDetail(APIView):
 
 
 class CloudFilesCreateView(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     parser_classes = (MultiPartParser,)
     def get(self, request, *args, **kwargs):
@@ -2176,9 +2304,9 @@ class CloudFilesCreateView(APIView):
                 f.flush()
                 
                 try:
-                    s3 = boto3.client('s3', region_name =env.get('S3_REGION_NAME','0'), endpoint_url= endpoint_url, aws_access_key_id=env.get('S3_ACCESS_KEY','0'),aws_secret_access_key=env.get('S3_SECRET_KEY','0'))                               
+                    s3 = get_s3_client(region_name =env.get('S3_REGION_NAME','0'), endpoint_url= endpoint_url, aws_access_key_id=env.get('S3_ACCESS_KEY','0'),aws_secret_access_key=env.get('S3_SECRET_KEY','0'))
                     
-                    s3.upload_fileobj(f, BUCKET_NAME, os.path.join(file_type, file_name))
+                    get_upstream('s3').call(s3.upload_fileobj, f, BUCKET_NAME, os.path.join(file_type, file_name))
                 except NoCredentialsError as ne:                                        
                     context = {'errors':'File not uploaded, problem  with Cloud Bucket credentials'}   
                     return render(request, 'launchpad/cloud_file/cloudfiles_error.html', context)
@@ -2201,7 +2329,8 @@ class CloudFilesCreateView(APIView):
 
 
 
-class IncidentsCalendar(generic.ListView):
+class IncidentsCalendar(RequiredScopesMixin, generic.ListView):
+    required_scopes = ['aerobridge.read']
     model = Incident
     template_name = 'launchpad/incidents/incident_calendar.html'
 
@@ -2250,6 +2379,7 @@ class IncidentsCalendar(generic.ListView):
 
 
 class IncidentsList(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/incidents/incident_list.html'
 
@@ -2258,6 +2388,7 @@ class IncidentsList(APIView):
         return Response({'incidents': queryset})
     
 class IncidentsUpdate(APIView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/incidents/incident_update.html'
 
@@ -2276,6 +2407,7 @@ class IncidentsUpdate(APIView):
 
 
 class IncidentsDetail(APIView):
+    required_scopes = ['aerobridge.read']
     renderer_classes = [TemplateHTMLRenderer]
     template_name = 'launchpad/incidents/incident_detail.html'
 
@@ -2285,7 +2417,8 @@ class IncidentsDetail(APIView):
         return Response({'serializer': serializer, 'incident': incident})
 
 
-class IncidentsCreateView(CreateView):
+class IncidentsCreateView(RequiredScopesMixin, CreateView):
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     
     def get(self, request, aircraft_id, *args, **kwargs):
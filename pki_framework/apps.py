@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PkiFrameworkConfig(AppConfig):
     name = 'pki_framework'
+
+    def ready(self):
+        from . import signals  # noqa: F401
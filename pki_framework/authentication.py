@@ -0,0 +1,56 @@
+import jwt
+from django.conf import settings
+from rest_framework import authentication, exceptions
+
+from .key_store import PublicKeyNotFound
+from .utils import verify_access_token
+
+
+class PassportUser():
+    ''' A lightweight user for requests authenticated with a Flight Passport access token, the token claims are available on request.auth '''
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.username = str(claims.get('sub', '')).replace('|', '.')
+
+    def __str__(self):
+        return self.username
+
+
+class PassportTokenAuthentication(authentication.BaseAuthentication):
+    ''' Authenticate requests carrying a Flight Passport bearer token. The token is verified once per request and its claims are attached to request.auth, authentication is skipped when SECURE_API_ENDPOINTS is off. '''
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        if not settings.SECURE_API_ENDPOINTS:
+            return None
+
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Incorrect Bearer token provided, please get a new one and try again')
+
+        try:
+            token = auth[1].decode('utf-8')
+            claims = verify_access_token(token)
+        except (PublicKeyNotFound, KeyError, UnicodeError):
+            raise exceptions.AuthenticationFailed('Incorrect Bearer token provided, please get a new one and try again')
+        except jwt.ExpiredSignatureError:
+            raise exceptions.AuthenticationFailed('Token Signature has expired')
+        except jwt.InvalidAudienceError:
+            raise exceptions.AuthenticationFailed('Invalid audience in token')
+        except jwt.InvalidIssuerError:
+            raise exceptions.AuthenticationFailed('Invalid issuer for token')
+        except jwt.InvalidSignatureError:
+            raise exceptions.AuthenticationFailed('Invalid signature in token')
+        except Exception:
+            raise exceptions.AuthenticationFailed('Invalid token')
+
+        return (PassportUser(claims), claims)
+
+    def authenticate_header(self, request):
+        return self.keyword
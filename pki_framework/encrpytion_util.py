@@ -1,20 +1,59 @@
-from cryptography.fernet import Fernet
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, MultiFernet
+from django.conf import settings
 
 class EncrpytionHelper():
-    ''' A class to help with Encrpytoin / Decryption of secure data within Aerobridge '''
+    ''' A class to help with Encrpytoin / Decryption of secure data within Aerobridge. Data is always encrypted with the secret key, the fallback keys are only used to decrypt data encrypted before a key rotation. '''
 
-    def __init__(self, secret_key):
-        self.f = Fernet(secret_key)
+    def __init__(self, secret_key, fallback_keys=None):
+        keys = [secret_key] + list(fallback_keys or [])
+        self.f = MultiFernet([Fernet(key) for key in keys])
 
     def encrypt(self, message):
         encrypted = self.f.encrypt(message)
         return encrypted
-        
+
 
     def decrypt(self, encrypted_data):
         """
         Given a message (byes) and key (bytes), it decrypts the message and returns it
         """
-        
+
         decrypted_data = self.f.decrypt(encrypted_data)
         return decrypted_data
+
+    def rotate(self, encrypted_data):
+        """
+        Given a message encrypted with any of the keys, re-encrypt it with the secret key
+        """
+
+        return self.f.rotate(encrypted_data)
+
+
+@lru_cache(maxsize=4)
+def _build_encryption_helper(secret_key, fallback_keys):
+    return EncrpytionHelper(secret_key=secret_key.encode('utf-8'), fallback_keys=[key.encode('utf-8') for key in fallback_keys])
+
+
+def get_encryption_helper():
+    ''' Return the process wide helper for the configured CRYPTOGRAPHY_SALT and CRYPTOGRAPHY_SALT_FALLBACKS, the keys are encoded and the cipher is built once and reused across requests '''
+    return _build_encryption_helper(settings.CRYPTOGRAPHY_SALT, tuple(settings.CRYPTOGRAPHY_SALT_FALLBACKS))
+
+
+def decrypt_token(token):
+    ''' Decrypt a stored credential token and return it as text '''
+    if isinstance(token, memoryview): #for Postgres / Django
+        token = token.tobytes()
+    return get_encryption_helper().decrypt(token).decode('utf-8')
+
+
+def decrypt_tokens(tokens):
+    ''' Decrypt many stored credential tokens in one pass with a single cipher, tokens maps any key (e.g. the credential id) to the stored token '''
+    decrypt = get_encryption_helper().decrypt
+    decrypted = {}
+    for key, token in tokens.items():
+        if isinstance(token, memoryview):
+            token = token.tobytes()
+        decrypted[key] = decrypt(token).decode('utf-8')
+    return decrypted
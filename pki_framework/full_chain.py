@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+
+from cryptography import x509
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from common.http_client import get_upstream
+
+from .models import AerobridgeExternalCredential
+
+logger = logging.getLogger(__name__)
+
+PEM_CERTIFICATE_RE = re.compile(r'-----BEGIN CERTIFICATE-----\s.+?\s-----END CERTIFICATE-----', re.DOTALL)
+
+
+class InvalidFullChain(Exception):
+    ''' Raised when a downloaded full chain does not contain valid PEM certificates '''
+    pass
+
+
+class FullChainUnavailable(Exception):
+    ''' Raised when none of the active credentials has a full chain, neither downloaded nor cached '''
+    pass
+
+
+def parse_full_chain(content):
+    ''' Split a PEM bundle into its certificate blocks and check that every block parses, returns the normalised bundle '''
+    blocks = PEM_CERTIFICATE_RE.findall(content)
+    if not blocks:
+        raise InvalidFullChain("No PEM certificates found in the full chain")
+    for block in blocks:
+        try:
+            x509.load_pem_x509_certificate(block.encode('utf-8'))
+        except ValueError as e:
+            raise InvalidFullChain("Invalid certificate in the full chain: %s" % e)
+    return '\n'.join(blocks) + '\n'
+
+
+class AuthServerFullChainCache():
+    ''' Keeps the downloaded and validated auth server full chain of every active credential in the Django cache together with a strong ETag. The entry is keyed on the ids and updated_at of the active credentials, so a credential changed in any process is noticed by the next request of every process even with a per-process cache. The chains are also downloaded again in a background thread whenever an AerobridgeExternalCredential row changes, so requests are served from the cache. '''
+
+    cache_key = 'pki_framework:auth_server_full_chain'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _active_credentials(self):
+        return list(AerobridgeExternalCredential.objects.filter(token_type=0, association=0, is_active=True).order_by('created_at')
+                    .values('id', 'name', 'binary_file_url', 'updated_at'))
+
+    def version_key(self, credentials):
+        ''' The cache key of the chains of a set of active credentials '''
+        version = hashlib.sha256(json.dumps([[str(c['id']), c['updated_at'].isoformat()] for c in credentials]).encode('utf-8')).hexdigest()
+        return '%s:%s' % (self.cache_key, version)
+
+    def get(self):
+        ''' Return the cached artefact of the current active credentials, building it in the request if the cache is cold or a credential changed '''
+        credentials = self._active_credentials()
+        artefact = cache.get(self.version_key(credentials))
+        if artefact is None:
+            artefact = self.refresh(credentials)
+        return artefact
+
+    def refresh(self, credentials=None):
+        ''' Download and validate the chain of every active credential and store the result, a chain that cannot be downloaded keeps its previously cached contents. An artefact still missing chains is only cached for AUTH_SERVER_FULL_CHAIN_RETRY_TTL so that the download is tried again soon, and FullChainUnavailable is raised instead of caching an artefact with no chain at all. '''
+        with self._lock:
+            if credentials is None:
+                credentials = self._active_credentials()
+            # The latest artefact of any version holds the chains to fall back on
+            previous = cache.get(self.cache_key) or {'chains': []}
+            previous_chains = {chain['id']: chain for chain in previous['chains']}
+
+            chains = []
+            for credential in credentials:
+                credential_id = str(credential['id'])
+                try:
+                    full_chain = self._download(credential['binary_file_url'])
+                except Exception as e:
+                    logger.error("Could not refresh the auth server full chain %s: %s" % (credential['binary_file_url'], e))
+                    if credential_id in previous_chains:
+                        chains.append(previous_chains[credential_id])
+                    continue
+                chains.append({'id': credential_id, 'name': credential['name'], 'binary_file_url': credential['binary_file_url'], 'full_chain': full_chain})
+
+            if credentials and not chains:
+                raise FullChainUnavailable("None of the %d active auth server full chains could be downloaded" % len(credentials))
+            artefact = {'chains': chains, 'etag': self._etag(chains)}
+            cache.set(self.cache_key, artefact, settings.AUTH_SERVER_FULL_CHAIN_CACHE_TTL)
+            ttl = settings.AUTH_SERVER_FULL_CHAIN_CACHE_TTL if len(chains) == len(credentials) else settings.AUTH_SERVER_FULL_CHAIN_RETRY_TTL
+            cache.set(self.version_key(credentials), artefact, ttl)
+            return artefact
+
+    def refresh_in_background(self):
+        ''' Refresh the cached chains in a background thread once the current transaction commits '''
+        transaction.on_commit(self._start_refresh_thread)
+
+    def invalidate(self):
+        cache.delete_many([self.cache_key, self.version_key(self._active_credentials())])
+
+    def _start_refresh_thread(self):
+        self._refresh_thread = threading.Thread(target=self._refresh_and_close_connection, daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_and_close_connection(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Background refresh of the auth server full chain failed: %s" % e)
+        finally:
+            connection.close()
+
+    def _download(self, url):
+        response = get_upstream('auth_server').get(url, timeout=settings.AUTH_SERVER_FULL_CHAIN_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return parse_full_chain(response.text)
+
+    def _etag(self, chains):
+        digest = hashlib.sha256(json.dumps(chains, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+        return '"%s"' % digest
+
+
+full_chain_cache = AuthServerFullChainCache()
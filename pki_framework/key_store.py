@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+import time
+from os import environ as env
+
+import jwt
+from django.conf import settings
+from dotenv import load_dotenv, find_dotenv
+
+from common.http_client import get_upstream
+
+load_dotenv(find_dotenv())
+logger = logging.getLogger(__name__)
+
+
+class PublicKeyNotFound(Exception):
+    ''' Raised when no key in the Passport JWKS matches the kid of a token '''
+    pass
+
+
+class JWKSKeyStore():
+    ''' A process-wide store of the Flight Passport signing keys. The JWKS document is fetched and parsed once, the parsed keys are kept for a TTL and the document is refetched only when the TTL expires or a token presents an unknown kid. Refetches are capped to one per minimum refresh interval and if Passport cannot be reached the previously fetched keys keep being served. '''
+
+    def __init__(self, jwks_url=None, ttl=None, min_refresh_interval=None, clock=time.monotonic):
+        self._jwks_url = jwks_url
+        self._ttl = ttl
+        self._min_refresh_interval = min_refresh_interval
+        self._clock = clock
+
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def jwks_url(self):
+        if self._jwks_url:
+            return self._jwks_url
+        if settings.PASSPORT_JWKS_URL:
+            return settings.PASSPORT_JWKS_URL
+        return 'https://{}/.well-known/jwks.json'.format(env.get('PASSPORT_DOMAIN'))
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else settings.PASSPORT_JWKS_CACHE_TTL
+
+    @property
+    def min_refresh_interval(self):
+        return self._min_refresh_interval if self._min_refresh_interval is not None else settings.PASSPORT_JWKS_MIN_REFRESH_INTERVAL
+
+    def get_key(self, kid):
+        ''' Return the parsed public key for a kid, refreshing the JWKS if it has expired or the kid is unknown '''
+        if kid not in self._keys or self._is_expired():
+            self._refresh_if_allowed()
+        try:
+            return self._keys[kid]
+        except KeyError:
+            raise PublicKeyNotFound("No key with kid %s in the Passport JWKS" % kid)
+
+    def invalidate(self):
+        ''' Drop all cached keys, the next lookup fetches the JWKS again '''
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._last_attempt_at = None
+
+    def _is_expired(self):
+        return self._fetched_at is None or (self._clock() - self._fetched_at) >= self.ttl
+
+    def _refresh_if_allowed(self):
+        with self._lock:
+            # Another request may have refreshed while this one waited for the lock
+            now = self._clock()
+            if self._last_attempt_at is not None and (now - self._last_attempt_at) < self.min_refresh_interval:
+                return
+            self._last_attempt_at = now
+            try:
+                self._keys = self._fetch_keys()
+            except Exception as e:
+                if self._keys:
+                    logger.warning("Could not refresh the Passport JWKS, serving stale keys: %s" % e)
+                else:
+                    logger.error("Could not fetch the Passport JWKS: %s" % e)
+            else:
+                self._fetched_at = now
+
+    def _fetch_jwks(self):
+        response = get_upstream('passport').get(self.jwks_url, timeout=settings.PASSPORT_JWKS_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_keys(self):
+        jwks = self._fetch_jwks()
+        public_keys = {}
+        for jwk in jwks['keys']:
+            public_keys[jwk['kid']] = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
+        return public_keys
+
+
+jwks_store = JWKSKeyStore()
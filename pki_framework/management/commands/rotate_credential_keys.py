@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pki_framework import encrpytion_util
+from pki_framework.models import AerobridgeCredential
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt every AerobridgeCredential token with CRYPTOGRAPHY_SALT. Tokens encrypted with a key listed in CRYPTOGRAPHY_SALT_FALLBACKS are rotated in batches, progress is checkpointed after every batch so an interrupted run resumes where it stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of credentials re-encrypted and written per batch')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.credential_key_rotation.json'), help='File used to record the last re-encrypted credential')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start from the first credential')
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)['last_id']
+        except FileNotFoundError:
+            return None
+
+    def write_checkpoint(self, path, last_id):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_id': str(last_id)}, f)
+        os.replace(tmp_path, path)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        checkpoint = options['checkpoint']
+
+        last_id = None if options['restart'] else self.read_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write('Resuming after credential %s' % last_id)
+
+        helper = encrpytion_util.get_encryption_helper()
+        credentials = AerobridgeCredential.objects.only('id', 'token').order_by('id')
+        remaining = credentials.filter(id__gt=last_id) if last_id else credentials
+        total = remaining.count()
+
+        rotated = 0
+        failed = 0
+        started_at = time.monotonic()
+        while True:
+            batch_query = credentials.filter(id__gt=last_id) if last_id else credentials
+            batch = list(batch_query[:batch_size])
+            if not batch:
+                break
+
+            to_update = []
+            for credential in batch:
+                token = credential.token
+                if isinstance(token, memoryview):
+                    token = token.tobytes()
+                try:
+                    credential.token = helper.rotate(token)
+                except InvalidToken:
+                    failed += 1
+                    self.stderr.write('Credential %s cannot be decrypted with any configured key, skipping' % credential.id)
+                else:
+                    to_update.append(credential)
+
+            with transaction.atomic():
+                AerobridgeCredential.objects.bulk_update(to_update, ['token'])
+            last_id = batch[-1].id
+            self.write_checkpoint(checkpoint, last_id)
+
+            rotated += len(to_update)
+            elapsed = time.monotonic() - started_at
+            rate = (rotated + failed) / elapsed if elapsed else 0
+            self.stdout.write('%d/%d credentials processed (%.0f per second)' % (rotated + failed, total, rate))
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS('Re-encrypted %d credentials, %d could not be decrypted' % (rotated, failed)))
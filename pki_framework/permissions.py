@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.core.exceptions import PermissionDenied
+from rest_framework import exceptions, permissions
+
+
+def session_scopes(user):
+    ''' Map a signed in Django user, e.g. a Launchpad session, to the Passport scopes it is granted: staff get STAFF_SESSION_SCOPES and other active users SESSION_SCOPES '''
+    if not user or not user.is_authenticated or not user.is_active:
+        return set()
+    return set(settings.STAFF_SESSION_SCOPES if user.is_staff else settings.SESSION_SCOPES)
+
+
+class HasRequiredScopes(permissions.BasePermission):
+    ''' Allow access when the Passport token on the request, or the scopes of the signed in Django user, cover every scope listed in the required_scopes attribute of the view. Views that do not declare required_scopes are left open. '''
+    message = {'message': 'You don\'t have access to this resource'}
+
+    def has_permission(self, request, view):
+        required_scopes = getattr(view, 'required_scopes', None)
+        if not settings.SECURE_API_ENDPOINTS or not required_scopes:
+            return True
+
+        if isinstance(request.auth, dict):
+            granted_scopes = set(request.auth.get('scope', '').split())
+        elif request.user and request.user.is_authenticated:
+            granted_scopes = session_scopes(request.user)
+        else:
+            raise exceptions.NotAuthenticated('Authentication credentials were not provided')
+
+        return set(required_scopes).issubset(granted_scopes)
+
+
+class RequiredScopesMixin(AccessMixin):
+    ''' Apply the required_scopes check to Django class based views such as the Launchpad forms, anonymous users are sent to the login page and signed in users are checked with session_scopes '''
+    required_scopes = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if settings.SECURE_API_ENDPOINTS and self.required_scopes:
+            if not request.user.is_authenticated:
+                return self.handle_no_permission()
+            if not set(self.required_scopes).issubset(session_scopes(request.user)):
+                raise PermissionDenied(HasRequiredScopes.message['message'])
+        return super().dispatch(request, *args, **kwargs)
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from pki_framework.models import AerobridgeCredential, AerobridgeExternalCredential
 from . import encrpytion_util
-from django.conf import settings
+from django.db import models
 from django.core.exceptions import ValidationError
 
 class AerobridgeCredentialSerializer(serializers.ModelSerializer):
@@ -28,16 +28,7 @@ class AerobridgeCredentialSerializer(serializers.ModelSerializer):
         return obj.get_token_type_display()
     
     def get_token(self, digital_sky_credentials):
-        token = digital_sky_credentials.token
-        if isinstance(token, memoryview): #for Postgres / Django
-            token = token.tobytes()
-            
-        secret_key = settings.CRYPTOGRAPHY_SALT.encode('utf-8')
-        
-        f = encrpytion_util.EncrpytionHelper(secret_key=secret_key)
-        t = f.decrypt(token)        
-        t = t.decode('utf-8')
-        return t
+        return encrpytion_util.decrypt_token(digital_sky_credentials.token)
 
     class Meta:
         model = AerobridgeCredential
@@ -46,22 +37,12 @@ class AerobridgeCredentialSerializer(serializers.ModelSerializer):
 class TokenField(serializers.Field):
 
     def to_representation(self, value):
-        
-        token = value
-        if isinstance(token, memoryview): #for Postgres / Django
-            token = token.tobytes()
-            
-        secret_key = settings.CRYPTOGRAPHY_SALT.encode('utf-8')
-        
-        f = encrpytion_util.EncrpytionHelper(secret_key=secret_key)
-        t = f.decrypt(token)
-        t = t.decode('utf-8')
-        return t
+        return encrpytion_util.decrypt_token(value)
+
     def to_internal_value(self, data):
         
         token = data.encode('utf-8')
-        secret_key = settings.CRYPTOGRAPHY_SALT.encode('utf-8')        
-        my_encryptor = encrpytion_util.EncrpytionHelper(secret_key=secret_key)
+        my_encryptor = encrpytion_util.get_encryption_helper()
         enc_token = my_encryptor.encrypt(message=token)
         
         return enc_token
@@ -93,6 +74,15 @@ class AerobridgeCredentialPostSerializer(serializers.ModelSerializer):
         model = AerobridgeCredential
         fields = ('token', 'name', 'token_type', 'extension','association','is_active', 'id','aircraft','manufacturer','operator',)
 
+class AerobridgeCredentialListSerializer(serializers.ListSerializer):
+    ''' Decrypts the tokens of all credentials being listed in a single pass with one cipher before the rows are serialized '''
+
+    def to_representation(self, data):
+        credentials = list(data.all() if isinstance(data, models.Manager) else data)
+        self.context['decrypted_tokens'] = encrpytion_util.decrypt_tokens({c.pk: c.token for c in credentials})
+        return super().to_representation(credentials)
+
+
 class AerobridgeCredentialGetSerializer(serializers.ModelSerializer):
     token = serializers.SerializerMethodField()
     token_type = serializers.SerializerMethodField()
@@ -104,19 +94,14 @@ class AerobridgeCredentialGetSerializer(serializers.ModelSerializer):
         return obj.get_association_display()
 
     def get_token(self, digital_sky_credentials):
-        token = digital_sky_credentials.token
-        if isinstance(token, memoryview): #for Postgres / Django
-            token = token.tobytes()
-            
-        secret_key = settings.CRYPTOGRAPHY_SALT.encode('utf-8')
-        
-        f = encrpytion_util.EncrpytionHelper(secret_key=secret_key)
-        t = f.decrypt(token)
-        t = t.decode('utf-8')
-        return t
+        decrypted_tokens = self.context.get('decrypted_tokens')
+        if decrypted_tokens is not None and digital_sky_credentials.pk in decrypted_tokens:
+            return decrypted_tokens[digital_sky_credentials.pk]
+        return encrpytion_util.decrypt_token(digital_sky_credentials.token)
 
     class Meta:
         model = AerobridgeCredential
+        list_serializer_class = AerobridgeCredentialListSerializer
         fields = ('created_at', 'token','name', 'token_type', 'extension','association','is_active', 'id','aircraft','manufacturer','operator',)
         # extra_kwargs = {
         #     'token': {'write_only': True}
@@ -124,6 +109,33 @@ class AerobridgeCredentialGetSerializer(serializers.ModelSerializer):
 
 
 
+class AerobridgeCredentialMetadataSerializer(serializers.ModelSerializer):
+    ''' A serializer to list credentials without decrypting their tokens '''
+    token_type = serializers.SerializerMethodField()
+    def get_token_type(self, obj):
+        return obj.get_token_type_display()
+
+    association = serializers.SerializerMethodField()
+    def get_association(self, obj):
+        return obj.get_association_display()
+
+    class Meta:
+        model = AerobridgeCredential
+        fields = ('created_at', 'name', 'token_type', 'extension','association','is_active', 'id','aircraft','manufacturer','operator',)
+
+
+class AerobridgeCredentialRevealSerializer(serializers.ModelSerializer):
+    ''' A serializer to reveal the decrypted token of a single credential '''
+    token = serializers.SerializerMethodField()
+
+    def get_token(self, obj):
+        return encrpytion_util.decrypt_token(obj.token)
+
+    class Meta:
+        model = AerobridgeCredential
+        fields = ('id', 'name', 'token',)
+
+
 class AerobridgeExternalCredentialSerializer(serializers.ModelSerializer):
     ''' A serializer for saving Firmware '''
 
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .full_chain import full_chain_cache
+from .models import AerobridgeExternalCredential
+
+
+@receiver(post_save, sender=AerobridgeExternalCredential)
+@receiver(post_delete, sender=AerobridgeExternalCredential)
+def refresh_auth_server_full_chain(sender, **kwargs):
+    if kwargs.get('raw'):  # fixture loading
+        return
+    full_chain_cache.refresh_in_background()
@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from . import encrpytion_util
+from .models import AerobridgeCredential
+
+logger = logging.getLogger(__name__)
+
+MANAGEMENT_SERVER = 5
+
+
+class SigningKeyNotFound(Exception):
+    ''' Raised when no active Management Server private key is stored in Aerobridge '''
+    pass
+
+
+@dataclass
+class SigningKey:
+    ''' A parsed private key ready for signing along with the public JWK that is published for verification '''
+    kid: str
+    algorithm: str
+    private_key: object
+    public_key: object
+    public_jwk: dict
+
+
+def jwk_thumbprint(jwk):
+    ''' Compute the RFC 7638 thumbprint of a public JWK, used as the kid of the key '''
+    required_members = {'RSA': ('e', 'kty', 'n'), 'EC': ('crv', 'kty', 'x', 'y')}[jwk['kty']]
+    canonical = json.dumps({k: jwk[k] for k in required_members}, separators=(',', ':'), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('utf-8')
+
+
+def _b64url_uint(value, length):
+    return base64.urlsafe_b64encode(value.to_bytes(length, 'big')).rstrip(b'=').decode('utf-8')
+
+
+def ec_public_jwk(public_key):
+    ''' Export a P-256 public key as a JWK, the installed PyJWT cannot export EC keys '''
+    numbers = public_key.public_numbers()
+    return {'kty': 'EC', 'crv': 'P-256', 'x': _b64url_uint(numbers.x, 32), 'y': _b64url_uint(numbers.y, 32)}
+
+
+def parse_signing_key(pem):
+    ''' Parse a PEM encoded RSA or P-256 private key into a SigningKey '''
+    private_key = serialization.load_pem_private_key(pem.encode('utf-8'), password=None)
+    public_key = private_key.public_key()
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        algorithm = 'RS256'
+        public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(public_key))
+    elif isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+        algorithm = 'ES256'
+        public_jwk = ec_public_jwk(public_key)
+    else:
+        raise ValueError("Only RSA and P-256 private keys can be used to sign permissions")
+    kid = jwk_thumbprint(public_jwk)
+    public_jwk.update({'kid': kid, 'use': 'sig', 'alg': algorithm})
+    return SigningKey(kid=kid, algorithm=algorithm, private_key=private_key, public_key=public_key, public_jwk=public_jwk)
+
+
+class ManagementServerKeyCache():
+    ''' Keeps the parsed Management Server private key stored in AerobridgeCredential. Each lookup only reads the id and updated_at of the active credential, the token is decrypted and parsed again only when the credential changes. '''
+
+    def __init__(self):
+        self._version = None
+        self._signing_key = None
+        self._lock = threading.Lock()
+
+    def get_signing_key(self):
+        version = AerobridgeCredential.objects.filter(association=MANAGEMENT_SERVER, is_active=True).order_by('-updated_at').values_list('id', 'updated_at').first()
+        if version is None:
+            raise SigningKeyNotFound("No active Management Server credential is stored in Aerobridge")
+        if version == self._version:
+            return self._signing_key
+
+        with self._lock:
+            if version != self._version:
+                credential = AerobridgeCredential.objects.only('token').get(id=version[0])
+                self._signing_key = parse_signing_key(encrpytion_util.decrypt_token(credential.token))
+                self._version = version
+            return self._signing_key
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._signing_key = None
+
+
+signing_key_cache = ManagementServerKeyCache()
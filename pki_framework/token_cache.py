@@ -0,0 +1,68 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class VerifiedTokenCache():
+    ''' A bounded LRU cache of the claims of access tokens whose signature has already been verified. Entries are keyed by the SHA-256 digest of the token and are only served until the exp claim of the token, a token without an exp claim is never cached. '''
+
+    def __init__(self, max_size=None, clock=time.time):
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size if self._max_size is not None else settings.PASSPORT_TOKEN_CACHE_SIZE
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        ''' Return the cached claims for a token or None if the token is unknown or has expired '''
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, claims = entry
+                if self._clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token, claims):
+        try:
+            expires_at = float(claims['exp'])
+        except (KeyError, TypeError, ValueError):
+            return
+        if self.max_size <= 0 or self._clock() >= expires_at:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'max_size': self.max_size}
+
+
+token_cache = VerifiedTokenCache()
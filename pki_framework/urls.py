@@ -21,6 +21,8 @@ urlpatterns = [
     
     path('credentials/', pki_views.CredentialsList.as_view(), name='pki-credentials-list'),
     path('credentials/<uuid:pk>', pki_views.CredentialsDetail.as_view(), name='pki-credentials-detail'),
+    path('credentials/<uuid:pk>/reveal', pki_views.CredentialsReveal.as_view(), name='pki-credentials-reveal'),
+    path('jwks.json', pki_views.PermissionSigningKeys.as_view(), name='pki-jwks'),
     path('auth_server_fullchain', pki_views.AuthServerFullChain.as_view(), name='auth-server-full-chain'),
     
 ]
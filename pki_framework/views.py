@@ -1,26 +1,34 @@
 
 from rest_framework import generics, mixins
 
-from .models import AerobridgeCredential, AerobridgeExternalCredential
-from .serializers import (AerobridgeCredentialGetSerializer, AerobridgeCredentialPostSerializer, AerobridgeExternalCredentialSerializer)
-from django.utils.decorators import method_decorator
-from pki_framework.utils import requires_scopes
+from .models import AerobridgeCredential
+from .serializers import (AerobridgeCredentialGetSerializer, AerobridgeCredentialPostSerializer, AerobridgeCredentialMetadataSerializer, AerobridgeCredentialRevealSerializer)
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.utils.http import parse_etags
+from .full_chain import full_chain_cache, FullChainUnavailable
+from .signing_keys import signing_key_cache, SigningKeyNotFound
+import logging
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class CredentialsList(APIView):
     """
     List all tokens, or create a new token.
     """
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
 
     def get(self, request, format=None):
         credentials = AerobridgeCredential.objects.all()
-        serializer = AerobridgeCredentialGetSerializer(credentials, many=True)
+        # Listing thousands of credentials with their tokens is CPU bound, use ?metadata_only=true and the reveal endpoint instead
+        if request.query_params.get('metadata_only', '').lower() in ('1', 'true'):
+            serializer = AerobridgeCredentialMetadataSerializer(credentials.defer('token'), many=True)
+        else:
+            serializer = AerobridgeCredentialGetSerializer(credentials, many=True)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -31,13 +39,13 @@ class CredentialsList(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)        
         
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class CredentialsDetail(mixins.RetrieveModelMixin,
                      mixins.DestroyModelMixin,
                      generics.GenericAPIView):
     """
     Update or delete a token instance.
     """
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     queryset = AerobridgeCredential.objects.all()
     serializer_class = AerobridgeCredentialGetSerializer
@@ -50,20 +58,62 @@ class CredentialsDetail(mixins.RetrieveModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
-class AuthServerFullChain(mixins.RetrieveModelMixin,
-        generics.GenericAPIView):
+class CredentialsReveal(mixins.RetrieveModelMixin,
+                        generics.GenericAPIView):
     """
-    Retrieve, update or delete a Aircraft instance.
+    Reveal the decrypted token of a single credential.
     """
-    # authentication_classes = (SessionAuthentication,TokenAuthentication)
-    # permission_classes = (IsAuthenticated,)
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
-    queryset = AerobridgeExternalCredential.objects.filter(token_type= 0, association =0, is_active = 1)
-    serializer_class = AerobridgeExternalCredentialSerializer
-    
+    queryset = AerobridgeCredential.objects.all()
+    serializer_class = AerobridgeCredentialRevealSerializer
 
-    def get(self, request, flight_controller_id, format=None):
-        auth_server_full_chain =  AerobridgeExternalCredential.objects.filter(token_type= 0, association =0, is_active = 1)
-        serializer = AerobridgeExternalCredentialSerializer(auth_server_full_chain, many = True)
-        return Response(serializer.data)
+    def get(self, request, *args, **kwargs):
+        return self.retrieve(request, *args, **kwargs)
+
+
+class AuthServerFullChain(APIView):
+    """
+    Serve the downloaded and validated auth server full chain of the active credentials from the cache, clients can revalidate with If-None-Match.
+    """
+    required_scopes = ['aerobridge.read']
+
+    def get(self, request, format=None):
+        try:
+            artefact = full_chain_cache.get()
+        except FullChainUnavailable as e:
+            logger.error("Auth server full chain unavailable: %s" % e)
+            response = Response({'detail': 'The auth server full chain is temporarily unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(settings.AUTH_SERVER_FULL_CHAIN_RETRY_TTL)
+            return response
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # If-None-Match uses the weak comparison, a W/ prefix on a client ETag is ignored
+            etags = [etag[2:] if etag.startswith('W/') else etag for etag in parse_etags(if_none_match)]
+            if '*' in etags or artefact['etag'] in etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = artefact['etag']
+                return response
+
+        response = Response(artefact['chains'])
+        response['ETag'] = artefact['etag']
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class PermissionSigningKeys(APIView):
+    """
+    Publish the public half of the Management Server key used to sign flight permissions as a JWKS, so that permissions can be verified without calling Aerobridge again.
+    """
+
+    def get(self, request, format=None):
+        keys = []
+        try:
+            keys.append(signing_key_cache.get_signing_key().public_jwk)
+        except SigningKeyNotFound:
+            pass
+        except Exception as e:
+            logger.error("Management Server signing key could not be loaded %s" % e)
+        response = Response({'keys': keys})
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
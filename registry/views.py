@@ -7,17 +7,15 @@ from .models import AircraftComponent, Firmware, Operator, Aircraft, Company, Pi
 from .serializers import (OperatorSerializer, AircraftSerializer, AircraftFullSerializer, ManufacturerSerializer,PilotSerializer,ActivitySerializer)
 from gcs_operations.serializers import FirmwareSerializer
 
-from django.utils.decorators import method_decorator
-from pki_framework.utils import requires_scopes
 # Create your views here.
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class ActivityList(mixins.ListModelMixin,
                   generics.GenericAPIView):
     """
     List all activities in the database
     """
+    required_scopes = ['aerobridge.read']
 
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
@@ -26,12 +24,12 @@ class ActivityList(mixins.ListModelMixin,
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class ActivityDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Activity instance.
     """
+    required_scopes = ['aerobridge.read']
     
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
@@ -40,12 +38,12 @@ class ActivityDetail(mixins.RetrieveModelMixin,
         return self.retrieve(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class PilotList(mixins.ListModelMixin,
                   generics.GenericAPIView):
     """
     List all pilots in the database
     """
+    required_scopes = ['aerobridge.read']
 
     queryset = Pilot.objects.all()
     serializer_class = PilotSerializer
@@ -54,12 +52,12 @@ class PilotList(mixins.ListModelMixin,
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class PilotDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Pilot instance.
     """
+    required_scopes = ['aerobridge.read']
     
     queryset = Pilot.objects.all()
     serializer_class = PilotSerializer
@@ -68,12 +66,12 @@ class PilotDetail(mixins.RetrieveModelMixin,
         return self.retrieve(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class OperatorList(mixins.ListModelMixin,
                    generics.GenericAPIView):
     """
     List all operators, or create a new operator.
     """
+    required_scopes = ['aerobridge.read']
 
     queryset = Operator.objects.all()
     serializer_class = OperatorSerializer
@@ -83,12 +81,12 @@ class OperatorList(mixins.ListModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class OperatorDetail(mixins.RetrieveModelMixin,
                                generics.GenericAPIView):
     """
     Retrieve, update or delete a Operator instance.
     """
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
 
     queryset = Operator.objects.all()
     serializer_class = OperatorSerializer
@@ -98,12 +96,12 @@ class OperatorDetail(mixins.RetrieveModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class AircraftList(mixins.ListModelMixin,
                   generics.GenericAPIView):
     """
     List all aircrafts in the database
     """
+    required_scopes = ['aerobridge.read']
 
     queryset = Aircraft.objects.all()
     serializer_class = AircraftSerializer
@@ -112,12 +110,13 @@ class AircraftList(mixins.ListModelMixin,
         return self.list(request, *args, **kwargs)
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class AircraftDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Aircraft instance.
     """
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     # authentication_classes = (SessionAuthentication,TokenAuthentication)
     # permission_classes = (IsAuthenticated,)
 
@@ -139,12 +138,13 @@ class AircraftDetail(mixins.RetrieveModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class AircraftFirmwareDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Aircraft instance.
     """
+    required_scopes = ['aerobridge.read']
+
     # authentication_classes = (SessionAuthentication,TokenAuthentication)
     # permission_classes = (IsAuthenticated,)
 
@@ -169,12 +169,13 @@ class AircraftFirmwareDetail(mixins.RetrieveModelMixin,
         return Response(serializer.data)
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class VerifyAerobridgeID(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Aircraft instance.
     """
+    required_scopes = ['aerobridge.read']
+
     # authentication_classes = (SessionAuthentication,TokenAuthentication)
     # permission_classes = (IsAuthenticated,)
 
@@ -195,12 +196,13 @@ class VerifyAerobridgeID(mixins.RetrieveModelMixin,
         
         return Response(response)
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class AircraftRFMDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Aircraft instance.
     """
+    required_scopes = ['aerobridge.read']
+
     # authentication_classes = (SessionAuthentication,TokenAuthentication)
     # permission_classes = (IsAuthenticated,)
 
@@ -223,12 +225,12 @@ class AircraftRFMDetail(mixins.RetrieveModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read']), name='dispatch')
 class ManufacturerList(mixins.ListModelMixin,
                   generics.GenericAPIView):
     """
     List all aircrafts in the database
     """
+    required_scopes = ['aerobridge.read']
 
     queryset = Company.objects.filter(role=1)
     serializer_class = ManufacturerSerializer
@@ -240,12 +242,13 @@ class ManufacturerList(mixins.ListModelMixin,
 
 
 
-@method_decorator(requires_scopes(['aerobridge.read', 'aerobridge.write']), name='dispatch')
 class ManufacturerDetail(mixins.RetrieveModelMixin,
         generics.GenericAPIView):
     """
     Retrieve, update or delete a Aircraft instance.
     """
+    required_scopes = ['aerobridge.read', 'aerobridge.write']
+
     # authentication_classes = (SessionAuthentication,TokenAuthentication)
     # permission_classes = (IsAuthenticated,)
 
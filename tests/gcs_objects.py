@@ -0,0 +1,83 @@
+import uuid
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.test import override_settings
+from django.utils import timezone
+
+from gcs_operations import deconfliction
+from gcs_operations.models import FlightLog, FlightOperation, FlightPlan
+from pki_framework import signing_keys
+from pki_framework.encrpytion_util import get_encryption_helper
+from pki_framework.models import AerobridgeCredential
+from registry.models import Activity, Address, Aircraft, AircraftAssembly, AircraftModel, Company, Firmware, Operator, Person, Pilot
+
+DEFAULT_ACTIVITY_ID = '7a875ff9-79ee-460e-816f-30360e0ac645'
+
+
+def route(lng, lat):
+    ''' A flight plan GeoJSON with one three point route starting at lng / lat, its geo-cage is a small rectangle '''
+    return {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'LineString', 'coordinates': [[lng, lat], [lng + 0.01, lat + 0.01], [lng + 0.02, lat + 0.005]]}}]}
+
+
+ROUTE = route(77.59, 12.97)
+
+
+def private_key_pem(private_key):
+    return private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption()).decode('utf-8')
+
+
+def create_signing_key(private_key=None):
+    ''' Store the Management Server private key, a new P-256 key by default, encrypted with the current CRYPTOGRAPHY_SALT '''
+    private_key = private_key or ec.generate_private_key(ec.SECP256R1())
+    token = get_encryption_helper().encrypt(private_key_pem(private_key).encode('utf-8'))
+    return AerobridgeCredential.objects.create(name='Management Server Key', token_type=2, association=5, token=token)
+
+
+class LocalSigningMixin(object):
+    ''' Issue permissions signed with a Management Server key stored for the test, with an empty airspace index '''
+
+    def setUp(self):
+        super().setUp()
+        signing_settings = override_settings(CRYPTOGRAPHY_SALT=Fernet.generate_key().decode('utf-8'), PERMISSION_SIGNING_MODE='local')
+        signing_settings.enable()
+        self.addCleanup(signing_settings.disable)
+        signing_keys.signing_key_cache.invalidate()
+        self.addCleanup(signing_keys.signing_key_cache.invalidate)
+        # The airspace index outlives the test transaction
+        deconfliction.permission_airspace.reset()
+        self.addCleanup(deconfliction.permission_airspace.reset)
+        self.signing_key = create_signing_key()
+
+
+def create_aircraft(operator, name='Test Drone'):
+    ''' Create an aircraft with the assembly, model and firmware it needs '''
+    firmware = Firmware.objects.create(binary_file_url='https://example.com/firmware.bin', binary_file_hash='0' * 64, version='1.0',
+                                       manufacturer=operator.company, friendly_name='Test Firmware')
+    aircraft_model = AircraftModel.objects.create(name='Test Model', popular_name='Test', firmware=firmware)
+    assembly = AircraftAssembly.objects.create(aircraft_model=aircraft_model)
+    return Aircraft.objects.create(operator=operator, manufacturer=operator.company, name=name,
+                                   flight_controller_id=uuid.uuid4().hex[:20], final_assembly=assembly)
+
+
+def create_flight_operation(drone=None, flight_plan=None, start_datetime=None, **kwargs):
+    ''' Create a flight operation without the JSON fixtures, building the registry objects it depends on '''
+    Activity.objects.get_or_create(id=DEFAULT_ACTIVITY_ID, defaults={'name': 'Delivery'})
+    if drone is None:
+        company = Company.objects.create(full_name='Test Company', common_name='Test', website='https://example.com', email='ops@example.com')
+        drone = create_aircraft(Operator.objects.create(company=company))
+    operator = drone.operator
+    person = Person.objects.create(first_name='Test', last_name='Pilot', email='pilot-%s@example.com' % uuid.uuid4().hex[:8], phone_number='+910000000000')
+    address = Address.objects.create(address_line_1='1 Test Road', postcode='560001', city='Bengaluru')
+    pilot = Pilot.objects.create(operator=operator, person=person, address=address)
+    if flight_plan is None:
+        flight_plan = FlightPlan.objects.create(name='Test Plan')
+    return FlightOperation.objects.create(drone=drone, flight_plan=flight_plan, operator=operator, pilot=pilot,
+                                          start_datetime=start_datetime or timezone.now(), **kwargs)
+
+
+def create_flight_log(operation=None, raw_log=None):
+    return FlightLog.objects.create(operation=operation or create_flight_operation(), raw_log=raw_log if raw_log is not None else {'logEntries': []})
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class PassportStandin(object):
+    """
+    A local stand-in for Flight Passport. It serves a JWKS document, issues RS256 access tokens through the
+    client credentials grant and can sign tokens directly, so authentication can be exercised without a network.
+    """
+
+    def __init__(self, audience='testflight.aerobridge', kid='aerobridge-standin', host='127.0.0.1', port=0, token_latency=0):
+        self.audience = audience
+        self.kid = kid
+        self.token_latency = token_latency
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.request_count = {'jwks': 0, 'token': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def domain(self):
+        return '%s:%d' % self._server.server_address[:2]
+
+    @property
+    def url(self):
+        return 'http://%s' % self.domain
+
+    @property
+    def jwks_url(self):
+        return self.url + '/.well-known/jwks.json'
+
+    @property
+    def issuer(self):
+        return 'https://%s/' % self.domain
+
+    def jwks(self):
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({'kid': self.kid, 'use': 'sig', 'alg': 'RS256'})
+        return {'keys': [jwk]}
+
+    def issue_token(self, scopes, expires_in=3600, **claims):
+        now = int(time.time())
+        payload = {'iss': self.issuer, 'aud': self.audience, 'sub': 'standin|%s' % uuid.uuid4().hex,
+                   'iat': now, 'exp': now + expires_in, 'scope': ' '.join(scopes)}
+        payload.update(claims)
+        return jwt.encode(payload, self.private_key, algorithm='RS256', headers={'kid': self.kid})
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send_json(self, status_code, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.split('?')[0] == '/.well-known/jwks.json':
+                    standin.request_count['jwks'] += 1
+                    self._send_json(200, standin.jwks())
+                else:
+                    self._send_json(404, {'detail': 'Not found.'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if self.path.rstrip('/') != '/oauth/token':
+                    self._send_json(404, {'detail': 'Not found.'})
+                    return
+                standin.request_count['token'] += 1
+                time.sleep(standin.token_latency)
+                extra_claims = {k: v[0] for k, v in form.items() if k not in ('client_id', 'client_secret', 'grant_type', 'scope', 'audience')}
+                scopes = form.get('scope', [''])[0].split()
+                token = standin.issue_token(scopes, **extra_claims)
+                self._send_json(200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': 3600, 'scope': ' '.join(scopes)})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
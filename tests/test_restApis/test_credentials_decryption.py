@@ -0,0 +1,54 @@
+from unittest import mock
+
+from cryptography.fernet import Fernet
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from pki_framework import encrpytion_util
+from pki_framework.models import AerobridgeCredential
+from .test_setup import TestApiEndpoints
+
+TEST_KEY = Fernet.generate_key().decode('utf-8')
+
+
+class TestCredentialsDecryption(TestApiEndpoints):
+
+    def setUp(self):
+        key_override = override_settings(CRYPTOGRAPHY_SALT=TEST_KEY)
+        key_override.enable()
+        self.addCleanup(key_override.disable)
+        helper = encrpytion_util.get_encryption_helper()
+        for i in range(5):
+            AerobridgeCredential.objects.create(name='Credential %d' % i, token_type=2,
+                                                token=helper.encrypt(('secret-%d' % i).encode('utf-8')))
+
+    def test_encryption_helper_is_reused(self):
+        self.assertIs(encrpytion_util.get_encryption_helper(), encrpytion_util.get_encryption_helper())
+        helper = encrpytion_util.get_encryption_helper()
+        with override_settings(CRYPTOGRAPHY_SALT=Fernet.generate_key().decode('utf-8')):
+            self.assertIsNot(encrpytion_util.get_encryption_helper(), helper)
+
+    def test_credentials_list_decrypts_in_one_pass(self):
+        url = reverse('pki-credentials-list')
+        with mock.patch.object(encrpytion_util, 'decrypt_token', wraps=encrpytion_util.decrypt_token) as decrypt_token:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(c['token'] for c in res.json()), ['secret-%d' % i for i in range(5)])
+        self.assertEqual(decrypt_token.call_count, 0)
+
+    def test_credentials_list_metadata_only_never_decrypts(self):
+        url = reverse('pki-credentials-list')
+        with mock.patch.object(encrpytion_util.EncrpytionHelper, 'decrypt') as decrypt:
+            res = self.client.get(url, {'metadata_only': 'true'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 5)
+        self.assertNotIn('token', res.json()[0])
+        decrypt.assert_not_called()
+
+    def test_credentials_reveal_returns_token(self):
+        credential = AerobridgeCredential.objects.get(name='Credential 3')
+        url = reverse('pki-credentials-reveal', kwargs={'pk': credential.pk})
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'id': str(credential.pk), 'name': 'Credential 3', 'token': 'secret-3'})
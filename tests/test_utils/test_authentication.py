@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from pki_framework.key_store import jwks_store
+from pki_framework.token_cache import token_cache
+
+
+@override_settings(SECURE_API_ENDPOINTS=True)
+class TestPassportTokenAuthentication(SimpleTestCase):
+
+    def setUp(self):
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk['kid'] = 'test-key'
+        patchers = [
+            mock.patch.dict(os.environ, {'PASSPORT_AUDIENCE': 'testflight.aerobridge'}),
+            mock.patch.object(jwks_store, '_fetch_jwks', return_value={'keys': [jwk]}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        jwks_store.invalidate()
+        token_cache.clear()
+        self.addCleanup(jwks_store.invalidate)
+        self.addCleanup(token_cache.clear)
+        self.client = APIClient()
+        self.url = reverse('ping')
+
+    def get_token(self, scope, expires_in=600, audience='testflight.aerobridge'):
+        claims = {'aud': audience, 'exp': int(time.time()) + expires_in, 'scope': scope, 'sub': 'gcs|1'}
+        return jwt.encode(claims, self.private_key, algorithm='RS256', headers={'kid': 'test-key'})
+
+    def test_missing_token_returns_401(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), {'detail': 'Authentication credentials were not provided'})
+
+    def test_missing_scope_returns_403(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % self.get_token('aerobridge.write'))
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(res.json(), {'message': 'You don\'t have access to this resource'})
+
+    def test_required_scope_returns_200(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % self.get_token('aerobridge.read'))
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'message': 'pong'})
+
+    def test_expired_token_returns_401(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % self.get_token('aerobridge.read', expires_in=-10))
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), {'detail': 'Token Signature has expired'})
+
+    def test_wrong_audience_returns_401(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % self.get_token('aerobridge.read', audience='other'))
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), {'detail': 'Invalid audience in token'})
+
+    @override_settings(SECURE_API_ENDPOINTS=False)
+    def test_open_when_endpoints_are_not_secured(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(SECURE_API_ENDPOINTS=True, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TestLaunchpadSessionScopes(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        self.viewer = User.objects.create_user('viewer', password='secret')
+
+    def test_anonymous_launchpad_requests_are_not_authenticated(self):
+        self.assertEqual(self.client.get(reverse('people-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.get(reverse('people-create'))
+        self.assertRedirects(res, '/admin/login/?next=%s' % reverse('people-create'), fetch_redirect_response=False)
+
+    def test_signed_in_users_get_their_session_scopes(self):
+        self.client.force_login(self.viewer)
+        self.assertEqual(self.client.get(reverse('people-list')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('people-create')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('people-create')).status_code, status.HTTP_200_OK)
+
+    @override_settings(SESSION_SCOPES=[])
+    def test_users_without_the_scopes_are_forbidden(self):
+        self.client.force_login(self.viewer)
+        res = self.client.get(reverse('people-list'))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,40 @@
+import hashlib
+import json
+
+from django.test import SimpleTestCase
+
+from common.canonical_json import CHUNK_SIZE, iter_json, json_digest
+
+SAMPLES = [
+    {},
+    [],
+    'plain',
+    None,
+    {'logEntries': [['TAKEOFF', 1620000000, 77.6, 12.9, 10.5, 0.1], ['LAND', 1620000100, 77.61, 12.91, 0.0, 1e-07]],
+     'permissionArtefact': 'abc', 'previousLogHash': None},
+    {'nested': {'deeper': [{'a': [1, 2, [3, {'b': []}]]}, {}], 'empty': {}}, 'flag': True, 'count': 10 ** 30},
+    {'unicode': 'ಬೆಂಗಳೂರು   "quoted"\n', 'nan': float('nan'), 'inf': float('-inf')},
+    {1: 'int key', 'mixed': {2.5: True, None: False}},
+    [('tuple', 1), [[], [{}]]],
+    [[i, {'nested': [i]}] if i % 700 == 0 else [i, 1.5, 'row'] for i in range(2500)],
+]
+
+
+class TestCanonicalJson(SimpleTestCase):
+
+    def test_streamed_output_matches_json_dumps(self):
+        for separators in ((',', ':'), (', ', ': ')):
+            for sample in SAMPLES:
+                self.assertEqual(''.join(iter_json(sample, separators=separators, chunk_size=8)), json.dumps(sample, separators=separators))
+
+    def test_digest_matches_the_signed_log_digest(self):
+        for sample in SAMPLES:
+            minified = json.dumps(sample, separators=(',', ':'))
+            self.assertEqual(json_digest(sample), hashlib.sha256(minified.encode('utf-8').strip()).hexdigest())
+            self.assertEqual(json_digest(sample, separators=(', ', ': ')), hashlib.sha256(json.dumps(sample).encode('utf-8')).hexdigest())
+
+    def test_large_logs_are_chunked(self):
+        raw_log = {'logEntries': [['POSITION', i, 77.6, 12.9, 10.0, 0.5] for i in range(20000)]}
+        chunks = list(iter_json(raw_log, chunk_size=CHUNK_SIZE))
+        self.assertGreater(len(chunks), 10)
+        self.assertLess(max(len(chunk) for chunk in chunks), 2 * CHUNK_SIZE)
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gcs_operations import conformance
+from gcs_operations.models import FlightPermission
+from tests.gcs_objects import create_flight_log, create_flight_operation
+
+# A square of 0.002 degrees (about 222 m) around the origin, stored the way issue_permission stores it
+ORIGIN_LAT, ORIGIN_LNG = 12.97, 77.59
+GEO_CAGE = [{'lat': ORIGIN_LAT + dlat, 'lng': ORIGIN_LNG + dlng} for dlat, dlng in ((-0.001, -0.001), (-0.001, 0.001), (0.001, 0.001), (0.001, -0.001), (-0.001, -0.001))]
+
+
+def raw_log(latitude_offsets):
+    return {'logEntries': [['POSITION', 1620000000 + i, ORIGIN_LNG, ORIGIN_LAT + offset, 30.0, 0.5] for i, offset in enumerate(latitude_offsets)]}
+
+
+class TestGeoCageConformance(TestCase):
+
+    def setUp(self):
+        self.operation = create_flight_operation()
+        FlightPermission.objects.create(operation=self.operation, status_code=FlightPermission.GRANTED, geo_cage=GEO_CAGE)
+        # Leaves the cage to the north for three points, comes back, then leaves again for one point
+        offsets = [0, 0.0005, 0.0011, 0.0015, 0.0012, 0.0005, 0.001, -0.0012]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log = create_flight_log(operation=self.operation, raw_log=raw_log(offsets))
+
+    def test_breach_intervals_and_excursion(self):
+        res = self.client.get(reverse('log-conformance', kwargs={'pk': self.flight_log.id}))
+        self.assertEqual(res.status_code, 200)
+        result = res.json()
+        self.assertFalse(result['conformant'])
+        self.assertEqual((result['checked_points'], result['breaching_points']), (8, 4))
+        self.assertEqual([(b['start_index'], b['end_index']) for b in result['breaches']], [(2, 4), (7, 7)])
+        self.assertEqual(result['breaches'][0]['start_time'], 1620000002.0)
+        self.assertAlmostEqual(result['breaches'][0]['max_excursion_meters'], 55.6, places=1)
+        self.assertAlmostEqual(result['max_excursion_meters'], 55.6, places=1)
+        self.assertAlmostEqual(result['breaches'][1]['max_excursion_meters'], 22.2, places=1)
+
+        # The point on the boundary does not breach, a tolerance absorbs small excursions
+        self.assertEqual(conformance.check_flight_log(self.flight_log.id, tolerance=30)['breaches'][0]['point_count'], 1)
+
+    def test_audit_of_a_date_range(self):
+        unpermitted = create_flight_operation(drone=self.operation.drone)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_flight_log(operation=unpermitted, raw_log=raw_log([0]))
+        start = (timezone.now() - timedelta(days=1)).isoformat()
+        end = (timezone.now() + timedelta(days=1)).isoformat()
+
+        res = self.client.get(reverse('log-conformance-audit'), {'start': start, 'end': end})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.json()['checked'], res.json()['non_conformant']), (1, 1))
+        self.assertEqual(len(res.json()['results']), 2)
+        self.assertEqual(self.client.get(reverse('log-conformance-audit'), {'start': end, 'end': start}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('log-conformance-audit'), {'start': end, 'end': end + 'x'}).status_code, 400)
+
+    def test_vectorized_check_of_a_large_log(self):
+        import numpy as np
+        cage = conformance.GeoCage(GEO_CAGE)
+        n = 1000000
+        columns = {'timestamp': np.arange(n, dtype=np.float64), 'longitude': np.full(n, ORIGIN_LNG),
+                   'latitude': ORIGIN_LAT + 0.002 * np.sin(np.linspace(0, 20 * np.pi, n))}
+        result = conformance.check(cage, columns, tolerance=0)
+        self.assertEqual(result['checked_points'], n)
+        self.assertEqual(len(result['breaches']), 20)
+        self.assertAlmostEqual(result['max_excursion_meters'], 111.2, places=0)
+
+    def test_breaches_at_the_ends_of_a_log_with_missing_positions(self):
+        import numpy as np
+        cage = conformance.GeoCage(GEO_CAGE)
+        # Breaches on the first and last points, the points between them are inside or have no position
+        latitudes = ORIGIN_LAT + np.array([0.0012, 0.0015, 0, np.nan, 0.0011, np.nan, 0.0013])
+        columns = {'timestamp': np.arange(7, dtype=np.float64) + 1620000000, 'longitude': np.full(7, ORIGIN_LNG), 'latitude': latitudes}
+        result = conformance.check(cage, columns, tolerance=0)
+        self.assertEqual([(b['start_index'], b['end_index'], b['start_time']) for b in result['breaches']],
+                         [(0, 1, 1620000000.0), (4, 4, 1620000004.0), (6, 6, 1620000006.0)])
+        self.assertEqual([round(b['max_excursion_meters'], 1) for b in result['breaches']], [55.6, 11.1, 33.4])
+        self.assertIsInstance(result['breaches'][0]['start_index'], int)
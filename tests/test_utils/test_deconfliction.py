@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from shapely.geometry import box
+
+from gcs_operations import deconfliction, permissions_issuer
+from gcs_operations.deconfliction import AirspaceIndex
+from gcs_operations.models import AirspaceSequence, FlightOperation, FlightPermission, FlightPlan
+from tests.gcs_objects import LocalSigningMixin, create_flight_operation, route
+
+
+class TestAirspaceIndex(SimpleTestCase):
+
+    def test_conflicts_need_overlapping_cages_and_windows(self):
+        index = AirspaceIndex(bucket_seconds=3600, rebuild_threshold=2)
+        index.add('a', box(0, 0, 1, 1), 0, 7200)
+        index.add('b', box(5, 5, 6, 6), 0, 7200)
+        index.add('c', box(0.5, 0.5, 2, 2), 10000, 11000)
+        self.assertEqual(index.conflicts(box(0.9, 0.9, 3, 3), 3000, 4000), ['a'])
+        self.assertEqual(sorted(index.conflicts(box(0.9, 0.9, 3, 3), 0, 20000)), ['a', 'c'])
+        # Touching windows do not overlap
+        self.assertEqual(index.conflicts(box(0.9, 0.9, 3, 3), 7200, 9000), [])
+        self.assertEqual(index.conflicts(box(0, 0, 1, 1), 0, 100, exclude='a'), [])
+
+        # Entries are added, moved and removed incrementally, before and after the trees are rebuilt
+        for i in range(5):
+            index.add('d%d' % i, box(10 + i, 10, 10.5 + i, 10.5), 0, 3600)
+        self.assertEqual(index.conflicts(box(12, 10, 12.2, 10.2), 0, 100), ['d2'])
+        index.add('d2', box(20, 20, 21, 21), 0, 3600)
+        self.assertEqual(index.conflicts(box(12, 10, 12.2, 10.2), 0, 100), [])
+        index.remove('a')
+        self.assertEqual(index.conflicts(box(0.9, 0.9, 3, 3), 3000, 4000), [])
+        self.assertEqual(len(index), 7)
+        self.assertEqual(index.prune(7200), 6)
+        self.assertEqual(list(index.entry_buckets), ['c'])
+
+
+class TestPermissionDeconfliction(LocalSigningMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.plan = FlightPlan.objects.create(geo_json=route(77.59, 12.97))
+        self.start = timezone.now() + timedelta(minutes=30)
+        self.first = create_flight_operation(flight_plan=self.plan, start_datetime=self.start, end_datetime=self.start + timedelta(hours=1))
+
+    def operation(self, plan, start, hours=1):
+        return create_flight_operation(drone=self.first.drone, flight_plan=plan, start_datetime=start, end_datetime=start + timedelta(hours=hours))
+
+    def issue(self, operation):
+        return permissions_issuer.issue_permission(operation.id)['flight_permission']
+
+    def test_overlapping_operations_are_denied(self):
+        self.assertEqual(self.issue(self.first).status_code, FlightPermission.GRANTED)
+        self.assertEqual(self.issue(self.operation(self.plan, self.start + timedelta(minutes=30))).status_code, FlightPermission.DENIED)
+        self.assertEqual(self.issue(self.operation(self.plan, self.start + timedelta(hours=1))).status_code, FlightPermission.GRANTED)
+        elsewhere = FlightPlan.objects.create(geo_json=route(78.59, 12.97))
+        self.assertEqual(self.issue(self.operation(elsewhere, self.start)).status_code, FlightPermission.GRANTED)
+        with override_settings(AIRSPACE_DECONFLICTION=False):
+            self.assertEqual(self.issue(self.operation(self.plan, self.start)).status_code, FlightPermission.GRANTED)
+
+    def test_concurrent_overlapping_issuances_grant_one(self):
+        request_permission_token = permissions_issuer.request_permission_token
+        issuers = {'single': self.issue, 'batch': lambda operation: permissions_issuer.issue_permissions([operation.id])[str(operation.id)]['flight_permission']}
+        for name, issue in issuers.items():
+            with self.subTest(name):
+                plan = FlightPlan.objects.create(geo_json=route(79.59 if name == 'batch' else 78.59, 12.97))
+                first, overlapping = self.operation(plan, self.start), self.operation(plan, self.start)
+
+                def race(my_data_signer, data_payload):
+                    if data_payload['flight_operation_id'] == str(first.id):
+                        # Another worker checks, signs and saves the overlapping operation while this one waits for its token
+                        self.assertEqual(self.issue(overlapping).status_code, FlightPermission.GRANTED)
+                    return request_permission_token(my_data_signer, data_payload)
+
+                with mock.patch('gcs_operations.permissions_issuer.request_permission_token', side_effect=race), \
+                        mock.patch('gcs_operations.deconfliction.lock_airspace', wraps=deconfliction.lock_airspace) as lock_airspace:
+                    flight_permission = issue(first)
+                self.assertEqual(flight_permission.status_code, FlightPermission.DENIED)
+                self.assertEqual(flight_permission.token, {})
+                self.assertEqual(FlightPermission.objects.filter(operation__in=[first, overlapping], status_code=FlightPermission.GRANTED).count(), 1)
+                # Both issuances checked again under the airspace lock before saving
+                self.assertEqual(lock_airspace.call_count, 2)
+
+    def test_only_airspace_changes_advance_the_sequence(self):
+        permission = self.issue(self.first)
+        sequence = AirspaceSequence.current()
+        permission = FlightPermission.objects.get(id=permission.id)
+        permission.token = {'access_token': 'refreshed'}
+        permission.save()
+        operation = FlightOperation.objects.get(id=self.first.id)
+        operation.name = 'Renamed'
+        with self.assertNumQueries(1):
+            operation.save()
+        self.assertEqual(AirspaceSequence.current(), sequence)
+
+        operation.end_datetime += timedelta(minutes=10)
+        operation.save()
+        self.assertEqual(FlightPermission.objects.get(id=permission.id).airspace_sequence, sequence + 1)
+        with override_settings(AIRSPACE_DECONFLICTION=False):
+            permission.status_code = FlightPermission.DENIED
+            permission.save()
+        self.assertEqual(AirspaceSequence.current(), sequence + 1)
+
+    def test_index_follows_database_changes(self):
+        permission = self.issue(self.first)
+        later = self.operation(self.plan, self.start)
+
+        # Changes saved by any process advance the airspace sequence and are synced before the next check
+        permission.status_code = FlightPermission.DENIED
+        permission.save()
+        self.assertEqual(deconfliction.permission_airspace.conflicts(permission.geo_cage, later.start_datetime, later.end_datetime), [])
+        permission.status_code = FlightPermission.GRANTED
+        permission.save()
+        self.assertEqual(deconfliction.permission_airspace.conflicts(permission.geo_cage, later.start_datetime, later.end_datetime), [permission.id])
+        self.first.start_datetime = self.first.end_datetime = self.start + timedelta(hours=3)
+        self.first.save()
+        self.assertEqual(deconfliction.permission_airspace.conflicts(permission.geo_cage, later.start_datetime, later.end_datetime), [])
+        self.first.start_datetime, self.first.end_datetime = self.start, self.start + timedelta(hours=1)
+        self.first.save()
+        self.assertEqual(deconfliction.permission_airspace.conflicts(permission.geo_cage, later.start_datetime, later.end_datetime), [permission.id])
+
+        # Nothing changed since, the check reads the sequence only
+        with self.assertNumQueries(1):
+            deconfliction.permission_airspace.conflicts(permission.geo_cage, later.start_datetime, later.end_datetime)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            permission.delete()
+        self.assertEqual(self.issue(later).status_code, FlightPermission.GRANTED)
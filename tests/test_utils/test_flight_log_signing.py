@@ -0,0 +1,64 @@
+import hashlib
+import json
+import uuid
+
+from django.core.signing import Signer
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from gcs_operations import data_signer
+from gcs_operations.models import FlightLog, SignedFlightLog
+from tests.gcs_objects import create_flight_log, create_flight_operation
+
+
+class TestFlightLogBatchSigning(TestCase):
+
+    def setUp(self):
+        operation = create_flight_operation()
+        self.logs = [create_flight_log(operation, raw_log={'logEntries': [[i, 12.9, 77.6]]}) for i in range(2)]
+        self.logs.append(create_flight_log(raw_log={'logEntries': [[2, 13.0, 77.7]]}))
+
+    def test_batch_signs_in_memory_and_writes_in_bulk(self):
+        missing_id = str(uuid.uuid4())
+        results = data_signer.sign_logs([log.id for log in self.logs] + [missing_id])
+        self.assertEqual([r['status'] for r in results.values()], [data_signer.DataSigningStatus.SUCCESSFUL] * 3 + [data_signer.DataSigningStatus.NOT_FOUND])
+
+        signed = SignedFlightLog.objects.get(raw_flight_log=self.logs[0])
+        self.assertEqual(signed.signed_log_size, len(signed.signed_log.encode('utf-8')))
+        signed_log = json.loads(signed.signed_log)
+        payload = Signer().unsign_object(signed_log.pop('signature'))
+        self.assertEqual(signed_log, {'logEntries': [[0, 12.9, 77.6]]})
+        self.assertEqual(payload['digest'], hashlib.sha256(json.dumps(signed_log, separators=(',', ':')).encode('utf-8')).hexdigest())
+
+        flight_log = FlightLog.objects.select_related('operation__flight_plan').get(id=self.logs[0].id)
+        self.assertFalse(flight_log.is_editable)
+        self.assertFalse(flight_log.operation.is_editable)
+        self.assertFalse(flight_log.operation.flight_plan.is_editable)
+        self.assertGreater(flight_log.updated_at, self.logs[0].updated_at)
+
+        again = data_signer.sign_logs([self.logs[0].id])[str(self.logs[0].id)]
+        self.assertEqual(again['status'], data_signer.DataSigningStatus.CONFLICT)
+        self.assertEqual(again['signed_flight_log'], signed)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        with CaptureQueriesContext(connection) as one_log:
+            data_signer.sign_logs([self.logs[0].id])
+        more_logs = [create_flight_log(raw_log={'n': i}) for i in range(5)]
+        with CaptureQueriesContext(connection) as many_logs:
+            data_signer.sign_logs([log.id for log in self.logs[1:] + more_logs])
+        self.assertEqual(len(one_log), len(many_logs))
+
+    def test_batch_endpoint_reports_status_per_id(self):
+        data_signer.sign_log(self.logs[0].id)
+        ids = [str(log.id) for log in self.logs]
+        res = self.client.post(reverse('log-sign-batch'), {'ids': ids}, content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        results = res.json()['results']
+        self.assertEqual([r['id'] for r in results], ids)
+        self.assertEqual([r['status'] for r in results], ['CONFLICT', 'SUCCESSFUL', 'SUCCESSFUL'])
+        self.assertEqual(results[1]['signed_flight_log']['raw_flight_log'], ids[1])
+
+        self.assertEqual(self.client.post(reverse('log-sign-batch'), {'ids': []}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.put(reverse('log-sign', kwargs={'pk': ids[2]})).status_code, 409)
@@ -0,0 +1,148 @@
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from pki_framework import full_chain
+from pki_framework.models import AerobridgeExternalCredential
+
+
+def self_signed_pem(common_name):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.datetime.utcnow()
+    certificate = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1)) \
+        .sign(key, hashes.SHA256())
+    return certificate.public_bytes(serialization.Encoding.PEM).decode('utf-8')
+
+
+class ChainServer(object):
+    ''' Serves whatever is in the files dict, counting downloads '''
+
+    def __init__(self):
+        self.files = {}
+        self.downloads = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.downloads += 1
+                body = server.files.get(self.path)
+                self.send_response(200 if body is not None else 404)
+                self.end_headers()
+                self.wfile.write((body or '').encode('utf-8'))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return 'http://%s:%d%s' % (self._server.server_address[:2] + (path,))
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestAuthServerFullChain(TestCase):
+
+    def setUp(self):
+        self.server = ChainServer()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(cache.clear)
+        cache.clear()
+        self.chain = self_signed_pem('intermediate') + self_signed_pem('root')
+        self.server.files['/fullchain.pem'] = self.chain
+        self.credential = AerobridgeExternalCredential.objects.create(name='Auth server', token_type=0, association=0, is_active=True,
+                                                                      binary_file_url=self.server.url('/fullchain.pem'))
+
+    def test_chain_is_downloaded_once_and_revalidated_with_etag(self):
+        url = reverse('auth-server-full-chain')
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()[0]['full_chain'], self.chain)
+        etag = res['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='W/%s' % etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        self.assertEqual(self.server.downloads, 1)
+
+    def test_credential_changes_refresh_the_chain(self):
+        first_etag = self.client.get(reverse('auth-server-full-chain'))['ETag']
+        new_chain = self_signed_pem('rotated')
+        self.server.files['/fullchain.pem'] = new_chain
+        with mock.patch.object(full_chain.full_chain_cache, '_start_refresh_thread', full_chain.full_chain_cache.refresh), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.credential.name = 'Rotated auth server'
+            self.credential.save()
+
+        res = self.client.get(reverse('auth-server-full-chain'))
+        self.assertNotEqual(res['ETag'], first_etag)
+        self.assertEqual(res.json()[0]['full_chain'], new_chain)
+
+    def test_credentials_changed_by_another_process_are_noticed(self):
+        url = reverse('auth-server-full-chain')
+        first_etag = self.client.get(url)['ETag']
+        new_chain = self_signed_pem('rotated')
+        self.server.files['/rotated.pem'] = new_chain
+        # A queryset update sends no signal, like a change saved by another worker with its own cache
+        AerobridgeExternalCredential.objects.filter(id=self.credential.id).update(binary_file_url=self.server.url('/rotated.pem'),
+                                                                                 updated_at=self.credential.updated_at + datetime.timedelta(seconds=1))
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+        self.assertNotEqual(res['ETag'], first_etag)
+        self.assertEqual(res.json()[0]['full_chain'], new_chain)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag']).status_code, 304)
+
+        AerobridgeExternalCredential.objects.filter(id=self.credential.id).update(is_active=False)
+        self.assertEqual(self.client.get(url).json(), [])
+        self.assertEqual(self.server.downloads, 2)
+
+    def test_invalid_download_keeps_the_cached_chain(self):
+        full_chain.full_chain_cache.refresh()
+        self.server.files['/fullchain.pem'] = '-----BEGIN CERTIFICATE-----\nnot a certificate\n-----END CERTIFICATE-----\n'
+        artefact = full_chain.full_chain_cache.refresh()
+        self.assertEqual(artefact['chains'][0]['full_chain'], self.chain)
+        with self.assertRaises(full_chain.InvalidFullChain):
+            full_chain.parse_full_chain('no certificates here')
+
+    def test_failed_download_on_a_cold_cache_is_not_cached(self):
+        url = reverse('auth-server-full-chain')
+        del self.server.files['/fullchain.pem']
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res['Retry-After'], '30')
+
+        self.server.files['/fullchain.pem'] = self.chain
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()[0]['full_chain'], self.chain)
+
+    @override_settings(AUTH_SERVER_FULL_CHAIN_RETRY_TTL=0)
+    def test_incomplete_chains_are_downloaded_again(self):
+        url = reverse('auth-server-full-chain')
+        second_chain = self_signed_pem('second')
+        AerobridgeExternalCredential.objects.create(name='Second auth server', token_type=0, association=0, is_active=True,
+                                                    binary_file_url=self.server.url('/second.pem'))
+        res = self.client.get(url)
+        self.assertEqual([chain['full_chain'] for chain in res.json()], [self.chain])
+
+        self.server.files['/second.pem'] = second_chain
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([chain['full_chain'] for chain in res.json()], [self.chain, second_chain])
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from common.canonical_json import json_digest
+from gcs_operations import geo_cages, permissions_issuer
+from gcs_operations.models import FlightPlan
+from tests.gcs_objects import ROUTE, LocalSigningMixin, create_flight_operation
+
+PLAN_FILE = {'fileType': 'Plan', 'mission': {'items': []}}
+
+
+class TestGeoCageCache(LocalSigningMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.flight_plan = FlightPlan.objects.create(geo_json=ROUTE, plan_file_json=PLAN_FILE)
+
+    def test_digests_are_computed_when_the_plan_is_saved(self):
+        self.assertEqual(self.flight_plan.geo_cage, geo_cages.build_geo_cage(ROUTE))
+        self.assertEqual(self.flight_plan.plan_file_digest, json_digest(PLAN_FILE, separators=(', ', ': ')))
+
+        # A plan with the same content reuses the geo-cage
+        with mock.patch('gcs_operations.geo_cages.build_geo_cage', side_effect=AssertionError):
+            same_route = FlightPlan.objects.create(name='Same route', geo_json=ROUTE)
+        self.assertEqual(same_route.geo_cage, self.flight_plan.geo_cage)
+
+        self.flight_plan.plan_file_json = dict(PLAN_FILE, version=2)
+        with mock.patch('gcs_operations.geo_cages.build_geo_cage', side_effect=AssertionError):
+            self.flight_plan.save()
+        self.assertEqual(FlightPlan.objects.get(id=self.flight_plan.id).plan_file_digest, json_digest(self.flight_plan.plan_file_json, separators=(', ', ': ')))
+
+        self.flight_plan.geo_json = {'type': 'FeatureCollection', 'features': [dict(ROUTE['features'][0], geometry={'type': 'Point', 'coordinates': [77.0, 12.0]})]}
+        self.flight_plan.save()
+        self.assertNotEqual(self.flight_plan.geo_cage, same_route.geo_cage)
+
+    def test_issuance_does_no_geometry_work_for_known_plans(self):
+        operation = create_flight_operation(flight_plan=self.flight_plan)
+        with mock.patch('gcs_operations.geo_cages.build_geo_cage', side_effect=AssertionError):
+            flight_permission = permissions_issuer.issue_permission(operation.id)['flight_permission']
+        self.assertEqual(flight_permission.status_code, 'granted')
+        self.assertEqual(flight_permission.geo_cage, self.flight_plan.geo_cage)
+
+    def test_plans_saved_before_the_digests_existed(self):
+        FlightPlan.objects.filter(id=self.flight_plan.id).update(geo_cage=None, geo_json_digest='', plan_file_digest='')
+        operation = create_flight_operation(flight_plan=FlightPlan.objects.get(id=self.flight_plan.id))
+        flight_permission = permissions_issuer.issue_permission(operation.id)['flight_permission']
+        self.assertEqual(flight_permission.geo_cage, geo_cages.build_geo_cage(ROUTE))
+        self.assertEqual(FlightPlan.objects.get(id=self.flight_plan.id).plan_file_digest, json_digest(PLAN_FILE, separators=(', ', ': ')))
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from common import http_client
+from gcs_operations import data_signer
+from tests.passport_standin import PassportStandin
+
+
+class UpstreamStandin(object):
+    ''' Answers /ok with 200, /flaky with 503 until flaky_failures is used up and /down with 500, recording the client ports '''
+
+    def __init__(self, flaky_failures=0):
+        self.flaky_failures = flaky_failures
+        self.hits = 0
+        self.client_ports = set()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                standin.hits += 1
+                standin.client_ports.add(self.client_address[1])
+                status_code = 200
+                if self.path == '/down':
+                    status_code = 500
+                elif self.path == '/flaky' and standin.flaky_failures > 0:
+                    standin.flaky_failures -= 1
+                    status_code = 503
+                self.send_response(status_code)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return 'http://%s:%d%s' % (self._server.server_address[:2] + (path,))
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestUpstreamClient(SimpleTestCase):
+
+    def setUp(self):
+        self.standin = UpstreamStandin(flaky_failures=2)
+        self.addCleanup(self.standin.stop)
+
+    def test_connections_are_kept_alive(self):
+        client = http_client.UpstreamClient('standin')
+        self.addCleanup(client.close)
+        for _ in range(5):
+            self.assertEqual(client.get(self.standin.url('/ok')).status_code, 200)
+        self.assertEqual(len(self.standin.client_ports), 1)
+        snapshot = client.metrics.snapshot()
+        self.assertEqual((snapshot['calls'], snapshot['errors']), (5, 0))
+        self.assertIsNotNone(snapshot['latency_ms']['p95'])
+
+    def test_unavailable_responses_are_retried_with_backoff(self):
+        client = http_client.UpstreamClient('standin', backoff_factor=0)
+        self.addCleanup(client.close)
+        self.assertEqual(client.get(self.standin.url('/flaky')).status_code, 200)
+        self.assertEqual(self.standin.hits, 3)
+        self.assertEqual(client.metrics.snapshot()['calls'], 1)
+
+    def test_circuit_opens_after_failures_and_recovers(self):
+        client = http_client.UpstreamClient('standin', retries=0, failure_threshold=2, reset_timeout=0.2)
+        self.addCleanup(client.close)
+        for _ in range(2):
+            self.assertEqual(client.get(self.standin.url('/down')).status_code, 500)
+        self.assertEqual(client.breaker.state, http_client.CircuitBreaker.OPEN)
+        with self.assertRaises(http_client.CircuitOpenError):
+            client.get(self.standin.url('/ok'))
+        self.assertEqual(self.standin.hits, 2)
+        self.assertEqual(client.metrics.snapshot()['rejected'], 1)
+
+        time.sleep(0.25)
+        self.assertEqual(client.get(self.standin.url('/ok')).status_code, 200)
+        self.assertEqual(client.breaker.state, http_client.CircuitBreaker.CLOSED)
+
+    def test_s3_clients_are_reused(self):
+        self.addCleanup(http_client.reset_upstreams)
+        s3 = http_client.get_s3_client('ap-south-1', 'http://127.0.0.1:9000', 'key', 'secret')
+        self.assertIs(http_client.get_s3_client('ap-south-1', 'http://127.0.0.1:9000', 'key', 'secret'), s3)
+        self.assertEqual(s3.meta.config.max_pool_connections, 10)
+
+
+@override_settings(UPSTREAM_HTTP={'passport': {'retries': 0}})
+class TestPassportUpstream(SimpleTestCase):
+
+    def setUp(self):
+        http_client.reset_upstreams()
+        self.addCleanup(http_client.reset_upstreams)
+        self.standin = PassportStandin().start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(os.environ, {'FLIGHT_PASSPORT_PERMISSION_CLIENT_ID': 'test', 'FLIGHT_PASSPORT_PERMISSION_CLIENT_SECRET': 'test',
+                                               'PASSPORT_URL': self.standin.url, 'PASSPORT_TOKEN_URL': '/oauth/token/'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_permission_signing_goes_through_the_shared_client(self):
+        signer = data_signer.SigningHelper()
+        for i in range(3):
+            self.assertIn('access_token', signer.issue_jwt_permission({'flight_operation_id': 'op-%d' % i}))
+        metrics = self.client.get(reverse('upstream-metrics')).json()
+        self.assertEqual(metrics['passport']['calls'], 3)
+        self.assertEqual(metrics['passport']['circuit'], 'closed')
+
+    def test_unreachable_passport_does_not_raise(self):
+        with mock.patch.dict(os.environ, {'PASSPORT_URL': 'http://127.0.0.1:1'}):
+            self.assertFalse(data_signer.SigningHelper().issue_jwt_permission({'flight_operation_id': 'op-1'}))
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from pki_framework.encrpytion_util import EncrpytionHelper, get_encryption_helper
+from pki_framework.models import AerobridgeCredential
+
+OLD_KEY = Fernet.generate_key()
+NEW_KEY = Fernet.generate_key()
+
+
+@override_settings(CRYPTOGRAPHY_SALT=NEW_KEY.decode('utf-8'), CRYPTOGRAPHY_SALT_FALLBACKS=[OLD_KEY.decode('utf-8')])
+class TestCredentialKeyRotation(TestCase):
+
+    def setUp(self):
+        old_helper = EncrpytionHelper(secret_key=OLD_KEY)
+        for i in range(5):
+            AerobridgeCredential.objects.create(name='Credential %d' % i, token_type=2,
+                                                token=old_helper.encrypt(('secret-%d' % i).encode('utf-8')))
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'rotation.json')
+
+    def assert_decrypts_with_new_key_only(self, credentials):
+        new_helper = EncrpytionHelper(secret_key=NEW_KEY)
+        for credential in credentials:
+            self.assertTrue(new_helper.decrypt(bytes(credential.token)).startswith(b'secret-'))
+
+    def test_fallback_keys_decrypt_old_tokens(self):
+        credential = AerobridgeCredential.objects.first()
+        self.assertTrue(get_encryption_helper().decrypt(bytes(credential.token)).startswith(b'secret-'))
+
+    def test_all_tokens_are_reencrypted_in_batches(self):
+        out = StringIO()
+        call_command('rotate_credential_keys', batch_size=2, checkpoint=self.checkpoint, stdout=out)
+        self.assert_decrypts_with_new_key_only(AerobridgeCredential.objects.all())
+        self.assertIn('5/5 credentials processed', out.getvalue())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_rotation_resumes_after_checkpoint(self):
+        credentials = list(AerobridgeCredential.objects.order_by('id'))
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_id': str(credentials[2].id)}, f)
+
+        call_command('rotate_credential_keys', batch_size=2, checkpoint=self.checkpoint, stdout=StringIO())
+
+        new_helper = EncrpytionHelper(secret_key=NEW_KEY)
+        for credential in AerobridgeCredential.objects.order_by('id')[:3]:
+            with self.assertRaises(InvalidToken):
+                new_helper.decrypt(bytes(credential.token))
+        self.assert_decrypts_with_new_key_only(AerobridgeCredential.objects.order_by('id')[3:])
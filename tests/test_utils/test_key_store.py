@@ -0,0 +1,70 @@
+import json
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase
+
+from pki_framework.key_store import JWKSKeyStore, PublicKeyNotFound
+
+
+def generate_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk['kid'] = kid
+    return jwk
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJWKSKeyStore(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.jwks = {'keys': [generate_jwk('key-1')]}
+        self.store = JWKSKeyStore(jwks_url='https://passport.local/.well-known/jwks.json', ttl=300,
+                                  min_refresh_interval=10, clock=self.clock)
+        patcher = mock.patch.object(JWKSKeyStore, '_fetch_jwks', side_effect=lambda: self.jwks)
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_keys_are_fetched_once_within_ttl(self):
+        first = self.store.get_key('key-1')
+        self.clock.now = 299
+        second = self.store.get_key('key-1')
+        self.assertIs(first, second)
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_keys_are_refetched_after_ttl(self):
+        self.store.get_key('key-1')
+        self.clock.now = 300
+        self.store.get_key('key-1')
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_unknown_kid_triggers_refetch(self):
+        self.store.get_key('key-1')
+        self.jwks = {'keys': [generate_jwk('key-1'), generate_jwk('key-2')]}
+        self.clock.now = 10
+        self.assertIsNotNone(self.store.get_key('key-2'))
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        self.store.get_key('key-1')
+        self.clock.now = 5
+        for _ in range(5):
+            with self.assertRaises(PublicKeyNotFound):
+                self.store.get_key('unknown')
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_stale_keys_are_served_when_passport_is_unreachable(self):
+        key = self.store.get_key('key-1')
+        self.fetch.side_effect = ConnectionError("Passport is down")
+        self.clock.now = 1000
+        self.assertIs(self.store.get_key('key-1'), key)
+        self.assertEqual(self.fetch.call_count, 2)
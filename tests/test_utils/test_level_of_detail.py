@@ -0,0 +1,83 @@
+import json
+import math
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations import level_of_detail
+from gcs_operations.models import FlightPlan
+from tests.gcs_objects import create_flight_log
+
+
+def circle(points, radius=0.01):
+    ring = [[77.59 + radius * math.cos(2 * math.pi * i / points), 12.97 + radius * math.sin(2 * math.pi * i / points)] for i in range(points)]
+    return ring + [ring[0]]
+
+
+class TestLevelOfDetail(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Two legs of a flight with a point every 10 cm
+        entries = [['POSITION', 1620000000 + i, 77.59 + i * 1e-6, 12.97, 30.0, 0.5] for i in range(5000)]
+        entries += [['POSITION', 1620005000 + i, 77.595, 12.97 + i * 1e-6, 30.0, 0.5] for i in range(5000)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log = create_flight_log(raw_log={'logEntries': entries})
+            self.flight_plan = FlightPlan.objects.create(geo_json={'type': 'FeatureCollection', 'features': [
+                {'type': 'Feature', 'properties': {'name': 'Area'}, 'geometry': {'type': 'Polygon', 'coordinates': [circle(2000)]}}]})
+
+    def test_tracks_are_simplified_per_zoom_level(self):
+        res = self.client.get(reverse('log-track', kwargs={'pk': self.flight_log.id}), {'zoom': 10})
+        self.assertEqual(res.status_code, 200)
+        track = res.json()
+        self.assertEqual(track['properties']['point_count'], 10000)
+        self.assertEqual(track['geometry']['coordinates'][0], [77.59, 12.97])
+        self.assertLessEqual(len(track['geometry']['coordinates']), 3)
+
+        # Precomputed zoom levels are served from the cache
+        with self.assertNumQueries(1):
+            detailed = level_of_detail.simplified_track(self.flight_log.id, 16)
+        self.assertGreaterEqual(len(detailed['geometry']['coordinates']), 3)
+        self.assertEqual(self.client.get(reverse('log-track', kwargs={'pk': self.flight_log.id}), {'zoom': 30}).status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log.raw_log = {'logEntries': [['POSITION', 1, 77.0, 12.0, 30.0, 0.5]]}
+            self.flight_log.save()
+        self.assertEqual(level_of_detail.simplified_track(self.flight_log.id, 16)['geometry']['coordinates'], [[77.0, 12.0]])
+
+    def test_plans_are_simplified_per_zoom_level(self):
+        coarse = self.client.get(reverse('flight-plan-geo-json', kwargs={'pk': self.flight_plan.id}), {'zoom': 10}).json()
+        fine = self.client.get(reverse('flight-plan-geo-json', kwargs={'pk': self.flight_plan.id}), {'zoom': 18}).json()
+        coarse_ring = coarse['features'][0]['geometry']['coordinates'][0]
+        self.assertLess(len(coarse_ring), len(fine['features'][0]['geometry']['coordinates'][0]))
+        self.assertLess(len(coarse_ring), 100)
+        self.assertEqual(coarse['features'][0]['properties'], {'name': 'Area'})
+
+        self.flight_plan.geo_json = {'type': 'FeatureCollection', 'features': []}
+        self.flight_plan.save()
+        self.assertEqual(level_of_detail.simplified_plan(self.flight_plan.id, 10)['features'], [])
+        self.assertEqual(self.client.get(reverse('flight-plan-geo-json', kwargs={'pk': self.flight_log.id})).status_code, 404)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_launchpad_pages_draw_the_simplified_geometries(self):
+        res = self.client.get(reverse('flightlogs-detail', kwargs={'flightlog_id': self.flight_log.id}))
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'flight_track', res.content)
+        res = self.client.get(reverse('flightplans-detail', kwargs={'flightplan_id': self.flight_plan.id}))
+        self.assertEqual(res.status_code, 200)
+
+        # A plan that cannot be simplified is drawn as stored
+        broken = {'type': 'FeatureCollection', 'features': [{'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [[[77.59]]]}}]}
+        FlightPlan.objects.filter(id=self.flight_plan.id).update(geo_json=broken)
+        cache.clear()
+        with self.assertLogs('launchpad.views', 'WARNING'):
+            res = self.client.get(reverse('flightplans-detail', kwargs={'flightplan_id': self.flight_plan.id}))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['geo_json'], json.dumps(broken))
+
+        # Logs without positions have no map
+        res = self.client.get(reverse('flightlogs-detail', kwargs={'flightlog_id': create_flight_log().id}))
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn(b'flight_track', res.content)
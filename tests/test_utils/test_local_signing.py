@@ -0,0 +1,52 @@
+from unittest import mock
+
+import jwt
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations import data_signer
+from pki_framework import signing_keys
+from tests.gcs_objects import create_signing_key
+
+
+@override_settings(CRYPTOGRAPHY_SALT=Fernet.generate_key().decode('utf-8'), PERMISSION_SIGNING_MODE='local')
+class TestLocalPermissionSigning(TestCase):
+
+    def setUp(self):
+        signing_keys.signing_key_cache.invalidate()
+        self.addCleanup(signing_keys.signing_key_cache.invalidate)
+        self.credential = create_signing_key(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+
+    def test_permission_is_signed_locally_and_verifiable_with_published_jwks(self):
+        signer = data_signer.get_permission_signer()
+        self.assertIsInstance(signer, data_signer.LocalSigningHelper)
+        signed = signer.issue_jwt_permission({'flight_operation_id': 'op-1', 'plan_file_hash': 'abc'})
+
+        jwks = self.client.get(reverse('pki-jwks')).json()
+        self.assertEqual(len(jwks['keys']), 1)
+        jwk = jwks['keys'][0]
+        self.assertEqual(jwt.get_unverified_header(signed['access_token'])['kid'], jwk['kid'])
+        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+        claims = jwt.decode(signed['access_token'], public_key, algorithms=['RS256'])
+        self.assertEqual(claims['flight_operation_id'], 'op-1')
+
+    def test_parsed_key_is_reused_until_credential_changes(self):
+        signer = data_signer.LocalSigningHelper()
+        with mock.patch.object(signing_keys, 'parse_signing_key', wraps=signing_keys.parse_signing_key) as parse:
+            first = signer.issue_jwt_permission({'flight_operation_id': 'op-1'})
+            signer.issue_jwt_permission({'flight_operation_id': 'op-2'})
+            self.assertEqual(parse.call_count, 1)
+
+            create_signing_key(ec.generate_private_key(ec.SECP256R1()))
+            second = signer.issue_jwt_permission({'flight_operation_id': 'op-3'})
+            self.assertEqual(parse.call_count, 2)
+        self.assertEqual(jwt.get_unverified_header(second['access_token'])['alg'], 'ES256')
+        self.assertNotEqual(jwt.get_unverified_header(first['access_token'])['kid'],
+                            jwt.get_unverified_header(second['access_token'])['kid'])
+
+    def test_signing_fails_without_a_management_server_key(self):
+        self.credential.delete()
+        self.assertFalse(data_signer.LocalSigningHelper().issue_jwt_permission({'flight_operation_id': 'op-1'}))
+        self.assertEqual(self.client.get(reverse('pki-jwks')).json(), {'keys': []})
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from gcs_operations import log_analytics
+from tests.gcs_objects import create_flight_log, create_flight_operation
+
+
+def raw_log(altitudes):
+    # Points 0.001 degrees of latitude (about 111 m) apart, 10 seconds apart
+    return {'logEntries': [['POSITION', 1620000000 + 10 * i, 77.59, 12.97 + 0.001 * i, altitude, 0.5] for i, altitude in enumerate(altitudes)]}
+
+
+class TestFlightLogSummary(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log = create_flight_log(raw_log=raw_log([10.0, 50.0, 30.0]))
+
+    def test_summary_is_computed_and_invalidated_when_the_log_changes(self):
+        res = self.client.get(reverse('log-summary', kwargs={'pk': self.flight_log.id}))
+        self.assertEqual(res.status_code, 200)
+        summary = res.json()
+        self.assertEqual(summary['point_count'], 3)
+        self.assertEqual(summary['duration_seconds'], 20.0)
+        self.assertAlmostEqual(summary['distance_meters'], 222.4, places=1)
+        self.assertAlmostEqual(summary['max_ground_speed'], 11.12, places=2)
+        self.assertEqual((summary['min_altitude'], summary['max_altitude']), (10.0, 50.0))
+        self.assertEqual([round(v, 6) for v in summary['bounding_box']], [77.59, 12.97, 77.59, 12.972])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(log_analytics.flight_log_summary(self.flight_log.id), summary)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log.raw_log = raw_log([10.0, 80.0])
+            self.flight_log.save()
+        self.assertEqual(log_analytics.flight_log_summary(self.flight_log.id)['max_altitude'], 80.0)
+
+    def test_missing_values_and_empty_logs(self):
+        summary = log_analytics.summarize({'timestamp': [1.0, float('nan'), 5.0], 'latitude': [12.0, 12.0, float('nan')],
+                                           'longitude': [77.0, 77.0, 77.0], 'altitude': [float('nan')] * 3})
+        self.assertEqual(summary['duration_seconds'], 4.0)
+        self.assertEqual(summary['distance_meters'], 0.0)
+        self.assertIsNone(summary['max_ground_speed'])
+        self.assertIsNone(summary['max_altitude'])
+        empty = log_analytics.summarize({name: [] for name in log_analytics.SUMMARY_COLUMNS})
+        self.assertEqual(empty['point_count'], 0)
+        self.assertIsNone(empty['bounding_box'])
+
+    def test_bulk_summary_of_operations(self):
+        operation = create_flight_operation()
+        with self.captureOnCommitCallbacks(execute=True):
+            other_log = create_flight_log(operation=operation, raw_log=raw_log([5.0]))
+        res = self.client.post(reverse('log-summary-batch'), {'operation_ids': [str(self.flight_log.operation_id), str(operation.id)]},
+                               content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        summaries = {result['flight_log']: result['summary'] for result in res.json()['results']}
+        self.assertEqual(summaries[str(self.flight_log.id)]['point_count'], 3)
+        self.assertEqual(summaries[str(other_log.id)]['max_altitude'], 5.0)
+        self.assertEqual(self.client.get(reverse('log-summary', kwargs={'pk': operation.id})).status_code, 404)
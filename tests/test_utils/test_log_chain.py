@@ -0,0 +1,52 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations import data_signer, log_chain
+from gcs_operations.models import FlightLog, FlightLogChainCheckpoint, SignedFlightLog
+from tests.gcs_objects import create_flight_log, create_flight_operation
+
+
+@override_settings(FLIGHT_LOG_CHAIN_CHECKPOINT_INTERVAL=2)
+class TestFlightLogChain(TestCase):
+
+    def setUp(self):
+        self.operation = create_flight_operation()
+        self.drone = self.operation.drone
+        self.logs = [create_flight_log(self.operation, raw_log={'logEntries': [[i, 12.9, 77.6]]}) for i in range(5)]
+
+    def test_signed_logs_are_chained_per_aircraft(self):
+        data_signer.sign_logs([log.id for log in self.logs[:2]])
+        data_signer.sign_log(self.logs[2].id)
+        other_log = create_flight_log(raw_log={'logEntries': []})
+        data_signer.sign_log(other_log.id)
+
+        chain = list(SignedFlightLog.objects.filter(aircraft=self.drone).order_by('sequence'))
+        self.assertEqual([sfl.sequence for sfl in chain], [1, 2, 3])
+        self.assertEqual(chain[0].previous_log_hash, log_chain.GENESIS_HASH)
+        self.assertEqual([sfl.previous_log_hash for sfl in chain[1:]], [sfl.chain_hash for sfl in chain[:-1]])
+        self.assertEqual(SignedFlightLog.objects.get(raw_flight_log=other_log).sequence, 1)
+
+    def test_verification_resumes_from_checkpoints(self):
+        data_signer.sign_logs([log.id for log in self.logs])
+        result = log_chain.verify_chain(self.drone.id)
+        self.assertTrue(result['valid'])
+        self.assertEqual((result['resumed_from'], result['verified']), (0, 5))
+        self.assertEqual(list(FlightLogChainCheckpoint.objects.filter(aircraft=self.drone).order_by('sequence').values_list('sequence', flat=True)), [2, 4, 5])
+
+        data_signer.sign_log(create_flight_log(self.operation, raw_log={'logEntries': [[5, 12.9, 77.6]]}).id)
+        url = reverse('signed-log-chain-verify', kwargs={'aircraft_id': self.drone.id})
+        result = self.client.get(url).json()
+        self.assertTrue(result['valid'])
+        self.assertEqual((result['resumed_from'], result['verified'], result['verified_to']), (5, 1, 6))
+
+    def test_tampering_is_detected(self):
+        data_signer.sign_logs([log.id for log in self.logs])
+        FlightLog.objects.filter(id=self.logs[3].id).update(raw_log={'logEntries': [[3, 0.0, 0.0]]})
+        result = log_chain.verify_chain(self.drone.id)
+        self.assertFalse(result['valid'])
+        self.assertEqual(result['error']['sequence'], 4)
+        self.assertEqual(result['verified_to'], 3)
+
+        SignedFlightLog.objects.filter(aircraft=self.drone, sequence=3).update(chain_hash='f' * 64)
+        self.assertEqual(log_chain.verify_chain(self.drone.id)['error']['message'], 'Signed log chain changed after it was verified')
+        self.assertEqual(log_chain.verify_chain(self.drone.id, full=True)['error']['sequence'], 3)
@@ -0,0 +1,58 @@
+import gzip
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations.models import SignedFlightLog
+from tests.gcs_objects import create_flight_log
+
+
+@override_settings(SIGNED_LOG_DOWNLOAD_CHUNK_SIZE=1000)
+class TestSignedLogDownload(TestCase):
+
+    def setUp(self):
+        raw_log = {'logEntries': [['POSITION', 1620000000 + i, 77.59, 12.97, 30.0, 0.5] for i in range(200)]}
+        self.signed_log = json.dumps(dict(raw_log, signature='sig')).encode('utf-8')
+        self.signed_flight_log = SignedFlightLog.objects.create(raw_flight_log=create_flight_log(raw_log=raw_log), signed_log=self.signed_log.decode('utf-8'),
+                                                                signed_log_size=len(self.signed_log), chain_hash='a' * 64)
+        self.url = reverse('signed-log-download', kwargs={'pk': self.signed_flight_log.id})
+
+    def test_download_is_streamed_in_chunks(self):
+        with self.assertNumQueries(1 + len(self.signed_log) // 1000 + 1):
+            res = self.client.get(self.url)
+            content = b''.join(res.streaming_content)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(content, self.signed_log)
+        self.assertEqual(int(res['Content-Length']), len(self.signed_log))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(res['ETag'], '"%s"' % ('a' * 64))
+
+        # Logs signed before their size was stored
+        SignedFlightLog.objects.filter(id=self.signed_flight_log.id).update(signed_log_size=None)
+        self.assertEqual(int(self.client.get(self.url)['Content-Length']), len(self.signed_log))
+
+    def test_ranges(self):
+        res = self.client.get(self.url, HTTP_RANGE='bytes=990-2009')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.signed_log[990:2010])
+        self.assertEqual(res['Content-Range'], 'bytes 990-2009/%d' % len(self.signed_log))
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(res.streaming_content), self.signed_log[-10:])
+        res = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(b''.join(res.streaming_content), self.signed_log[5000:])
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=%d-' % len(self.signed_log))
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */%d' % len(self.signed_log))
+        # Multiple ranges are not supported and the whole log is sent
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_gzip(self):
+        res = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(res.streaming_content)), self.signed_log)
+        self.assertFalse(self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0').has_header('Content-Encoding'))
+        self.assertEqual(self.client.get(reverse('signed-log-download', kwargs={'pk': self.signed_flight_log.raw_flight_log_id})).status_code, 404)
@@ -0,0 +1,44 @@
+import hashlib
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from gcs_operations.models import SignedFlightLog
+from tests.gcs_objects import create_flight_log
+
+
+class TestDeferredPayloadLists(TestCase):
+
+    def setUp(self):
+        self.raw_log = {'permissionArtefact': 'abc', 'logEntries': [['POSITION', 1620000000 + i, 77.59, 12.97, 30.0, 0.5] for i in range(50)]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log = create_flight_log(raw_log=self.raw_log)
+        self.minified = json.dumps(self.raw_log, separators=(',', ':')).encode('utf-8')
+
+    def test_flight_log_list_returns_summaries(self):
+        signed_log = json.dumps(dict(self.raw_log, signature='sig'))
+        SignedFlightLog.objects.create(raw_flight_log=self.flight_log, signed_log=signed_log, signed_log_size=len(signed_log))
+        with self.captureOnCommitCallbacks(execute=True):
+            unsigned_log = create_flight_log(operation=self.flight_log.operation)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse('log-list'))
+        self.assertEqual(res.status_code, 200)
+        results = {row['id']: row for row in res.json()['results']}
+        self.assertEqual(results[str(self.flight_log.id)], {
+            'id': str(self.flight_log.id), 'operation': str(self.flight_log.operation_id), 'raw_log_size': len(self.minified),
+            'point_count': 50, 'raw_log_digest': hashlib.sha256(self.minified).hexdigest(), 'is_signed': True,
+            'created_at': results[str(self.flight_log.id)]['created_at'], 'updated_at': results[str(self.flight_log.id)]['updated_at']})
+        self.assertFalse(results[str(unsigned_log.id)]['is_signed'])
+
+        res = self.client.get(reverse('signed-log-list'))
+        self.assertNotIn('signed_log', res.json()['results'][0])
+        self.assertEqual(res.json()['results'][0]['signed_log_size'], len(signed_log))
+
+    def test_raw_log_is_streamed(self):
+        res = self.client.get(reverse('log-raw', kwargs={'pk': self.flight_log.id}))
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertEqual(b''.join(res.streaming_content), self.minified)
+        self.assertEqual(self.client.get(reverse('log-raw', kwargs={'pk': self.flight_log.operation_id})).status_code, 404)
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations import log_uploads
+from gcs_operations.models import FlightLog, FlightLogUploadSession
+from tests.gcs_objects import create_flight_operation
+
+
+class TestResumableLogUpload(TestCase):
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, True)
+        settings_override = override_settings(FLIGHT_LOG_UPLOAD_DIR=upload_dir, FLIGHT_LOG_UPLOAD_MAX_CHUNK_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.operation = create_flight_operation()
+        self.raw_log = {'logEntries': [['POSITION', 1620000000 + i, 77.59, 12.97, 100.0, 0.5] for i in range(100)]}
+        payload = json.dumps(self.raw_log).encode('utf-8')
+        self.chunks = [payload[i:i + 1000] for i in range(0, len(payload), 1000)]
+        res = self.client.post(reverse('log-upload-list'), {'operation': str(self.operation.id), 'total_chunks': len(self.chunks),
+                                                             'sha256': hashlib.sha256(payload).hexdigest()}, content_type='application/json')
+        self.assertEqual(res.status_code, 201)
+        self.session_id = res.json()['id']
+
+    def put_chunk(self, index, chunk=None, checksum=None):
+        chunk = self.chunks[index] if chunk is None else chunk
+        url = reverse('log-upload-chunk', kwargs={'pk': self.session_id, 'index': index})
+        return self.client.put(url, chunk, content_type='application/octet-stream',
+                               HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest())
+
+    def test_interrupted_upload_resumes_at_last_acknowledged_chunk(self):
+        for index in range(2):
+            self.assertEqual(self.put_chunk(index).json()['next_chunk'], index + 1)
+
+        # A corrupted chunk is rejected and leaves nothing behind
+        self.assertEqual(self.put_chunk(2, checksum='0' * 64).status_code, 400)
+        self.assertEqual(os.path.getsize(log_uploads.upload_path(self.session_id)), 2000)
+        # Out of order chunks are refused, an acknowledged chunk can be retried
+        self.assertEqual(self.put_chunk(3).status_code, 409)
+        self.assertEqual(self.put_chunk(1).status_code, 200)
+
+        next_chunk = self.client.get(reverse('log-upload-detail', kwargs={'pk': self.session_id})).json()['next_chunk']
+        self.assertEqual(next_chunk, 2)
+        self.assertEqual(self.client.post(reverse('log-upload-finalize', kwargs={'pk': self.session_id})).status_code, 409)
+        for index in range(next_chunk, len(self.chunks)):
+            self.assertEqual(self.put_chunk(index).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(reverse('log-upload-finalize', kwargs={'pk': self.session_id}))
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(FlightLog.objects.get(id=res.json()['id']).raw_log, self.raw_log)
+        self.assertEqual(FlightLogUploadSession.objects.get(id=self.session_id).status, FlightLogUploadSession.COMPLETED)
+        self.assertFalse(os.path.exists(log_uploads.upload_path(self.session_id)))
+
+    def test_oversized_chunks_and_bad_logs_are_rejected(self):
+        self.assertEqual(self.put_chunk(0, chunk=b'x' * 2048).status_code, 413)
+        FlightLogUploadSession.objects.filter(id=self.session_id).update(total_chunks=1, sha256='')
+        self.assertEqual(self.put_chunk(0, chunk=b'{"not": json').status_code, 200)
+        self.assertEqual(self.client.post(reverse('log-upload-finalize', kwargs={'pk': self.session_id})).status_code, 422)
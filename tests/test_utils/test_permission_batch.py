@@ -0,0 +1,99 @@
+import os
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from common import http_client
+from gcs_operations import deconfliction, permissions_issuer
+from gcs_operations.models import FlightOperation, FlightPermission, FlightPlan
+from gcs_operations.permissions_issuer import PermissionIssuanceStatus
+from tests.gcs_objects import LocalSigningMixin, create_flight_operation, route
+from tests.passport_standin import PassportStandin
+
+
+class BatchIssuanceMixin(object):
+
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now() + timedelta(minutes=30)
+        self.drone = create_flight_operation().drone
+
+    def operation(self, lng, start=None):
+        start = start or self.start
+        return create_flight_operation(drone=self.drone, flight_plan=FlightPlan.objects.create(geo_json=route(lng, 12.97)), start_datetime=start,
+                                       end_datetime=start + timedelta(hours=1))
+
+
+class TestLocalBatchIssuance(BatchIssuanceMixin, LocalSigningMixin, TestCase):
+
+    def test_every_operation_gets_its_own_result(self):
+        first = self.operation(77.59)
+        # Same airspace and window as first, the batch denies it although first is not saved yet
+        overlapping = create_flight_operation(drone=self.drone, flight_plan=first.flight_plan, start_datetime=self.start, end_datetime=self.start + timedelta(hours=1))
+        too_late = self.operation(78.59, start=self.start + timedelta(hours=2))
+        issued = self.operation(79.59)
+        existing = permissions_issuer.issue_permission(issued.id)['flight_permission']
+        missing = uuid.uuid4()
+
+        results = permissions_issuer.issue_permissions([first.id, overlapping.id, too_late.id, issued.id, missing, first.id])
+        self.assertEqual(list(results), [str(first.id), str(overlapping.id), str(too_late.id), str(issued.id), str(missing)])
+        self.assertEqual(results[str(first.id)]['status'], PermissionIssuanceStatus.ISSUED)
+        self.assertEqual(results[str(first.id)]['flight_permission'].status_code, FlightPermission.GRANTED)
+        self.assertIn('access_token', results[str(first.id)]['flight_permission'].token)
+        self.assertEqual(results[str(overlapping.id)]['status'], PermissionIssuanceStatus.ISSUED)
+        self.assertEqual(results[str(overlapping.id)]['flight_permission'].status_code, FlightPermission.DENIED)
+        self.assertEqual(results[str(too_late.id)]['status'], PermissionIssuanceStatus.INVALID)
+        self.assertEqual(results[str(issued.id)], {"status": PermissionIssuanceStatus.EXISTS, "flight_permission": existing,
+                                                   "message": "A permission already exists for that operation"})
+        self.assertEqual(results[str(missing)]['status'], PermissionIssuanceStatus.NOT_FOUND)
+
+        self.assertEqual(FlightPermission.objects.filter(operation__in=[first, overlapping]).count(), 2)
+        self.assertFalse(FlightPermission.objects.filter(operation=too_late).exists())
+        self.assertEqual(set(FlightOperation.objects.filter(is_editable=False).values_list('id', flat=True)), {first.id, overlapping.id, issued.id})
+
+        # A later batch sees the permissions written by this one
+        later = create_flight_operation(drone=self.drone, flight_plan=first.flight_plan, start_datetime=self.start, end_datetime=self.start + timedelta(hours=1))
+        self.assertEqual(permissions_issuer.issue_permissions([later.id])[str(later.id)]['flight_permission'].status_code, FlightPermission.DENIED)
+
+    def test_batch_endpoint(self):
+        operations = [self.operation(77.59 + i) for i in range(3)]
+        res = self.client.post(reverse('flight-operation-permission-batch'), {'operation_ids': [str(o.id) for o in operations]}, content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r['status'] for r in res.json()['results']], ['ISSUED'] * 3)
+        self.assertEqual([r['flight_permission']['status_code'] for r in res.json()['results']], ['granted'] * 3)
+        with override_settings(PERMISSION_ISSUE_BATCH_LIMIT=2):
+            res = self.client.post(reverse('flight-operation-permission-batch'), {'operation_ids': [str(o.id) for o in operations]}, content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+
+
+@override_settings(PERMISSION_SIGNING_MODE='passport', PERMISSION_ISSUE_WORKERS=10, UPSTREAM_HTTP={'passport': {'retries': 0}})
+class TestPassportBatchIssuance(BatchIssuanceMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        deconfliction.permission_airspace.reset()
+        self.addCleanup(deconfliction.permission_airspace.reset)
+        http_client.reset_upstreams()
+        self.addCleanup(http_client.reset_upstreams)
+        self.standin = PassportStandin(token_latency=0.2).start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(os.environ, {'FLIGHT_PASSPORT_PERMISSION_CLIENT_ID': 'test', 'FLIGHT_PASSPORT_PERMISSION_CLIENT_SECRET': 'test',
+                                               'PASSPORT_URL': self.standin.url, 'PASSPORT_TOKEN_URL': '/oauth/token/'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tokens_are_requested_concurrently(self):
+        operations = [self.operation(77.59 + i) for i in range(10)]
+        started = time.perf_counter()
+        results = permissions_issuer.issue_permissions([o.id for o in operations])
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(self.standin.request_count['token'], 10)
+        self.assertEqual({r['flight_permission'].status_code for r in results.values()}, {FlightPermission.GRANTED})
+        # One at a time the ten requests take two seconds
+        self.assertLess(elapsed, 1.0)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from common.http_client import CircuitOpenError
+from gcs_operations import permissions_issuer
+from gcs_operations.models import FlightOperation, FlightPermission, FlightPlan
+from tests.gcs_objects import ROUTE, LocalSigningMixin, create_flight_operation
+
+
+@override_settings(AIRSPACE_DECONFLICTION=False)
+class TestPermissionPreissue(LocalSigningMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.flight_plan = FlightPlan.objects.create(geo_json=ROUTE)
+
+    def operation(self, starts_in):
+        start = timezone.now() + starts_in
+        return create_flight_operation(flight_plan=self.flight_plan, start_datetime=start, end_datetime=start + timedelta(hours=1))
+
+    def preissue(self):
+        out = StringIO()
+        call_command('preissue_flight_permissions', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_operations_entering_the_window_are_issued_once(self):
+        upcoming = [self.operation(timedelta(minutes=minutes)) for minutes in (50, 20)]
+        later = self.operation(timedelta(hours=2))
+        starting = self.operation(timedelta(seconds=30))
+        issued = self.operation(timedelta(minutes=40))
+        existing = permissions_issuer.issue_permission(issued.id)['flight_permission']
+
+        self.assertIn('2 issued', self.preissue())
+        self.assertEqual(set(FlightPermission.objects.values_list('operation_id', flat=True)), {o.id for o in upcoming} | {issued.id})
+        self.assertFalse(FlightOperation.objects.get(id=upcoming[0].id).is_editable)
+        self.assertEqual(FlightPermission.objects.get(operation=issued), existing)
+
+        # Running again, e.g. from another worker, issues nothing twice
+        self.assertIn('no upcoming operations', self.preissue())
+        self.assertEqual(FlightPermission.objects.count(), 3)
+
+        FlightOperation.objects.filter(id=later.id).update(start_datetime=timezone.now() + timedelta(minutes=10))
+        self.assertIn('1 issued', self.preissue())
+        self.assertFalse(FlightPermission.objects.filter(operation=starting).exists())
+
+    def test_failed_token_requests_are_retried_instead_of_denied(self):
+        operations = [self.operation(timedelta(minutes=minutes)) for minutes in (20, 30)]
+        signer = mock.Mock()
+        # Passport answered with an error, then the circuit breaker opened
+        signer.issue_jwt_permission.side_effect = [False, CircuitOpenError("Circuit breaker for passport is open")]
+        with mock.patch('gcs_operations.data_signer.get_permission_signer', return_value=signer):
+            self.assertIn('2 failed', self.preissue())
+        self.assertFalse(FlightPermission.objects.exists())
+        # The operations stay leased to this worker and are not retried before the lease expires
+        self.assertIn('no upcoming operations', self.preissue())
+
+        FlightOperation.objects.filter(id__in=[o.id for o in operations]).update(permission_claimed_until=timezone.now())
+        self.assertIn('2 issued', self.preissue())
+        self.assertEqual(set(FlightPermission.objects.values_list('status_code', flat=True)), {FlightPermission.GRANTED})
+
+    def test_tokens_are_requested_after_the_claim_is_committed(self):
+        operation = self.operation(timedelta(minutes=30))
+        claimed = self.operation(timedelta(minutes=20))
+        expired = self.operation(timedelta(minutes=40))
+        FlightOperation.objects.filter(id=claimed.id).update(permission_claimed_until=timezone.now() + timedelta(minutes=1))
+        FlightOperation.objects.filter(id=expired.id).update(permission_claimed_until=timezone.now() - timedelta(seconds=1))
+        issue_permissions = permissions_issuer.issue_permissions
+        outer_atomic_blocks = len(connection.atomic_blocks)
+
+        def issued_outside_of_the_claim(flight_operation_ids, **kwargs):
+            # Only the test case's own transaction is open while the tokens are requested
+            self.assertEqual(len(connection.atomic_blocks), outer_atomic_blocks)
+            self.assertEqual(set(FlightOperation.objects.filter(id__in=flight_operation_ids, permission_claimed_until__gt=timezone.now()).values_list('id', flat=True)),
+                             set(flight_operation_ids))
+            return issue_permissions(flight_operation_ids, **kwargs)
+
+        with mock.patch('gcs_operations.permissions_issuer.issue_permissions', side_effect=issued_outside_of_the_claim) as issued:
+            self.assertIn('2 issued', self.preissue())
+        self.assertEqual(issued.call_args.args, ([operation.id, expired.id],))
+        # Another worker holds the lease of claimed
+        self.assertFalse(FlightPermission.objects.filter(operation=claimed).exists())
+
+    def test_permission_endpoint_looks_up_pre_issued_permissions(self):
+        operation = self.operation(timedelta(minutes=30))
+        self.preissue()
+        with self.assertNumQueries(1):
+            res = self.client.put(reverse('flight-operation-permission', kwargs={'operation_id': operation.id}))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['id'], str(FlightPermission.objects.get(operation=operation).id))
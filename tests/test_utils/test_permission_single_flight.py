@@ -0,0 +1,125 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from gcs_operations import permissions_issuer
+from gcs_operations.models import FlightOperation, FlightPermission, FlightPlan
+from tests.gcs_objects import ROUTE, LocalSigningMixin, create_flight_operation
+
+
+class TestIssuanceCoalescing(SimpleTestCase):
+
+    def setUp(self):
+        self.waiting = []
+        waiting = self.waiting
+
+        class WatchedFuture(Future):
+            def result(self, timeout=None):
+                waiting.append(threading.get_ident())
+                return super().result(timeout)
+
+        patcher = mock.patch('gcs_operations.permissions_issuer.Future', WatchedFuture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_calls_share_the_first_issuance(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_issue(flight_operation_id):
+            calls.append(flight_operation_id)
+            release.wait(5)
+            return {"flight_permission": 'permission of %s' % flight_operation_id}
+
+        with mock.patch('gcs_operations.permissions_issuer.issue_permission', side_effect=slow_issue), ThreadPoolExecutor(max_workers=9) as executor:
+            futures = [executor.submit(permissions_issuer.issue_permission_once, 'op-1') for _ in range(8)]
+            other = executor.submit(permissions_issuer.issue_permission_once, 'op-2')
+            # Every other caller of op-1 is waiting before the first issuance completes
+            while len(calls) < 2 or len(self.waiting) < 7:
+                release.wait(0.01)
+            release.set()
+            self.assertEqual({future.result() for future in futures}, {'permission of op-1'})
+            self.assertEqual(other.result(), 'permission of op-2')
+        self.assertEqual(sorted(calls), ['op-1', 'op-2'])
+        self.assertEqual(permissions_issuer._issuances_in_flight, {})
+
+    def test_waiters_get_the_error_of_the_first_issuance(self):
+        release = threading.Event()
+
+        def failing_issue(flight_operation_id):
+            release.wait(5)
+            raise ValueError("Passport is down")
+
+        with mock.patch('gcs_operations.permissions_issuer.issue_permission', side_effect=failing_issue), ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(permissions_issuer.issue_permission_once, 'op-1') for _ in range(2)]
+            while len(self.waiting) < 1:
+                release.wait(0.01)
+            release.set()
+            for future in futures:
+                self.assertRaises(ValueError, future.result)
+        self.assertEqual(permissions_issuer._issuances_in_flight, {})
+
+
+class TestIssuanceRace(LocalSigningMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        start = timezone.now() + timedelta(minutes=30)
+        self.operation = create_flight_operation(flight_plan=FlightPlan.objects.create(geo_json=ROUTE), start_datetime=start, end_datetime=start + timedelta(hours=1))
+
+    def test_an_issued_permission_is_returned_without_a_new_token(self):
+        first = permissions_issuer.issue_permission(self.operation.id)['flight_permission']
+        with mock.patch('gcs_operations.data_signer.get_permission_signer', side_effect=AssertionError):
+            self.assertEqual(permissions_issuer.issue_permission(self.operation.id)['flight_permission'], first)
+
+    def test_the_loser_of_a_race_returns_the_winning_permission(self):
+        signer = mock.Mock()
+
+        def issued_elsewhere(data_payload):
+            # Another process saves its permission while this one waits on Passport
+            FlightPermission.objects.create(operation=self.operation, status_code=FlightPermission.GRANTED, token={'access_token': 'winner'})
+            return {'access_token': 'loser'}
+
+        signer.issue_jwt_permission.side_effect = issued_elsewhere
+        with mock.patch('gcs_operations.data_signer.get_permission_signer', return_value=signer):
+            flight_permission = permissions_issuer.issue_permission(self.operation.id)['flight_permission']
+        self.assertEqual(flight_permission.token, {'access_token': 'winner'})
+        self.assertEqual(FlightPermission.objects.filter(operation=self.operation).count(), 1)
+
+    def test_the_token_is_requested_outside_of_a_transaction(self):
+        outer_atomic_blocks = len(connection.atomic_blocks)
+        signer = mock.Mock()
+
+        def outside_of_the_claim(data_payload):
+            # Only the test case's own transaction is open, and other callers see the claim
+            self.assertEqual(len(connection.atomic_blocks), outer_atomic_blocks)
+            self.assertGreater(FlightOperation.objects.get(id=self.operation.id).permission_claimed_until, timezone.now())
+            return {'access_token': 'token'}
+
+        signer.issue_jwt_permission.side_effect = outside_of_the_claim
+        with mock.patch('gcs_operations.data_signer.get_permission_signer', return_value=signer):
+            flight_permission = permissions_issuer.issue_permission(self.operation.id)['flight_permission']
+        self.assertEqual(flight_permission.token, {'access_token': 'token'})
+        self.assertIsNone(FlightOperation.objects.get(id=self.operation.id).permission_claimed_until)
+
+    def test_callers_wait_for_the_permission_of_a_claimed_operation(self):
+        FlightOperation.objects.filter(id=self.operation.id).update(permission_claimed_until=timezone.now() + timedelta(minutes=1))
+        winner = []
+
+        def issued_elsewhere(seconds):
+            # The process holding the claim writes its permission while this caller waits
+            winner.append(FlightPermission.objects.create(operation=self.operation, status_code=FlightPermission.GRANTED, token={'access_token': 'winner'}))
+
+        with mock.patch('gcs_operations.permissions_issuer.time.sleep', side_effect=issued_elsewhere), \
+                mock.patch('gcs_operations.data_signer.get_permission_signer', side_effect=AssertionError):
+            self.assertEqual(permissions_issuer.issue_permission(self.operation.id)['flight_permission'], winner[0])
+
+    def test_a_failed_issuance_releases_its_claim(self):
+        with mock.patch('gcs_operations.geo_cages.plan_geo_cage', side_effect=ValueError("No geo-cage")):
+            self.assertRaises(ValueError, permissions_issuer.issue_permission, self.operation.id)
+        self.assertIsNone(FlightOperation.objects.get(id=self.operation.id).permission_claimed_until)
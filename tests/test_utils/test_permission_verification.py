@@ -0,0 +1,85 @@
+import os
+import uuid
+from unittest import mock
+
+from cryptography.fernet import Fernet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gcs_operations import data_signer
+from gcs_operations.models import FlightPermission
+from pki_framework import signing_keys
+from pki_framework.key_store import jwks_store
+from tests.gcs_objects import create_flight_operation, create_signing_key
+from tests.passport_standin import PassportStandin
+
+
+@override_settings(CRYPTOGRAPHY_SALT=Fernet.generate_key().decode('utf-8'))
+class TestPermissionVerification(TestCase):
+
+    def setUp(self):
+        signing_keys.signing_key_cache.invalidate()
+        self.addCleanup(signing_keys.signing_key_cache.invalidate)
+        create_signing_key()
+
+        self.standin = PassportStandin().start()
+        self.addCleanup(self.standin.stop)
+        jwks_override = override_settings(PASSPORT_JWKS_URL=self.standin.jwks_url)
+        jwks_override.enable()
+        self.addCleanup(jwks_override.disable)
+        jwks_store.invalidate()
+        self.addCleanup(jwks_store.invalidate)
+        patcher = mock.patch.dict(os.environ, {'PASSPORT_DOMAIN': self.standin.domain})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claims(self, flight_operation_id):
+        return {'flight_operation_id': str(flight_operation_id), 'flight_plan_id': str(uuid.uuid4()), 'plan_file_hash': '0' * 64}
+
+    def verify(self, **data):
+        return self.client.post(reverse('flight-permissions-verify'), data, content_type='application/json')
+
+    def test_local_and_passport_tokens_are_verified_in_one_request(self):
+        local_token = data_signer.LocalSigningHelper().issue_jwt_permission(self.claims('op-1'))['access_token']
+        passport_tokens = [self.standin.issue_token([], **self.claims('op-%d' % i)) for i in range(2, 10)]
+        expired_token = self.standin.issue_token([], expires_in=-60, **self.claims('op-10'))
+        tampered_token = local_token[:-4] + ('AAAA' if not local_token.endswith('AAAA') else 'BBBB')
+
+        res = self.verify(tokens=[local_token] + passport_tokens + [expired_token, tampered_token, 'not-a-token'])
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual((body['valid'], body['invalid']), (9, 3))
+        self.assertEqual(body['results'][0]['claims']['flight_operation_id'], 'op-1')
+        self.assertEqual([r['error'] for r in body['results'][-3:]],
+                         ['Token Signature has expired', 'Invalid signature in token', 'Invalid token'])
+        self.assertEqual(self.standin.request_count['jwks'], 1)
+
+    def test_tokens_that_are_not_permissions_are_rejected(self):
+        access_token = self.standin.issue_token(['aerobridge.read'])
+        other_issuer = data_signer.LocalSigningHelper().issue_jwt_permission(self.claims('op-1'))['access_token']
+        with override_settings(LOCAL_PERMISSION_ISSUER='another-management-server'):
+            res = self.verify(tokens=[access_token, other_issuer, self.standin.issue_token([], **self.claims('op-2'))])
+            self.assertEqual([r['error'] for r in res.json()['results']], ['Token is not a flight permission', 'Token is not a flight permission', None])
+        with override_settings(PERMISSION_TOKEN_AUDIENCE='permissions.aerobridge'):
+            res = self.verify(tokens=[self.standin.issue_token([], **self.claims('op-2'))])
+            self.assertEqual(res.json()['results'][0]['error'], 'Token is not a flight permission')
+
+    def test_looked_up_tokens_must_be_issued_for_their_operation(self):
+        operation, other = create_flight_operation(), create_flight_operation()
+        FlightPermission.objects.create(operation=operation, status_code=FlightPermission.GRANTED, token={'access_token': self.standin.issue_token([], **self.claims(operation.id))})
+        FlightPermission.objects.create(operation=other, status_code=FlightPermission.GRANTED, token={'access_token': self.standin.issue_token([], **self.claims(operation.id))})
+        res = self.verify(operation_ids=[str(operation.id), str(other.id)])
+        self.assertEqual([(r['valid'], r['error']) for r in res.json()['results']], [(True, None), (False, 'Token was issued for another operation')])
+
+    def test_operations_without_permission_are_reported(self):
+        operation_id = str(uuid.uuid4())
+        res = self.verify(operation_ids=[operation_id])
+        self.assertEqual(res.status_code, 200)
+        result = res.json()['results'][0]
+        self.assertEqual((result['operation_id'], result['valid']), (operation_id, False))
+        self.assertEqual(result['error'], 'No permission issued for this operation')
+
+    def test_empty_and_oversized_batches_are_rejected(self):
+        self.assertEqual(self.verify(tokens=[]).status_code, 400)
+        with override_settings(PERMISSION_VERIFY_BATCH_LIMIT=2):
+            self.assertEqual(self.verify(tokens=['a', 'b', 'c']).status_code, 400)
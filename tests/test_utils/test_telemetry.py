@@ -0,0 +1,58 @@
+import math
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from gcs_operations import telemetry
+from gcs_operations.models import FlightLog, FlightLogTelemetry
+from tests.gcs_objects import create_flight_log
+
+
+def log_entry(i, entry_type='POSITION'):
+    return {'entryType': entry_type, 'timeStamp': 1628085721 + i, 'longitude': 72.515114 + i * 1e-5, 'latitude': 23.017818, 'altitude': 10.0 + i}
+
+
+class TestTelemetryStore(TestCase):
+
+    def setUp(self):
+        entries = [log_entry(0, 'TAKEOFF/ARM')] + [log_entry(i) for i in range(1, 99)] + [log_entry(99, 'LAND/DISARM')]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log = create_flight_log(raw_log={'permissionArtefact': 'abc', 'logEntries': entries})
+
+    def test_columns_are_extracted_on_save(self):
+        stored = FlightLogTelemetry.objects.get(flight_log=self.flight_log)
+        self.assertEqual(stored.point_count, 100)
+        self.assertEqual(stored.entry_type_labels, ['TAKEOFF/ARM', 'POSITION', 'LAND/DISARM'])
+        self.assertLess(len(stored.timestamp), 100 * 8)
+
+        columns = telemetry.read_columns(self.flight_log.id, ['timestamp', 'altitude', 'crc', 'entry_type'])
+        self.assertEqual(list(columns['timestamp'][:2]), [1628085721.0, 1628085722.0])
+        self.assertEqual(columns['altitude'][-1], 109.0)
+        self.assertTrue(all(math.isnan(v) for v in columns['crc']))
+        self.assertEqual(columns['entry_type'][-1], 'LAND/DISARM')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight_log.raw_log = {'logEntries': [['POSITION', 1, 72.5, 23.0, 5.0, 0.25]]}
+            self.flight_log.save()
+        self.assertEqual(list(telemetry.read_columns(self.flight_log.id, ['crc'])['crc']), [0.25])
+
+    def test_endpoint_reads_only_requested_columns(self):
+        res = self.client.get(reverse('log-telemetry', kwargs={'pk': self.flight_log.id}), {'columns': 'latitude,longitude'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(res.json()['columns']), {'latitude', 'longitude'})
+        self.assertEqual(res.json()['point_count'], 100)
+        res = self.client.get(reverse('log-telemetry', kwargs={'pk': self.flight_log.id}), {'columns': 'crc'})
+        self.assertEqual(res.json()['columns']['crc'][0], None)
+        self.assertEqual(self.client.get(reverse('log-telemetry', kwargs={'pk': self.flight_log.id}), {'columns': 'speed'}).status_code, 400)
+
+    def test_missing_telemetry_is_built(self):
+        FlightLogTelemetry.objects.all().delete()
+        self.assertEqual(len(telemetry.read_columns(self.flight_log.id, ['latitude'])['latitude']), 100)
+        FlightLogTelemetry.objects.all().delete()
+        FlightLog.objects.filter(id=self.flight_log.id).update(raw_log={'logEntries': [log_entry(0)]})
+        out = StringIO()
+        call_command('ingest_flight_log_telemetry', stdout=out)
+        self.assertIn('Built the telemetry of 1 flight logs', out.getvalue())
+        self.assertEqual(FlightLogTelemetry.objects.get(flight_log=self.flight_log).point_count, 1)
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase
+
+from pki_framework import utils
+from pki_framework.key_store import jwks_store
+from pki_framework.token_cache import VerifiedTokenCache, token_cache
+
+
+class FakeClock(object):
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVerifiedTokenCache(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerifiedTokenCache(max_size=2, clock=self.clock)
+
+    def test_claims_are_served_until_expiry(self):
+        self.cache.set('token-a', {'exp': 1010, 'scope': 'aerobridge.read'})
+        self.assertEqual(self.cache.get('token-a')['scope'], 'aerobridge.read')
+        self.clock.now = 1010
+        self.assertIsNone(self.cache.get('token-a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_hit_and_miss_counters(self):
+        self.cache.set('token-a', {'exp': 1010})
+        self.cache.get('token-a')
+        self.cache.get('token-a')
+        self.cache.get('token-b')
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_least_recently_used_token_is_evicted(self):
+        self.cache.set('token-a', {'exp': 1010})
+        self.cache.set('token-b', {'exp': 1010})
+        self.cache.get('token-a')
+        self.cache.set('token-c', {'exp': 1010})
+        self.assertIsNotNone(self.cache.get('token-a'))
+        self.assertIsNone(self.cache.get('token-b'))
+        self.assertIsNotNone(self.cache.get('token-c'))
+
+    def test_tokens_without_expiry_are_not_cached(self):
+        self.cache.set('token-a', {'scope': 'aerobridge.read'})
+        self.cache.set('token-b', {'exp': 999})
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+
+class TestVerifyAccessToken(SimpleTestCase):
+
+    def setUp(self):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk['kid'] = 'test-key'
+        claims = {'aud': 'testflight.aerobridge', 'exp': int(time.time()) + 600, 'scope': 'aerobridge.read'}
+        self.token = jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': 'test-key'})
+
+        patchers = [
+            mock.patch.dict(os.environ, {'PASSPORT_AUDIENCE': 'testflight.aerobridge'}),
+            mock.patch.object(jwks_store, '_fetch_jwks', return_value={'keys': [jwk]}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        jwks_store.invalidate()
+        token_cache.clear()
+        self.addCleanup(jwks_store.invalidate)
+        self.addCleanup(token_cache.clear)
+
+    def test_repeated_token_is_decoded_once(self):
+        with mock.patch.object(utils.jwt, 'decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                self.assertEqual(utils.verify_access_token(self.token)['scope'], 'aerobridge.read')
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(token_cache.stats()['hits'], 2)